@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нарастающие итоги по транзакциям пользователя
+Суммы по (месяц, тип, категория) обновляются за O(1) при каждом изменении,
+изменения баланса по дням - в дереве Фенвика за O(log n)
+"""
+
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def month_key(timestamp: Optional[float]) -> Optional[str]:
+    """timestamp -> ключ месяца 'YYYY-MM' (None для нераспознанной даты)"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m')
+
+
+class MonthlyTotals:
+    """Суммы и количество транзакций по (месяц, тип, категория)"""
+
+    def __init__(self):
+        # месяц -> {(тип, категория): [сумма, количество]}
+        self._months: Dict[Optional[str], Dict[Tuple[str, str], list]] = {}
+
+    def add(self, transaction: Dict, timestamp: Optional[float], sign: int = 1):
+        """Учет транзакции (sign=-1 - отмена учета при удалении/изменении)"""
+        month = month_key(timestamp)
+        bucket = self._months.setdefault(month, {})
+        key = (transaction.get('type', 'expense'), transaction.get('category', 'other'))
+
+        cell = bucket.get(key)
+        if cell is None:
+            cell = bucket[key] = [0.0, 0]
+
+        cell[0] += sign * float(transaction.get('amount', 0) or 0)
+        cell[1] += sign
+
+        if cell[1] == 0:
+            del bucket[key]
+            if not bucket:
+                del self._months[month]
+
+    def months(self) -> Iterable[Optional[str]]:
+        """Месяцы, по которым есть данные"""
+        return self._months.keys()
+
+    def month_totals(self, month: str) -> Dict[str, float]:
+        """Доходы и расходы за месяц"""
+        totals = {'income': 0.0, 'expense': 0.0}
+        for (tx_type, _), (amount, _) in self._months.get(month, {}).items():
+            totals[tx_type] = totals.get(tx_type, 0.0) + amount
+        return totals
+
+    def summarize(self, months: Optional[Iterable[Optional[str]]] = None) -> Dict:
+        """
+        Итоги по набору месяцев (None - за все время):
+        доходы, расходы, число транзакций и расходы по категориям
+        """
+        if months is None:
+            months = list(self._months.keys())
+
+        income = 0.0
+        expenses = 0.0
+        count = 0
+        expense_by_category: Dict[str, float] = {}
+
+        for month in months:
+            for (tx_type, category), (amount, n) in self._months.get(month, {}).items():
+                count += n
+                if tx_type == 'income':
+                    income += amount
+                elif tx_type == 'expense':
+                    expenses += amount
+                    expense_by_category[category] = expense_by_category.get(category, 0.0) + amount
+
+        return {
+            'total_income': income,
+            'total_expenses': expenses,
+            'total_transactions': count,
+            'expense_by_category': expense_by_category
+        }
+
+
+def summarize_transactions(transactions: Iterable[Dict]) -> Dict:
+    """Те же итоги, что и MonthlyTotals.summarize, но по готовому списку транзакций"""
+    totals = MonthlyTotals()
+    for transaction in transactions:
+        totals.add(transaction, None)
+    return totals.summarize()
+
+
+def day_key(timestamp: Optional[float]) -> Optional[int]:
+    """timestamp -> номер дня (date.toordinal, по местному времени)"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).toordinal()
+
+
+def balance_delta(transaction: Dict) -> float:
+    """Влияние транзакции на баланс: доход увеличивает, остальное уменьшает"""
+    amount = float(transaction.get('amount', 0) or 0)
+    return amount if transaction.get('type') == 'income' else -amount
+
+
+class DailyBalance:
+    """
+    Изменения баланса по дням в дереве Фенвика: накопленный баланс
+    на конец любого дня - за O(log n), где n - число дней в диапазоне.
+    Диапазон дней растет по мере прихода более ранних или поздних дат
+    """
+
+    # Начальный размер диапазона, дней
+    MIN_SIZE = 64
+
+    def __init__(self):
+        self._base = 0
+        # 1-based дерево, элемент 0 не используется
+        self._tree = array('d', [0.0])
+        self.total = 0.0
+        self.first_day: Optional[int] = None
+        # Число транзакций по дням: первый день сдвигается, когда его транзакции
+        # удалены или перенесены на другую дату
+        self._counts: Dict[int, int] = {}
+
+    @classmethod
+    def from_days(cls, days: Iterable[Tuple[int, float]]) -> 'DailyBalance':
+        """Дерево по готовым суммам (день, изменение) - для хранилищ без инкрементальных итогов"""
+        daily = cls()
+        for day, delta in days:
+            daily.add_day(day, delta)
+        return daily
+
+    @property
+    def _size(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, transaction: Dict, timestamp: Optional[float], sign: int = 1):
+        """Учет транзакции (sign=-1 - отмена учета при удалении/изменении)"""
+        day = day_key(timestamp)
+        if day is not None:
+            self.add_day(day, sign * balance_delta(transaction), sign)
+
+    def add_day(self, day: int, delta: float, count: int = 1):
+        """Изменение баланса за день от count транзакций (отрицательный - отмена)"""
+        remaining = self._counts.get(day, 0) + count
+        if remaining > 0:
+            self._counts[day] = remaining
+        else:
+            self._counts.pop(day, None)
+        if not self._size:
+            self._base = day - self.MIN_SIZE // 2
+            self._tree = array('d', [0.0]) * (self.MIN_SIZE + 1)
+        elif day < self._base or day >= self._base + self._size:
+            self._resize(min(day, self._base), max(day, self._base + self._size - 1))
+
+        if remaining > 0 and (self.first_day is None or day < self.first_day):
+            self.first_day = day
+        elif remaining <= 0 and day == self.first_day:
+            self.first_day = min(self._counts) if self._counts else None
+
+        tree = self._tree
+        i = day - self._base + 1
+        size = self._size
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+        self.total += delta
+
+    def prefix(self, day: int) -> float:
+        """Сумма изменений по конец дня day включительно"""
+        if not self._size or day < self._base:
+            return 0.0
+        if day >= self._base + self._size:
+            return self.total
+
+        tree = self._tree
+        i = day - self._base + 1
+        result = 0.0
+        while i > 0:
+            result += tree[i]
+            i -= i & -i
+        return result
+
+    def prefixes(self, days: List[int]) -> List[float]:
+        """prefix для каждого дня - O(точек * log n)"""
+        return [self.prefix(day) for day in days]
+
+    def _resize(self, lo: int, hi: int):
+        """Перестройка дерева на диапазон [lo, hi] с запасом - O(n), редко"""
+        # Дерево -> изменения по дням (обратный ход линейного построения)
+        points = array('d', self._tree)
+        size = self._size
+        for i in range(size, 0, -1):
+            j = i + (i & -i)
+            if j <= size:
+                points[j] -= points[i]
+
+        new_size = self.MIN_SIZE
+        while new_size < (hi - lo + 1) * 2:
+            new_size *= 2
+        new_base = lo - (new_size - (hi - lo + 1)) // 2
+
+        tree = array('d', [0.0]) * (new_size + 1)
+        shift = self._base - new_base
+        for i in range(1, size + 1):
+            tree[i + shift] = points[i]
+
+        # Линейное построение дерева Фенвика
+        for i in range(1, new_size + 1):
+            j = i + (i & -i)
+            if j <= new_size:
+                tree[j] += tree[i]
+
+        self._base = new_base
+        self._tree = tree
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Аналитика по транзакциям на массивах NumPy: сводка за период, доли
+категорий расходов, норма сбережений и оценка финансового здоровья
+(те же правила, что getFinancialSummary/getFinancialHealthScore в index.html)
+
+Пакетный режим пересчитывает financial_health всех пользователей:
+транзакции порции пользователей собираются в общие колонки, итоги
+считаются одним np.bincount по номеру пользователя
+
+    python analytics.py --period month
+"""
+
+import argparse
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from record_store import parse_date
+from storage import Storage
+
+
+class TransactionFrame:
+    """Транзакции одного или нескольких пользователей в виде колонок"""
+
+    # Коды типа транзакции
+    INCOME = 1
+    EXPENSE = 2
+
+    def __init__(self):
+        self.owners = 0
+        self._owner: List[int] = []
+        self._timestamps: List[float] = []
+        self._amounts: List[float] = []
+        self._kinds: List[int] = []
+        self._categories: List[int] = []
+        self.category_names: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+
+    def add_owner(self, records: Iterable[Dict]) -> int:
+        """Транзакции очередного пользователя; возвращает его номер в колонках"""
+        owner = self.owners
+        self.owners += 1
+
+        for record in records:
+            timestamp = parse_date(record.get('date'))
+            category = record.get('category', 'other')
+            code = self._category_codes.get(category)
+            if code is None:
+                code = self._category_codes[category] = len(self.category_names)
+                self.category_names.append(category)
+
+            tx_type = record.get('type', 'expense')
+            self._owner.append(owner)
+            self._timestamps.append(np.nan if timestamp is None else timestamp)
+            self._amounts.append(float(record.get('amount', 0) or 0))
+            self._kinds.append(self.INCOME if tx_type == 'income' else
+                               self.EXPENSE if tx_type == 'expense' else 0)
+            self._categories.append(code)
+        return owner
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Колонки NumPy"""
+        return {
+            'owner': np.asarray(self._owner, dtype=np.int64),
+            'timestamp': np.asarray(self._timestamps, dtype=np.float64),
+            'amount': np.asarray(self._amounts, dtype=np.float64),
+            'kind': np.asarray(self._kinds, dtype=np.int8),
+            'category': np.asarray(self._categories, dtype=np.int64)
+        }
+
+
+def summarize_frame(frame: TransactionFrame, start: Optional[float] = None,
+                    end: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Итоги за период [start, end] по каждому пользователю кадра:
+    доходы, расходы, число транзакций и матрица расходов (пользователь x категория)
+    """
+    columns = frame.columns()
+    owner, timestamp, amount, kind = columns['owner'], columns['timestamp'], columns['amount'], columns['kind']
+    n_owners = frame.owners
+    n_categories = max(len(frame.category_names), 1)
+
+    # Транзакции с нераспознанной датой попадают только в "за все время"
+    in_period = np.ones(len(amount), dtype=bool)
+    if start is not None:
+        in_period &= timestamp >= start
+    if end is not None:
+        in_period &= timestamp <= end
+
+    income_mask = in_period & (kind == TransactionFrame.INCOME)
+    expense_mask = in_period & (kind == TransactionFrame.EXPENSE)
+
+    income = np.bincount(owner, weights=np.where(income_mask, amount, 0.0), minlength=n_owners)
+    expenses = np.bincount(owner, weights=np.where(expense_mask, amount, 0.0), minlength=n_owners)
+    count = np.bincount(owner, weights=in_period, minlength=n_owners).astype(np.int64)
+    by_category = np.bincount(
+        owner * n_categories + columns['category'],
+        weights=np.where(expense_mask, amount, 0.0),
+        minlength=n_owners * n_categories
+    ).reshape(n_owners, n_categories)
+
+    return {'income': income, 'expenses': expenses, 'count': count, 'by_category': by_category}
+
+
+def savings_rate(income: np.ndarray, expenses: np.ndarray) -> np.ndarray:
+    """Норма сбережений, % (0 при отсутствии доходов)"""
+    safe_income = np.where(income > 0, income, 1.0)
+    return np.where(income > 0, (income - expenses) / safe_income * 100, 0.0)
+
+
+def health_scores(income: np.ndarray, expenses: np.ndarray,
+                  has_goals: np.ndarray, has_investments: np.ndarray) -> np.ndarray:
+    """Оценка финансового здоровья 0-100 сразу для массива пользователей"""
+    rate = savings_rate(income, expenses)
+    expense_ratio = expenses / np.maximum(income, 1) * 100
+
+    score = 50 + np.select([rate >= 20, rate >= 10, rate >= 0], [30, 20, 10], -10)
+    score += np.select([expense_ratio <= 70, expense_ratio <= 85, expense_ratio <= 100], [20, 10, 5], -10)
+    score += 10 * np.asarray(has_goals, dtype=np.int64) + 10 * np.asarray(has_investments, dtype=np.int64)
+    return np.clip(score, 0, 100).astype(np.int64)
+
+
+def user_analytics(storage: Storage, user_id: int, period: str = 'month') -> Dict[str, Any]:
+    """Сводка, структура расходов, норма сбережений и оценка здоровья пользователя"""
+    start, end, _ = storage.period_bounds(period)
+
+    frame = TransactionFrame()
+    frame.add_owner(storage.iter_records('transactions', user_id))
+    totals = summarize_frame(frame, start, end)
+
+    investments = storage.get_user_investments(user_id)
+    has_goals = bool(storage.get_user_goals(user_id))
+
+    income = float(totals['income'][0])
+    expenses = float(totals['expenses'][0])
+    rate = float(savings_rate(totals['income'], totals['expenses'])[0])
+    score = int(health_scores(totals['income'], totals['expenses'],
+                              np.array([has_goals]), np.array([bool(investments)]))[0])
+
+    by_category = totals['by_category'][0]
+    order = np.argsort(-by_category, kind='stable')
+    expense_structure = [
+        {
+            'category': frame.category_names[code],
+            'amount': float(by_category[code]),
+            'percentage': float(by_category[code] / expenses * 100) if expenses > 0 else 0
+        }
+        for code in order if by_category[code] > 0
+    ]
+
+    return {
+        'period': period,
+        'summary': {
+            'total_income': income,
+            'total_expenses': expenses,
+            'total_investments': sum(inv.get('amount', 0) for inv in investments),
+            'net_income': income - expenses,
+            'savings_rate': rate,
+            'total_transactions': int(totals['count'][0])
+        },
+        'expense_structure': expense_structure,
+        'health_score': score,
+        'health_factors': {
+            'savings_rate': rate,
+            'expense_ratio': expenses / max(income, 1) * 100,
+            'has_goals': has_goals,
+            'has_investments': bool(investments)
+        },
+        'currency': '₽'
+    }
+
+
+def batch_health_scores(storage: Storage, user_ids: Optional[Iterable[int]] = None,
+                        period: str = 'month', save: bool = True,
+                        chunk_size: int = 1000) -> Dict[int, int]:
+    """
+    Оценки здоровья всех пользователей (или user_ids) порциями по chunk_size;
+    при save изменившиеся оценки записываются в поле financial_health
+    """
+    start, end, _ = storage.period_bounds(period)
+    user_ids = list(storage.user_ids() if user_ids is None else user_ids)
+    scores: Dict[int, int] = {}
+
+    for offset in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[offset:offset + chunk_size]
+        frame = TransactionFrame()
+        has_goals = np.zeros(len(chunk), dtype=bool)
+        has_investments = np.zeros(len(chunk), dtype=bool)
+
+        for pos, user_id in enumerate(chunk):
+            frame.add_owner(storage.iter_records('transactions', user_id))
+            has_goals[pos] = bool(storage.get_user_goals(user_id))
+            has_investments[pos] = bool(storage.get_user_investments(user_id))
+
+        totals = summarize_frame(frame, start, end)
+        chunk_scores = health_scores(totals['income'], totals['expenses'], has_goals, has_investments)
+
+        for user_id, score in zip(chunk, chunk_scores.tolist()):
+            if save and not _save_score(storage, user_id, score):
+                continue
+            scores[user_id] = score
+
+    return scores
+
+
+def _save_score(storage: Storage, user_id: int, score: int) -> bool:
+    """Запись оценки в профиль; False - профиля нет"""
+    with storage.user_lock(user_id):
+        user_data = storage.get_user_data(user_id)
+        if not user_data:
+            return False
+        if user_data.get('financial_health') != score:
+            user_data['financial_health'] = score
+            storage.save_user_data(user_id, user_data)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пересчет financial_health всех пользователей')
+    parser.add_argument('--period', default='month', help='month, year, all, week или YYYY-MM')
+    parser.add_argument('--dry-run', action='store_true', help='только вывести оценки')
+    args = parser.parse_args()
+
+    from api import storage_from_config
+
+    storage = storage_from_config()
+    scores = batch_health_scores(storage, period=args.period, save=not args.dry_run)
+    for user_id, score in scores.items():
+        print(f"{user_id}\t{score}")
+    print(f"Пользователей: {len(scores)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,764 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Flask API финансового трекера: все роуты Web App в одном месте
+create_app(storage) собирает приложение для bot.py, app.py (WSGI, gunicorn)
+и asgi.py (ASGI-сервер через asgiref)
+"""
+
+import atexit
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+from flask import Blueprint, Flask, current_app, request, jsonify
+from flask.json.provider import JSONProvider
+from flask_cors import CORS
+
+import serializers
+
+from analytics import user_analytics
+from categorizer import Categorizer
+from exporter import gzip_stream, stream_csv, stream_json, stream_ndjson
+from goal_scheduler import GoalScheduler, derive_goal_fields
+from importer import PARSERS, StatementError, detect_format, import_statement, open_text
+from metrics import Metrics, SamplingProfiler, TimedStorage, instrument_app
+from portfolio import FilePriceProvider, PortfolioEngine, PriceTable
+from response_cache import ResponseCache, make_etag
+from storage import Storage, create_storage
+import config
+
+# Откуда разрешены запросы к API (GitHub Pages с Web App)
+CORS_ORIGINS = ["https://alanka1200.github.io"]
+
+api = Blueprint('api', __name__)
+
+class FastJSONProvider(JSONProvider):
+    """jsonify и request.json через serializers (orjson/msgspec, если установлены)"""
+    
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return serializers.dumps(obj)
+    
+    def loads(self, s, **kwargs) -> Any:
+        return serializers.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Тело ответа кодируется сразу в байты, без промежуточной строки"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serializers.dumps_bytes(obj), mimetype='application/json')
+
+def storage_from_config() -> Storage:
+    """Хранилище по настройкам из config (закрывается при выходе процесса)"""
+    storage = create_storage(
+        config.STORAGE_BACKEND,
+        path=config.SQLITE_PATH,
+        columnar=config.COLUMNAR_TRANSACTIONS,
+        snapshot_format=config.SNAPSHOT_FORMAT,
+        data_file=config.DATA_FILE_PATH if config.PERSISTENCE_ENABLED else None,
+        legacy_data_file=config.LEGACY_DATA_FILE_PATH,
+        fsync_interval=config.WAL_FSYNC_INTERVAL,
+        compact_interval=config.SNAPSHOT_INTERVAL,
+        max_resident_users=config.MAX_RESIDENT_USERS,
+        max_resident_records=config.MAX_RESIDENT_RECORDS
+    )
+    atexit.register(storage.close)
+    return storage
+
+def create_app(storage: Optional[Storage] = None) -> Flask:
+    """Flask-приложение со всеми роутами API поверх storage (по умолчанию - из config)"""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    CORS(app, origins=CORS_ORIGINS)
+    
+    storage = storage if storage is not None else storage_from_config()
+    app.extensions['response_cache'] = ResponseCache(config.RESPONSE_CACHE_MAX_BYTES)
+    
+    # Планировщик работает с хранилищем напрямую - его проходы не попадают в метрики роутов
+    scheduler = app.extensions['goal_scheduler'] = GoalScheduler(storage)
+    if config.GOAL_SCHEDULER_ENABLED:
+        scheduler.start(resident_pass=config.GOAL_SCHEDULER_RESIDENT_PASS)
+        atexit.register(scheduler.stop)
+    
+    app.extensions['categorizer'] = Categorizer(storage)
+    
+    provider = FilePriceProvider(config.PRICES_FILE) if config.PRICES_FILE else None
+    portfolio = app.extensions['portfolio'] = PortfolioEngine(storage, PriceTable(provider))
+    if provider is not None:
+        portfolio.prices.refresh()
+        portfolio.start(config.PRICE_REFRESH_INTERVAL)
+        atexit.register(portfolio.stop)
+    
+    if config.METRICS_ENABLED:
+        metrics = app.extensions['metrics'] = Metrics()
+        storage = TimedStorage(storage, metrics)
+        profiler = SamplingProfiler(config.PROFILE_SAMPLE_RATE, config.PROFILE_SLOW_MS, config.PROFILE_DIR)
+        instrument_app(app, metrics, profiler)
+    
+    app.extensions['storage'] = storage
+    app.register_blueprint(api)
+    return app
+
+def create_asgi_app(storage: Optional[Storage] = None):
+    """То же приложение для ASGI-сервера (uvicorn, hypercorn); нужен пакет asgiref"""
+    try:
+        from asgiref.wsgi import WsgiToAsgi
+    except ImportError as e:
+        raise RuntimeError("Для запуска под ASGI установите asgiref: pip install asgiref") from e
+    
+    return WsgiToAsgi(create_app(storage))
+
+def get_storage() -> Storage:
+    """Хранилище текущего приложения"""
+    return current_app.extensions['storage']
+
+def get_goal_scheduler() -> GoalScheduler:
+    """Планировщик пересчета целей текущего приложения"""
+    return current_app.extensions['goal_scheduler']
+
+def get_categorizer() -> Categorizer:
+    """Правила автоматической категоризации текущего приложения"""
+    return current_app.extensions['categorizer']
+
+def get_portfolio() -> PortfolioEngine:
+    """Оценка инвестиций текущего приложения"""
+    return current_app.extensions['portfolio']
+
+# ========== FLASK API ДЛЯ WEB APP ==========
+
+@api.route('/')
+def home():
+    """Проверка доступности сервиса"""
+    return jsonify({
+        "status": "online",
+        "service": "Finance Tracker API",
+        "version": "1.0"
+    })
+
+@api.route('/api/stats', methods=['GET'])
+def stats():
+    """Счетчики хранилища и кеша ответов (попадания, промахи, вытеснения)"""
+    return jsonify({
+        'storage': get_storage().stats(),
+        'response_cache': current_app.extensions['response_cache'].stats(),
+        'goals': get_goal_scheduler().stats(),
+        'portfolio': get_portfolio().stats(),
+        'categorizer': get_categorizer().stats()
+    })
+
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    metrics = current_app.extensions.get('metrics')
+    if metrics is None:
+        return jsonify({'error': 'Metrics disabled'}), 404
+    
+    body = metrics.render({
+        'finance_storage': get_storage().stats(),
+        'finance_response_cache': current_app.extensions['response_cache'].stats(),
+        'finance_goals': get_goal_scheduler().stats(),
+        'finance_portfolio': get_portfolio().stats(),
+        'finance_categorizer': get_categorizer().stats()
+    })
+    return current_app.response_class(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api.route('/api/analytics', methods=['GET'])
+def analytics():
+    """API: Сводка, структура расходов и оценка финансового здоровья за период"""
+    data_manager = get_storage()
+    user_id = request.args.get('user_id', type=int)
+    period = request.args.get('period', 'month')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    try:
+        data_manager.period_bounds(period)
+    except ValueError:
+        return jsonify({'error': 'Invalid period'}), 400
+    
+    with data_manager.read_snapshot(user_id):
+        result = user_analytics(data_manager, user_id, period)
+    return jsonify({'success': True, **result})
+
+@api.route('/api/balance_series', methods=['GET'])
+def balance_series():
+    """API: Баланс по дням для графика динамики (week, month, year, all)"""
+    data_manager = get_storage()
+    user_id = request.args.get('user_id', type=int)
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    try:
+        with data_manager.read_snapshot(user_id):
+            series = data_manager.get_balance_series(
+                user_id, request.args.get('period', 'month'), request.args.get('points', type=int)
+            )
+    except ValueError:
+        return jsonify({'error': 'Invalid period'}), 400
+    
+    return jsonify({'success': True, **series})
+
+# Формат экспорта -> (генератор, MIME-тип, расширение файла)
+EXPORT_FORMATS = {
+    'json': (stream_json, 'application/json', 'json'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (stream_csv, 'text/csv', 'csv'),
+}
+
+@api.route('/api/user_data', methods=['GET'])
+def get_user_data():
+    """
+    API: Получение данных пользователя.
+    ETag - ревизия данных: клиент с актуальной копией получает 304,
+    а сериализованный ответ берется из кеша, пока ревизия не изменится
+    """
+    data_manager = get_storage()
+    cache = current_app.extensions['response_cache']
+    user_id = request.args.get('user_id', type=int)
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    # Цели со вчерашними days_left/daily и позиции по устаревшим ценам
+    # пересчитываются до расчета ревизии
+    get_goal_scheduler().ensure_fresh(user_id)
+    get_portfolio().ensure_fresh(user_id)
+    
+    with data_manager.read_snapshot(user_id):
+        etag = make_etag(data_manager.sync_epoch, data_manager.get_revision(user_id))
+        
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        body = cache.get(user_id, etag)
+        if body is None:
+            user_data = data_manager.get_user_data(user_id)
+            
+            if not user_data:
+                return jsonify({'error': 'User not found'}), 404
+            
+            # Добавляем транзакции, цели и инвестиции (в копию, не в хранимую запись)
+            user_data = dict(user_data)
+            user_data['transactions'] = data_manager.get_user_transactions(user_id)
+            user_data['goals'] = data_manager.get_user_goals(user_id)
+            user_data['investments'] = data_manager.get_user_investments(user_id)
+            
+            body = serializers.dumps_bytes(user_data)
+            cache.put(user_id, etag, body)
+    
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@api.route('/api/sync', methods=['GET'])
+def sync():
+    """
+    API: Изменения данных пользователя после ревизии клиента
+    (?since=<revision>&epoch=<epoch> из предыдущего ответа; без них - полная выгрузка)
+    """
+    data_manager = get_storage()
+    user_id = request.args.get('user_id', type=int)
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    since = request.args.get('since', type=int)
+    if since is not None and since < 0:
+        return jsonify({'error': 'Invalid revision'}), 400
+    
+    get_goal_scheduler().ensure_fresh(user_id)
+    get_portfolio().ensure_fresh(user_id)
+    changes = data_manager.get_sync(user_id, since, request.args.get('epoch'))
+    
+    if changes['full'] and not changes['user']:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify(changes)
+
+def _parse_query_date(value, end_of_day=False):
+    """Граница периода из query-параметра: '2024-02-01', '01.02.2024' или ISO"""
+    if not value:
+        return None
+    
+    for fmt in ('%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            date = datetime.strptime(value, fmt)
+            return date + timedelta(days=1, microseconds=-1) if end_of_day else date
+        except ValueError:
+            continue
+    
+    return datetime.fromisoformat(value)
+
+@api.route('/api/transactions', methods=['GET'])
+def get_transactions():
+    """API: Транзакции пользователя за период (с фильтром по типу)"""
+    data_manager = get_storage()
+    user_id = request.args.get('user_id', type=int)
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    try:
+        start = _parse_query_date(request.args.get('from'))
+        end = _parse_query_date(request.args.get('to'), end_of_day=True)
+    except ValueError:
+        return jsonify({'error': 'Invalid date'}), 400
+    
+    transactions = data_manager.get_transactions_range(
+        user_id, start, end, type=request.args.get('type')
+    )
+    
+    return jsonify({'success': True, 'transactions': transactions, 'count': len(transactions)})
+
+@api.route('/api/search', methods=['GET'])
+def search_transactions():
+    """API: Поиск транзакций по описанию и категории (новые первыми, по страницам)"""
+    data_manager = get_storage()
+    user_id = request.args.get('user_id', type=int)
+    query = (request.args.get('q') or '').strip()
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    if not query:
+        return jsonify({'error': 'Query required'}), 400
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', config.SEARCH_PAGE_SIZE, type=int)
+    if page < 1 or not 1 <= per_page <= config.SEARCH_PAGE_SIZE_MAX:
+        return jsonify({'error': 'Invalid page'}), 400
+    
+    total, transactions = data_manager.search_transactions(user_id, query, (page - 1) * per_page, per_page)
+    
+    return jsonify({
+        'success': True,
+        'query': query,
+        'transactions': transactions,
+        'total': total,
+        'page': page,
+        'pages': -(-total // per_page)
+    })
+
+@api.route('/api/summary', methods=['GET'])
+def get_summary():
+    """API: Финансовая сводка за период (week, month, year, all или YYYY-MM)"""
+    data_manager = get_storage()
+    user_id = request.args.get('user_id', type=int)
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    try:
+        summary = data_manager.get_summary(user_id, request.args.get('period', 'month'))
+    except ValueError:
+        return jsonify({'error': 'Invalid period'}), 400
+    
+    return jsonify(summary)
+
+# ========== ОПЕРАЦИИ НАД ДАННЫМИ (общие для одиночных роутов и /api/batch) ==========
+
+def _balance_delta(transaction):
+    """Влияние транзакции на баланс"""
+    amount = float(transaction.get('amount', 0) or 0)
+    return amount if transaction.get('type') == 'income' else -amount
+
+def _update_balance(user_id, delta):
+    """Изменение баланса и пересчет месячных показателей по нарастающим итогам"""
+    data_manager = get_storage()
+    user_data = data_manager.get_user_data(user_id)
+    if user_data:
+        user_data['balance'] += delta
+        data_manager.refresh_monthly_stats(user_id, user_data)
+
+def _refresh_investments_total(user_id):
+    """Пересчет общей суммы инвестиций пользователя"""
+    data_manager = get_storage()
+    user_data = data_manager.get_user_data(user_id)
+    if user_data:
+        investments = data_manager.get_user_investments(user_id)
+        total_investments = sum(inv['amount'] for inv in investments)
+        user_data['investments_total'] = total_investments
+        data_manager.save_user_data(user_id, user_data)
+
+def _build_transaction(data):
+    """Транзакция из данных запроса"""
+    return {
+        'id': data.get('id', datetime.now().timestamp()),
+        'type': data.get('type', 'expense'),
+        'category': data.get('category', 'other'),
+        'amount': float(data.get('amount', 0)),
+        'description': data.get('description', ''),
+        'date': data.get('date', datetime.now().strftime('%d.%m.%Y, %H:%M'))
+    }
+
+def _build_goal(data):
+    """Цель из данных запроса с расчетом прогресса и ежедневного взноса"""
+    goal = {
+        'id': data.get('id', datetime.now().timestamp()),
+        'name': data.get('name', 'Новая цель'),
+        'category': data.get('category', 'other'),
+        'current': float(data.get('current', 0)),
+        'target': float(data.get('target', 10000)),
+        'deadline': data.get('deadline', '2024-12-31'),
+        'created': data.get('created', datetime.now().strftime('%Y-%m-%d'))
+    }
+    
+    # Прогресс, дни до дедлайна и ежедневный взнос на сегодня
+    goal.update(derive_goal_fields(goal, date.today()))
+    
+    return goal
+
+def _build_investment(data):
+    """
+    Инвестиция из данных запроса: количество разбирается из count,
+    при известной цене инструмента стоимость считается по ней, затем прибыль
+    """
+    investment = {
+        'id': data.get('id', datetime.now().timestamp()),
+        'name': data.get('name', 'Новая инвестиция'),
+        'type': data.get('type', 'Акции'),
+        'amount': float(data.get('amount', 0)),
+        'count': data.get('count', '1 шт.'),
+        'invested': float(data.get('invested', 0)),
+        'buy_date': data.get('buy_date', datetime.now().strftime('%Y-%m-%d'))
+    }
+    if data.get('ticker'):
+        investment['ticker'] = str(data['ticker'])
+    if data.get('quantity') is not None:
+        investment['quantity'] = float(data['quantity'])
+    
+    return get_portfolio().value(investment)
+
+def _apply_transaction(user_id, transaction):
+    """Сохранение транзакции (под user_lock), возвращает изменение баланса"""
+    data_manager = get_storage()
+    # Транзакция без категории получает её по правилам пользователя
+    get_categorizer().categorize(user_id, transaction)
+    
+    # При редактировании отменяем влияние прежней версии на баланс
+    previous = data_manager.get_transaction(user_id, transaction['id'])
+    delta = _balance_delta(transaction)
+    if previous:
+        delta -= _balance_delta(previous)
+    
+    # Сохраняем транзакцию (итоги по месяцам обновляются в DataManager)
+    data_manager.add_transaction(user_id, transaction)
+    return delta
+
+def _apply_delete(user_id, item_type, item_id):
+    """Удаление транзакции, цели или инвестиции (под user_lock), возвращает изменение баланса"""
+    data_manager = get_storage()
+    if item_type == 'transaction':
+        transaction = data_manager.get_transaction(user_id, item_id)
+        data_manager.delete_transaction(user_id, item_id)
+        return -_balance_delta(transaction) if transaction else 0.0
+    
+    if item_type == 'goal':
+        data_manager.delete_goal(user_id, item_id)
+    elif item_type == 'investment':
+        data_manager.delete_investment(user_id, item_id)
+    return 0.0
+
+# ========== РОУТЫ ИЗМЕНЕНИЯ ДАННЫХ ==========
+
+@api.route('/api/update_transaction', methods=['POST'])
+def update_transaction():
+    """API: Добавление новой транзакции или изменение существующей"""
+    data_manager = get_storage()
+    data = request.json
+    user_id = data.get('user_id')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    transaction = _build_transaction(data)
+    
+    # Чтение-изменение-запись баланса атомарно относительно других запросов пользователя
+    with data_manager.user_lock(user_id):
+        delta = _apply_transaction(user_id, transaction)
+        _update_balance(user_id, delta)
+    
+    return jsonify({'success': True, 'transaction': transaction})
+
+@api.route('/api/update_goal', methods=['POST'])
+def update_goal():
+    """API: Добавление/обновление цели"""
+    data_manager = get_storage()
+    data = request.json
+    user_id = data.get('user_id')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    goal = _build_goal(data)
+    data_manager.save_goal(user_id, goal)
+    get_goal_scheduler().track(user_id)
+    
+    return jsonify({'success': True, 'goal': goal})
+
+@api.route('/api/update_investment', methods=['POST'])
+def update_investment():
+    """API: Добавление/обновление инвестиции"""
+    data_manager = get_storage()
+    data = request.json
+    user_id = data.get('user_id')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    investment = _build_investment(data)
+    
+    with data_manager.user_lock(user_id):
+        data_manager.save_investment(user_id, investment)
+        get_portfolio().track(user_id, investment)
+        
+        # Обновляем общую сумму инвестиций
+        _refresh_investments_total(user_id)
+    
+    return jsonify({'success': True, 'investment': investment})
+
+@api.route('/api/delete_item', methods=['POST'])
+def delete_item():
+    """API: Удаление транзакции, цели или инвестиции"""
+    data_manager = get_storage()
+    data = request.json
+    user_id = data.get('user_id')
+    item_type = data.get('type')  # 'transaction', 'goal', 'investment'
+    item_id = data.get('id')
+    
+    if not all([user_id, item_type, item_id]):
+        return jsonify({'error': 'Missing parameters'}), 400
+    
+    with data_manager.user_lock(user_id):
+        delta = _apply_delete(user_id, item_type, item_id)
+        if item_type == 'transaction':
+            _update_balance(user_id, delta)
+        elif item_type == 'investment':
+            _refresh_investments_total(user_id)
+    
+    return jsonify({'success': True})
+
+def _prepare_operation(operation):
+    """Разбор операции пакета: (имя, данные); ошибка - ValueError"""
+    if not isinstance(operation, dict):
+        raise ValueError('Operation must be an object')
+    
+    name = operation.get('op')
+    if name == 'update_transaction':
+        return name, _build_transaction(operation)
+    if name == 'update_goal':
+        return name, _build_goal(operation)
+    if name == 'update_investment':
+        return name, _build_investment(operation)
+    if name == 'delete_item':
+        item_type = operation.get('type')
+        if item_type not in ('transaction', 'goal', 'investment') or not operation.get('id'):
+            raise ValueError('Missing parameters')
+        return name, (item_type, operation['id'])
+    
+    raise ValueError(f'Unknown operation: {name}')
+
+@api.route('/api/batch', methods=['POST'])
+def batch():
+    """
+    API: Пакет операций одного пользователя.
+    operations - список {'op': update_transaction | update_goal | update_investment |
+    delete_item, ...поля как у одиночного роута}; применяется по порядку под одной
+    блокировкой пользователя и с одним сбросом журнала на диск
+    """
+    data_manager = get_storage()
+    data = request.json
+    user_id = data.get('user_id')
+    operations = data.get('operations')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Operations list required'}), 400
+    
+    if len(operations) > config.BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'Too many operations (max {config.BATCH_MAX_OPERATIONS})'}), 400
+    
+    # Сначала разбираем весь пакет: если хоть одна операция некорректна, не применяем ничего
+    prepared = []
+    errors = []
+    for index, operation in enumerate(operations):
+        try:
+            prepared.append(_prepare_operation(operation))
+        except (TypeError, ValueError) as e:
+            errors.append({'index': index, 'error': str(e)})
+    
+    if errors:
+        return jsonify({'success': False, 'errors': errors}), 400
+    
+    results = []
+    with data_manager.user_lock(user_id), data_manager.batch():
+        delta = 0.0
+        transactions_changed = False
+        investments_changed = False
+        
+        for name, item in prepared:
+            if name == 'update_transaction':
+                delta += _apply_transaction(user_id, item)
+                transactions_changed = True
+                results.append({'success': True, 'transaction': item})
+            elif name == 'update_goal':
+                data_manager.save_goal(user_id, item)
+                get_goal_scheduler().track(user_id)
+                results.append({'success': True, 'goal': item})
+            elif name == 'update_investment':
+                data_manager.save_investment(user_id, item)
+                get_portfolio().track(user_id, item)
+                investments_changed = True
+                results.append({'success': True, 'investment': item})
+            else:
+                item_type, item_id = item
+                delta += _apply_delete(user_id, item_type, item_id)
+                transactions_changed = transactions_changed or item_type == 'transaction'
+                investments_changed = investments_changed or item_type == 'investment'
+                results.append({'success': True})
+        
+        # Баланс и производные показатели пересчитываются один раз на пакет
+        if transactions_changed:
+            _update_balance(user_id, delta)
+        if investments_changed:
+            _refresh_investments_total(user_id)
+    
+    return jsonify({'success': True, 'results': results})
+
+@api.route('/api/import', methods=['POST'])
+def import_data():
+    """
+    API: Импорт банковской выписки (multipart: file, user_id, format=csv|ofx,
+    encoding). Файл разбирается потоково и применяется порциями
+    """
+    data_manager = get_storage()
+    
+    # Размер проверяется до чтения формы - иначе Werkzeug сначала примет все тело;
+    # без Content-Length (chunked) размер заранее не известен
+    if request.content_length is None:
+        return jsonify({'error': 'Content-Length required'}), 411
+    if request.content_length > config.IMPORT_MAX_BYTES:
+        return jsonify({'error': 'File too large'}), 413
+    
+    user_id = request.form.get('user_id', type=int)
+    upload = request.files.get('file')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    if upload is None:
+        return jsonify({'error': 'File required'}), 400
+    
+    file_format = request.form.get('format') or detect_format(upload.filename or '')
+    if file_format not in PARSERS:
+        return jsonify({'error': 'Invalid format'}), 400
+    
+    if not data_manager.get_user_data(user_id):
+        return jsonify({'error': 'User not found'}), 404
+    
+    try:
+        stream = open_text(upload.stream, request.form.get('encoding', 'utf-8-sig'))
+        report = import_statement(data_manager, user_id, stream, file_format,
+                                  matcher=get_categorizer().matcher_for(user_id))
+    except LookupError:
+        return jsonify({'error': 'Unknown encoding'}), 400
+    except StatementError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'success': True, **report})
+
+@api.route('/api/category_rules', methods=['GET', 'POST'])
+def category_rules():
+    """
+    API: Правила автоматической категоризации пользователя.
+    POST {user_id, rules: [{category, keywords, pattern, min_amount, max_amount, type}]}
+    заменяет правила целиком; они проверяются раньше глобальных
+    """
+    categorizer = get_categorizer()
+    
+    if request.method == 'GET':
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'User ID required'}), 400
+        return jsonify({'success': True, 'rules': categorizer.get_rules(user_id)})
+    
+    data = request.json
+    user_id = data.get('user_id')
+    rules = data.get('rules')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    if not isinstance(rules, list):
+        return jsonify({'error': 'Rules list required'}), 400
+    
+    if len(rules) > config.CATEGORY_RULES_MAX:
+        return jsonify({'error': f'Too many rules (max {config.CATEGORY_RULES_MAX})'}), 400
+    
+    try:
+        saved = categorizer.set_rules(user_id, rules)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if saved is None:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify({'success': True, 'rules': saved})
+
+@api.route('/api/export_data', methods=['GET'])
+def export_data():
+    """
+    API: Потоковый экспорт данных пользователя (format=json, ndjson или csv).
+    Если клиент принимает gzip, ответ сжимается на лету
+    """
+    data_manager = get_storage()
+    user_id = request.args.get('user_id', type=int)
+    format_type = request.args.get('format', 'json')
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    if format_type not in EXPORT_FORMATS:
+        return jsonify({'error': 'Invalid format'}), 400
+    
+    get_goal_scheduler().ensure_fresh(user_id)
+    get_portfolio().ensure_fresh(user_id)
+    user_data = data_manager.get_user_data(user_id)
+    
+    if not user_data:
+        return jsonify({'error': 'User not found'}), 404
+    
+    stream, mimetype, extension = EXPORT_FORMATS[format_type]
+    export_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    chunks = stream(data_manager, user_id, dict(user_data), export_date)
+    
+    headers = {}
+    if extension != 'json':
+        headers['Content-Disposition'] = f'attachment; filename=finance_data_{user_id}.{extension}'
+    if request.accept_encodings['gzip']:
+        chunks = gzip_stream(chunks)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    
+    return current_app.response_class(chunks, status=200, mimetype=mimetype, headers=headers)
+
+@api.route('/api/get_referral_link', methods=['GET'])
+def get_referral_link():
+    """API: Получение реферальной ссылки"""
+    user_id = request.args.get('user_id', type=int)
+    
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    # Генерируем реферальную ссылку
+    ref_link = f"https://t.me/{config.BOT_USERNAME}?start=ref_{user_id}"
+    
+    return jsonify({
+        'success': True,
+        'referral_link': ref_link,
+        'message': 'Пригласите друга и получите скидку 10%!'
+    })
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ASGI-точка входа API финансового трекера (те же роуты, что и app.py)
+
+    uvicorn asgi:app --workers 4
+"""
+
+from api import create_asgi_app
+
+app = create_asgi_app()
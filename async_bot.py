@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Асинхронный режим Telegram бота: вместо блокирующего polling обновления
+приходят на вебхук того же Flask-приложения, а обработчики выполняются
+корутинами в цикле событий фонового потока - медленный обработчик
+не задерживает остальные обновления
+
+    python async_bot.py            (или gunicorn async_bot:app)
+"""
+
+import asyncio
+import hmac
+import logging
+import threading
+from typing import Optional
+
+from flask import request, jsonify
+from telebot import asyncio_helper, types
+from telebot.async_telebot import AsyncTeleBot
+
+import config
+from async_storage import AsyncStorage
+from bot import app, data_manager
+from bot_messages import (
+    HELP_TEXT, RESET_CONFIRM_TEXT, RESET_DONE_TEXT, STATS_NOT_FOUND_TEXT,
+    new_user, reset_keyboard, stats_text, welcome_keyboard, welcome_text
+)
+
+logger = logging.getLogger(__name__)
+
+if config.TELEGRAM_API_URL:
+    asyncio_helper.API_URL = config.TELEGRAM_API_URL.rstrip('/') + '/bot{0}/{1}'
+
+async_bot = AsyncTeleBot(config.BOT_TOKEN)
+storage = AsyncStorage(data_manager)
+
+# ========== КОМАНДЫ БОТА ==========
+
+@async_bot.message_handler(commands=['start'])
+async def send_welcome(message):
+    """Обработка команды /start"""
+    user_id = message.from_user.id
+    username = message.from_user.username or f"user_{user_id}"
+    first_name = message.from_user.first_name or "Пользователь"
+
+    # Регистрируем пользователя в системе
+    if not await storage.get_user_data(user_id):
+        await storage.save_user_data(user_id, new_user(user_id, username, first_name))
+
+    await async_bot.send_message(
+        message.chat.id,
+        welcome_text(first_name),
+        parse_mode='Markdown',
+        reply_markup=welcome_keyboard(user_id)
+    )
+
+@async_bot.message_handler(commands=['help'])
+async def send_help(message):
+    """Помощь по командам"""
+    await async_bot.send_message(message.chat.id, HELP_TEXT, parse_mode='Markdown')
+
+@async_bot.message_handler(commands=['stats'])
+async def send_stats(message):
+    """Отправка краткой статистики"""
+    user_data = await storage.get_user_data(message.from_user.id)
+    text = stats_text(user_data) if user_data else STATS_NOT_FOUND_TEXT
+    await async_bot.send_message(message.chat.id, text, parse_mode='Markdown')
+
+@async_bot.message_handler(commands=['reset'])
+async def reset_data(message):
+    """Сброс данных пользователя"""
+    await async_bot.send_message(
+        message.chat.id,
+        RESET_CONFIRM_TEXT,
+        parse_mode='Markdown',
+        reply_markup=reset_keyboard(message.from_user.id)
+    )
+
+@async_bot.callback_query_handler(func=lambda call: call.data.startswith('reset_'))
+async def handle_reset(call):
+    """Обработка сброса данных"""
+    user_id = call.from_user.id
+    action = call.data.split('_')[1]
+
+    if action == 'confirm':
+        await storage.delete_user_data(user_id)
+        await async_bot.answer_callback_query(call.id, "✅ Данные успешно сброшены!")
+        await async_bot.send_message(call.message.chat.id, RESET_DONE_TEXT)
+    else:
+        await async_bot.answer_callback_query(call.id, "❌ Сброс отменен")
+        await async_bot.delete_message(call.message.chat.id, call.message.message_id)
+
+# ========== ЦИКЛ СОБЫТИЙ ==========
+
+class UpdateLoop:
+    """
+    Цикл событий в фоновом потоке: WSGI-воркер только передает в него
+    обновление и сразу отвечает Telegram, обработка идет конкурентно
+    (не больше max_concurrent обновлений одновременно)
+    """
+
+    def __init__(self, bot: AsyncTeleBot, max_concurrent: int = 256):
+        self.bot = bot
+        self.max_concurrent = max_concurrent
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Запуск потока цикла событий (повторный вызов ничего не делает)"""
+        with self._start_lock:
+            if self._thread is None:
+                self.loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrent)
+                self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+                self._thread.start()
+        return self.loop
+
+    def run(self, coro):
+        """Выполнение корутины в цикле и ожидание результата (из другого потока)"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def submit(self, update: types.Update):
+        """Передача обновления на обработку без ожидания"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._process(update), self.loop)
+
+    async def _process(self, update: types.Update):
+        async with self._semaphore:
+            try:
+                await self.bot.process_new_updates([update])
+            except Exception as e:
+                logger.error(f"Ошибка обработки обновления {update.update_id}: {e}")
+
+    def stop(self):
+        """Закрытие HTTP-сессии бота и остановка цикла"""
+        if self._thread is None:
+            return
+
+        self.run(self.bot.close_session())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+
+
+update_loop = UpdateLoop(async_bot, config.BOT_MAX_CONCURRENT_UPDATES)
+
+# ========== ВЕБХУК ==========
+
+@app.route(config.WEBHOOK_PATH, methods=['POST'])
+def telegram_webhook():
+    """Вебхук Telegram: обновление передается в цикл событий, ответ - сразу"""
+    if config.WEBHOOK_SECRET:
+        token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not hmac.compare_digest(token, config.WEBHOOK_SECRET):
+            return jsonify({'error': 'Forbidden'}), 403
+
+    payload = request.get_json(silent=True)
+    if not payload:
+        return jsonify({'error': 'Invalid update'}), 400
+
+    update_loop.submit(types.Update.de_json(payload))
+    return jsonify({'success': True})
+
+def setup_webhook() -> bool:
+    """Регистрация вебхука в Telegram (WEBHOOK_URL + WEBHOOK_PATH)"""
+    if not config.WEBHOOK_URL:
+        logger.warning("WEBHOOK_URL не задан - вебхук не зарегистрирован")
+        return False
+
+    return update_loop.run(async_bot.set_webhook(
+        url=config.WEBHOOK_URL.rstrip('/') + config.WEBHOOK_PATH,
+        secret_token=config.WEBHOOK_SECRET or None,
+        max_connections=100
+    ))
+
+if __name__ == '__main__':
+    logger.info("Запуск бота в режиме вебхука...")
+    setup_webhook()
+
+    try:
+        app.run(
+            host='0.0.0.0',
+            port=config.WEB_APP_PORT,
+            debug=config.DEBUG,
+            use_reloader=False,
+            threaded=True
+        )
+    finally:
+        update_loop.stop()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Асинхронный фасад хранилища для обработчиков-корутин
+Вызовы Storage выполняются в пуле потоков, поэтому медленный диск
+или блокировка пользователя не останавливают цикл событий
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from storage import Storage
+
+
+class AsyncStorage:
+    """Те же методы, что у Storage, но в виде корутин"""
+
+    def __init__(self, storage: Storage, executor: Optional[ThreadPoolExecutor] = None):
+        self.storage = storage
+        # None - пул потоков цикла событий по умолчанию
+        self._executor = executor
+
+    async def run(self, func, *args, **kwargs):
+        """Выполнение произвольного синхронного вызова в пуле потоков"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        """storage.get_user_data(...) -> await async_storage.get_user_data(...)"""
+        method = getattr(self.storage, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        # Кешируем обертку, чтобы не создавать её при каждом вызове
+        setattr(self, name, wrapper)
+        return wrapper
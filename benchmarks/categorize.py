@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пропускная способность категоризации: собранный CategoryMatcher против
+проверки правил по очереди, и категоризация через кеш Categorizer
+
+    python benchmarks/categorize.py --descriptions 100000 --user-rules 50
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from categorizer import GLOBAL_RULES, CategoryMatcher, Categorizer, normalize_rule, normalize_text  # noqa: E402
+from storage import create_storage  # noqa: E402
+
+WORDS = ('Оплата', 'покупка', 'в', 'магазине', 'ООО', 'Ромашка', 'перевод', 'по', 'номеру', 'карты',
+         'Москва', 'RUS', 'СБП', 'Бензин', 'Продукты', 'на', 'неделю', 'Такси', 'Аптека', 'Кофейня',
+         'Пятёрочка', 'Зарплата', 'Кинотеатр', 'Литрес', 'Аэрофлот')
+
+
+class NaiveMatcher:
+    """Правила по очереди: каждое ключевое слово - отдельным поиском"""
+
+    def __init__(self, rules):
+        self.rules = []
+        for rule in map(normalize_rule, rules):
+            keywords = [re.compile(r'\b' + re.escape(keyword)) for keyword in rule['keywords']]
+            pattern = re.compile(rule['pattern'], re.IGNORECASE) if rule.get('pattern') else None
+            self.rules.append((rule, keywords, pattern))
+
+    def match(self, description, amount=None, tx_type=None):
+        text = normalize_text(description)
+        for rule, keywords, pattern in self.rules:
+            if 'type' in rule and tx_type is not None and rule['type'] != tx_type:
+                continue
+            if amount is not None and not rule.get('min_amount', amount) <= amount <= rule.get('max_amount', amount):
+                continue
+            if keywords and any(keyword.search(text) for keyword in keywords):
+                return rule['category']
+            if pattern is not None and pattern.search(description):
+                return rule['category']
+            if not keywords and pattern is None:
+                return rule['category']
+        return None
+
+
+def user_rules(count: int, rnd: random.Random) -> list:
+    """Синтетические правила пользователя: ключевые слова и немного выражений"""
+    rules = []
+    for i in range(count):
+        if i % 10 == 9:
+            rules.append({'category': f'правило {i}', 'pattern': rf'\bчек\s*{i}\b'})
+        else:
+            rules.append({'category': f'правило {i}',
+                          'keywords': [f'магазин{i}', f'сеть {rnd.choice(WORDS).lower()}{i}']})
+    return rules
+
+
+def timed(func, items) -> dict:
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - started
+    return {'us_per_item': round(elapsed / len(items) * 1e6, 2), 'items_per_s': round(len(items) / elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--descriptions', type=int, default=100000)
+    parser.add_argument('--user-rules', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    items = [(' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 7))) + f' {rnd.randint(1, 9999)}',
+              rnd.randint(100, 100000) / 100, rnd.choice(('expense', 'expense', 'income')))
+             for _ in range(args.descriptions)]
+    rules = user_rules(args.user_rules, rnd) + GLOBAL_RULES
+
+    started = time.perf_counter()
+    matcher = CategoryMatcher(rules)
+    print(f"Сборка {len(rules)} правил: {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    naive = NaiveMatcher(rules)
+    mismatches = sum(matcher.match(*item) != naive.match(*item) for item in items[:5000])
+    print(f"Расхождений с проверкой по очереди (5000 описаний): {mismatches}")
+
+    print(f"CategoryMatcher:           {timed(lambda item: matcher.match(*item), items)}")
+    print(f"Правила по очереди:        {timed(lambda item: naive.match(*item), items)}")
+
+    storage = create_storage('memory')
+    storage.save_user_data(1, {'user_id': 1, 'balance': 0})
+    categorizer = Categorizer(storage)
+    categorizer.set_rules(1, rules[:args.user_rules])
+    transactions = [{'description': description, 'amount': amount, 'type': tx_type, 'category': 'other'}
+                    for description, amount, tx_type in items]
+    print(f"Categorizer (кеш, по одной): {timed(lambda tx: categorizer.categorize(1, dict(tx)), transactions)}")
+
+    started = time.perf_counter()
+    assigned = categorizer.matcher_for(1).apply_many(dict(tx) for tx in transactions)
+    elapsed = time.perf_counter() - started
+    print(f"apply_many: {round(len(transactions) / elapsed)} транзакций/с, категория назначена {assigned}")
+    storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Импорт большой CSV-выписки: первый проход (все строки новые) и повторный
+(все строки - дубликаты), строк в секунду и прирост пиковой памяти процесса
+
+    python benchmarks/import_statement.py --rows 100000 --backend memory
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importer import IMPORT_BATCH_SIZE, import_statement  # noqa: E402
+from storage import create_storage  # noqa: E402
+
+DESCRIPTIONS = ('ПЯТЕРОЧКА 1234', 'Яндекс Такси', 'OZON.RU', 'Перевод от Ивана И.',
+                'АЗС Лукойл', 'Кофейня', 'Аптека 36.6', 'Зарплата')
+
+
+def write_statement(path: str, rows: int, seed: int):
+    """
+    CSV в формате выгрузки банка: ';', операции по времени, дата с секундами,
+    сумма со знаком и десятичной запятой
+    """
+    rnd = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    moments = sorted(rnd.randint(0, 60 * 24 * 700) for _ in range(rows))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('Дата операции;Сумма операции;Описание;Категория\n')
+        for minutes in moments:
+            moment = start + timedelta(minutes=minutes)
+            description = rnd.choice(DESCRIPTIONS)
+            amount = rnd.randint(5000, 9000000) / 100 if description == 'Зарплата' else -rnd.randint(100, 500000) / 100
+            amount = f"{amount:.2f}".replace('.', ',')
+            f.write(f"{moment:%d.%m.%Y %H:%M:%S};{amount};{description};\n")
+
+
+def max_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 / 1024 if sys.platform == 'darwin' else usage / 1024
+
+
+def run(storage, user_id: int, path: str, batch_size: int) -> dict:
+    started = time.perf_counter()
+    with open(path, encoding='utf-8', newline='') as f:
+        report = import_statement(storage, user_id, f, 'csv', batch_size)
+    elapsed = time.perf_counter() - started
+    return {'seconds': round(elapsed, 2), 'rows_per_s': round(sum(
+        report[key] for key in ('imported', 'duplicates', 'errors')) / elapsed), **{
+        key: report[key] for key in ('imported', 'duplicates', 'errors')}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--columnar', action='store_true', help='колоночное хранение транзакций')
+    parser.add_argument('--persist', action='store_true', help='журнал на диске (для memory)')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'statement.csv')
+    write_statement(path, args.rows, args.seed)
+    print(f"Выписка: {args.rows} строк, {os.path.getsize(path) / 1024 / 1024:.1f} МБ")
+
+    storage = create_storage(args.backend, path=os.path.join(directory, 'bench.db'), columnar=args.columnar,
+                             data_file=os.path.join(directory, 'data') if args.persist else None)
+    user_id = 1
+    storage.save_user_data(user_id, {'user_id': user_id, 'balance': 0})
+
+    rss_before = max_rss_mb()
+    first = run(storage, user_id, path, args.batch_size)
+    print(f"Первый импорт:    {first}")
+    second = run(storage, user_id, path, args.batch_size)
+    print(f"Повторный импорт: {second}")
+    print(f"Баланс: {storage.get_user_data(user_id)['balance']:.2f}")
+    print(f"Прирост пиковой памяти: {max_rss_mb() - rss_before:.1f} МБ")
+    storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Память на одну транзакцию: TransactionStore (словари) против
+ColumnarTransactionStore (колонки)
+
+    python benchmarks/memory_per_transaction.py --count 20000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar_store import ColumnarTransactionStore  # noqa: E402
+from record_store import DATE_FORMAT, TransactionStore  # noqa: E402
+
+CATEGORIES = ['еда', 'транспорт', 'зарплата', 'развлечения', 'здоровье', 'жилье', 'other']
+DESCRIPTIONS = ['Продукты на неделю', 'Бензин', 'Зарплата', 'Кафе', 'Аптека', 'Аренда', '']
+
+
+def generate_transactions(count: int, seed: int = 42) -> list:
+    """Синтетические транзакции в том виде, в каком они приходят из JSON"""
+    rnd = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    transactions = []
+    for i in range(count):
+        date = start + timedelta(minutes=rnd.randint(0, 3 * 365 * 24 * 60))
+        transactions.append({
+            'id': 1700000000 + i + rnd.random(),
+            'type': 'income' if rnd.random() < 0.2 else 'expense',
+            'category': rnd.choice(CATEGORIES),
+            'amount': float(rnd.randint(100, 50000)),
+            'description': f'{rnd.choice(DESCRIPTIONS)} #{i}',
+            'date': date.strftime(DATE_FORMAT)
+        })
+    # Прогон через JSON: у каждой записи свои объекты строк, как после загрузки файла
+    return json.loads(json.dumps(transactions, ensure_ascii=False))
+
+
+def measure(store_class, count: int) -> float:
+    """Байт на транзакцию, удерживаемых хранилищем"""
+    payload = json.dumps(generate_transactions(count), ensure_ascii=False)
+    gc.collect()
+
+    tracemalloc.start()
+    store = store_class(json.loads(payload))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(store) == count
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {
+        store_class.__name__: round(measure(store_class, args.count), 1)
+        for store_class in (TransactionStore, ColumnarTransactionStore)
+    }
+    print(json.dumps({'count': args.count, 'bytes_per_transaction': results},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
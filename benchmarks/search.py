@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск по транзакциям пользователя: обратный индекс хранилища против полного
+прохода (реализация Storage по умолчанию), построение индекса и его
+обновление при добавлении и удалении
+
+    python benchmarks/search.py --transactions 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from record_store import DATE_FORMAT  # noqa: E402
+from storage import Storage, create_storage  # noqa: E402
+
+WORDS = ('Оплата', 'покупка', 'в', 'магазине', 'ООО', 'Ромашка', 'перевод', 'по', 'номеру', 'карты',
+         'Москва', 'RUS', 'СБП', 'Бензин', 'Продукты', 'на', 'неделю', 'Такси', 'Аптека', 'Кофейня',
+         'Пятёрочка', 'Зарплата', 'Кинотеатр', 'Литрес', 'Аэрофлот')
+CATEGORIES = ('еда', 'транспорт', 'здоровье', 'развлечения', 'зарплата', 'other')
+QUERIES = ('бензин', 'пятер', 'аптека москва', 'такси 12', 'кофе еда', 'п', 'ромашка неделю карты', 'нет такого')
+
+
+def timed(func, repeat: int) -> float:
+    """Среднее время вызова, мкс"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--columnar', action='store_true', help='колоночное хранение транзакций')
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    storage = create_storage(args.backend, path=os.path.join(tempfile.mkdtemp(), 'bench.db'),
+                             columnar=args.columnar)
+    user_id = 1
+    storage.save_user_data(user_id, {'user_id': user_id, 'balance': 0})
+    start = datetime(2023, 1, 1)
+    storage.add_transactions(user_id, [{
+        'id': i,
+        'type': 'expense',
+        'amount': rnd.randint(100, 500000) / 100,
+        'category': rnd.choice(CATEGORIES),
+        'description': ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 6))) + f' {rnd.randint(1, 999)}',
+        'date': (start + timedelta(minutes=rnd.randint(0, 60 * 24 * 700))).strftime(DATE_FORMAT),
+    } for i in range(args.transactions)])
+    print(f"Транзакций: {args.transactions} ({args.backend}{', columnar' if args.columnar else ''})")
+
+    started = time.perf_counter()
+    storage.search_transactions(user_id, 'бензин', 0, args.per_page)
+    print(f"Первый поиск (с построением индекса): {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    for query in QUERIES:
+        total, page = storage.search_transactions(user_id, query, 0, args.per_page)
+        scan_total, scan_page = Storage.search_transactions(storage, user_id, query, 0, args.per_page)
+        indexed = timed(lambda: storage.search_transactions(user_id, query, 0, args.per_page), 200)
+        next_page = timed(lambda: storage.search_transactions(user_id, query, args.per_page, args.per_page), 200)
+        scan = timed(lambda: Storage.search_transactions(storage, user_id, query, 0, args.per_page), 1)
+        same = total == scan_total and [tx['id'] for tx in page] == [tx['id'] for tx in scan_page]
+        print(f"{query!r:24} найдено {total:6}  индекс {indexed:8.1f} мкс  след. страница {next_page:8.1f} мкс"
+              f"  полный проход {scan / 1000:7.1f} мс  {'совпадает' if same else 'РАСХОЖДЕНИЕ'}")
+
+    # Изменения: каждое сбрасывает кеш запросов, следующий поиск считает заново
+    def change():
+        tx_id = rnd.randint(0, args.transactions - 1)
+        storage.add_transaction(user_id, {'id': tx_id, 'type': 'expense', 'amount': 1.0, 'category': 'еда',
+                                          'description': 'Кофейня у дома', 'date': '01.06.2024, 10:00'})
+        storage.search_transactions(user_id, 'кофе', 0, args.per_page)
+    print(f"Изменение транзакции + поиск: {timed(change, 1000):.1f} мкс")
+    storage.close()
+
+
+if __name__ == '__main__':
+    main()
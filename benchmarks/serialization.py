@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Скорость кодирования/декодирования JSON для пользователя со 100k транзакций:
+установленные сериализаторы (orjson, msgspec, json) и прежний json.dump(indent=2)
+
+    python benchmarks/serialization.py --count 100000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serializers  # noqa: E402
+from memory_per_transaction import generate_transactions  # noqa: E402
+
+
+def build_state(count: int) -> dict:
+    """Снапшот в формате DataManager с одним пользователем"""
+    user_id = 123456
+    return {
+        'users': {user_id: {'user_id': user_id, 'first_name': 'Иван', 'balance': 25000}},
+        'transactions': {user_id: generate_transactions(count)},
+        'goals': {user_id: []},
+        'investments': {user_id: []},
+        'wal_seq': 0
+    }
+
+
+def timed(func, repeat: int) -> float:
+    """Медиана времени вызова, с"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    state = build_state(args.count)
+    candidates = {
+        name: (serializer.dumps_bytes, serializer.loads)
+        for name, serializer in serializers.available().items()
+    }
+    candidates['json_indent2'] = (
+        lambda obj: json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8'),
+        json.loads
+    )
+
+    results = {}
+    for name, (encode, decode) in candidates.items():
+        payload = encode(state)
+        size_mb = len(payload) / 1024 / 1024
+        encode_s = timed(lambda: encode(state), args.repeat)
+        decode_s = timed(lambda: decode(payload), args.repeat)
+        results[name] = {
+            'size_mb': round(size_mb, 2),
+            'encode_ms': round(encode_s * 1000, 1),
+            'decode_ms': round(decode_s * 1000, 1),
+            'encode_mb_s': round(size_mb / encode_s, 1),
+            'decode_mb_s': round(size_mb / decode_s, 1)
+        }
+
+    print(json.dumps({
+        'transactions': args.count,
+        'default_backend': serializers.backend(),
+        'results': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Время загрузки снапшота: JSON (всё декодируется сразу) против бинарного
+формата с индексом (mmap, пользователи декодируются по требованию)
+
+    python benchmarks/snapshot_startup.py --users 20000 --transactions 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager  # noqa: E402
+from record_store import TransactionStore  # noqa: E402
+from memory_per_transaction import generate_transactions  # noqa: E402
+
+
+def build(users: int, transactions: int) -> DataManager:
+    """DataManager с синтетическими пользователями"""
+    manager = DataManager()
+    template = generate_transactions(transactions)
+    for user_id in range(1, users + 1):
+        manager.users_data[user_id] = {'user_id': user_id, 'first_name': 'Иван', 'balance': user_id}
+        manager.transactions[user_id] = TransactionStore([dict(t) for t in template])
+    return manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--transactions', type=int, default=50, help='транзакций на пользователя')
+    args = parser.parse_args()
+
+    manager = build(args.users, args.transactions)
+    directory = tempfile.mkdtemp()
+    probe = args.users // 2
+    results = {}
+
+    for snapshot_format in ('json', 'binary'):
+        path = os.path.join(directory, f'user_data.{snapshot_format}')
+        manager.snapshot_format = snapshot_format
+        manager.save_to_file(path)
+
+        started = time.perf_counter()
+        loaded = DataManager(snapshot_format=snapshot_format)
+        loaded.load_from_file(path)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        user = loaded.get_user_data(probe)
+        count = len(loaded.get_user_transactions(probe))
+        first_access_ms = (time.perf_counter() - started) * 1000
+
+        assert user['user_id'] == probe and count == args.transactions
+        results[snapshot_format] = {
+            'file_mb': round(os.path.getsize(path) / 1024 / 1024, 2),
+            'load_ms': round(load_ms, 2),
+            'first_access_ms': round(first_access_ms, 3)
+        }
+
+    print(json.dumps({'users': args.users, 'transactions_per_user': args.transactions,
+                      'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Время запуска API в разных режимах: импорт модуля приложения и задержка
+первого и второго запроса /api/user_data (каждый замер - в новом процессе)
+
+    python benchmarks/startup.py --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Режим -> модуль с объектом app
+MODES = {
+    'wsgi_app': 'app',
+    'wsgi_bot': 'bot',
+    'asgi': 'asgi',
+}
+
+PATH = '/api/user_data'
+QUERY = 'user_id=123456'
+
+
+def wsgi_request(app) -> float:
+    """Один запрос через тестовый клиент Flask, мс"""
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get(f'{PATH}?{QUERY}')
+    response.get_data()
+    assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - started) * 1000
+
+
+def asgi_request(app) -> float:
+    """Один запрос напрямую в ASGI-приложение, мс"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': PATH, 'raw_path': PATH.encode(),
+        'query_string': QUERY.encode(), 'root_path': '', 'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 1), 'server': ('localhost', 80),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    started = time.perf_counter()
+    asyncio.run(app(scope, receive, send))
+    assert status == [200], status
+    return (time.perf_counter() - started) * 1000
+
+
+def child(mode: str):
+    """Замер в чистом процессе: импорт + два запроса"""
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    started = time.perf_counter()
+    module = __import__(MODES[mode])
+    import_ms = (time.perf_counter() - started) * 1000
+
+    request = asgi_request if mode == 'asgi' else wsgi_request
+    first_ms = request(module.app)
+    second_ms = request(module.app)
+
+    print(json.dumps({'import_ms': import_ms, 'first_request_ms': first_ms,
+                      'second_request_ms': second_ms}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    env = dict(os.environ, PERSISTENCE_ENABLED='False', STORAGE_BACKEND='memory')
+    results = {}
+    for mode in MODES:
+        samples = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', mode],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+
+        results[mode] = {
+            key: round(statistics.median(sample[key] for sample in samples), 2)
+            for key in samples[0]
+        }
+
+    print(json.dumps({'runs': args.runs, 'median': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
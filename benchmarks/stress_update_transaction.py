@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нагрузочная проверка /api/update_transaction из многих потоков:
+итоговый баланс каждого пользователя должен совпасть с суммой транзакций
+
+    python benchmarks/stress_update_transaction.py --threads 16 --requests 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='запросов на поток')
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    args = parser.parse_args()
+
+    os.environ['PERSISTENCE_ENABLED'] = 'False'
+    os.environ['STORAGE_BACKEND'] = args.backend
+    os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(), 'stress.db')
+
+    import bot
+
+    user_ids = [900000 + i for i in range(args.users)]
+    for user_id in user_ids:
+        bot.data_manager.save_user_data(user_id, {
+            'user_id': user_id,
+            'balance': 0,
+            'monthly_income': 0,
+            'monthly_expenses': 0,
+            'savings_percent': 0
+        })
+
+    expected = {user_id: 0.0 for user_id in user_ids}
+    expected_lock = threading.Lock()
+    errors = []
+
+    def worker(worker_id: int):
+        client = bot.app.test_client()
+        rnd = random.Random(worker_id)
+        for i in range(args.requests):
+            user_id = rnd.choice(user_ids)
+            amount = rnd.randint(1, 1000)
+            tx_type = rnd.choice(('income', 'expense'))
+            response = client.post('/api/update_transaction', json={
+                'user_id': user_id,
+                'id': f'{worker_id}-{i}',
+                'type': tx_type,
+                'amount': amount,
+                'category': 'stress'
+            })
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+            with expected_lock:
+                expected[user_id] += amount if tx_type == 'income' else -amount
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = args.threads * args.requests
+    print(f"{total} запросов за {elapsed:.2f} с ({total / elapsed:.0f} запросов/с), ошибок: {len(errors)}")
+
+    failed = False
+    for user_id in user_ids:
+        balance = bot.data_manager.get_user_data(user_id)['balance']
+        count = len(bot.data_manager.get_user_transactions(user_id))
+        status = 'OK' if balance == expected[user_id] else 'РАСХОЖДЕНИЕ'
+        failed = failed or balance != expected[user_id]
+        print(f"  пользователь {user_id}: баланс {balance}, ожидалось {expected[user_id]}, "
+              f"транзакций {count} - {status}")
+
+    bot.data_manager.close()
+    sys.exit(1 if failed or errors else 0)
+
+
+if __name__ == '__main__':
+    main()
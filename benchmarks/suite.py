@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Набор бенчмарков горячих путей хранилища и API с результатами в JSON
+для сравнения между коммитами
+
+    python benchmarks/suite.py --users 50 --transactions 1000 --output base.json
+    python benchmarks/suite.py --users 50 --transactions 1000 --compare base.json
+
+С --compare печатается отношение к базовому прогону; код выхода 1, если
+какой-то бенчмарк медленнее порога --threshold
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config печатает строку при импорте - уводим её из stdout с JSON
+with contextlib.redirect_stdout(sys.stderr):
+    import serializers  # noqa: E402
+    from api import create_app  # noqa: E402
+    from memory_per_transaction import generate_transactions  # noqa: E402
+    from storage import create_storage  # noqa: E402
+
+
+def populate(storage, args) -> list:
+    """Синтетические пользователи: профиль, транзакции, цели, инвестиции"""
+    user_ids = [700000 + i for i in range(args.users)]
+    with storage.batch():
+        for n, user_id in enumerate(user_ids):
+            storage.save_user_data(user_id, {
+                'user_id': user_id,
+                'first_name': f'Пользователь {n}',
+                'balance': 0,
+                'monthly_income': 0,
+                'monthly_expenses': 0,
+                'savings_percent': 0
+            })
+            for transaction in generate_transactions(args.transactions, seed=n):
+                storage.add_transaction(user_id, transaction)
+            for i in range(args.goals):
+                storage.save_goal(user_id, {'id': i + 1, 'name': f'Цель {i}', 'current': i * 1000.0,
+                                            'target': 100000.0, 'deadline': '2030-12-31'})
+            for i in range(args.investments):
+                storage.save_investment(user_id, {'id': i + 1, 'name': f'Актив {i}', 'type': 'Акции',
+                                                  'amount': 10000.0, 'invested': 9000.0})
+    return user_ids
+
+
+def timed(func, number: int, repeat: int) -> dict:
+    """Медиана по repeat прогонам из number вызовов: время операции и операций в секунду"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for i in range(number):
+            func(i)
+        samples.append((time.perf_counter() - started) / number)
+    per_op = statistics.median(samples)
+    return {
+        'ops': number * repeat,
+        'us_per_op': round(per_op * 1e6, 2),
+        'ops_per_s': round(1 / per_op, 1) if per_op else None
+    }
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_storage(storage, user_ids: list, args) -> dict:
+    """Методы хранилища напрямую"""
+    user_id = user_ids[0]
+    counter = iter(range(10 ** 9))
+    results = {}
+
+    added = []
+
+    def add(i):
+        transaction_id = f'bench-{next(counter)}'
+        added.append(transaction_id)
+        storage.add_transaction(user_id, {'id': transaction_id, 'type': 'expense', 'category': 'еда',
+                                          'amount': 100.0, 'date': '01.02.2024, 10:00'})
+
+    results['storage.add_transaction'] = timed(add, args.number, args.repeat)
+
+    def delete(i):
+        storage.delete_transaction(user_id, added.pop())
+
+    results['storage.delete_transaction'] = timed(delete, args.number, args.repeat)
+
+    def save_goal(i):
+        storage.save_goal(user_id, {'id': i % 50 + 1000, 'name': 'Цель', 'current': float(i),
+                                    'target': 100000.0, 'deadline': '2030-12-31'})
+
+    results['storage.save_goal'] = timed(save_goal, args.number, args.repeat)
+
+    results['storage.get_user_transactions'] = timed(
+        lambda i: storage.get_user_transactions(user_ids[i % len(user_ids)]), args.number, args.repeat)
+    results['storage.get_summary'] = timed(
+        lambda i: storage.get_summary(user_ids[i % len(user_ids)]), args.number, args.repeat)
+    return results
+
+
+def bench_api(app, user_ids: list, args) -> dict:
+    """Роуты API через тестовый клиент Flask (без сети)"""
+    client = app.test_client()
+    user_id = user_ids[0]
+    results = {}
+
+    def user_data(i):
+        response = client.get(f'/api/user_data?user_id={user_ids[i % len(user_ids)]}')
+        assert response.status_code == 200
+
+    results['api.user_data'] = timed(user_data, args.number, args.repeat)
+
+    etag = client.get(f'/api/user_data?user_id={user_id}').headers['ETag']
+    results['api.user_data_304'] = timed(
+        lambda i: client.get(f'/api/user_data?user_id={user_id}', headers={'If-None-Match': etag}),
+        args.number, args.repeat)
+
+    def update_transaction(i):
+        response = client.post('/api/update_transaction', json={
+            'user_id': user_id, 'id': f'api-{i}', 'type': 'expense', 'amount': 10,
+            'category': 'еда', 'date': '01.02.2024, 10:00'})
+        assert response.status_code == 200
+
+    results['api.update_transaction'] = timed(update_transaction, args.number, args.repeat)
+
+    def update_goal(i):
+        response = client.post('/api/update_goal', json={
+            'user_id': user_id, 'id': i % 50 + 2000, 'name': 'Цель', 'current': i,
+            'target': 100000, 'deadline': '2030-12-31'})
+        assert response.status_code == 200
+
+    results['api.update_goal'] = timed(update_goal, args.number, args.repeat)
+
+    def delete_item(i):
+        client.post('/api/delete_item', json={'user_id': user_id, 'type': 'transaction', 'id': f'api-{i}'})
+
+    results['api.delete_item'] = timed(delete_item, args.number, 1)
+
+    # Экспорт - целиком, вместе с потоковой отдачей тела
+    export_number = max(1, args.number // 20)
+    for export_format in ('csv', 'json'):
+        def export(i, export_format=export_format):
+            response = client.get(f'/api/export_data?user_id={user_ids[i % len(user_ids)]}&format={export_format}')
+            assert response.status_code == 200 and response.get_data()
+
+        results[f'api.export_{export_format}'] = timed(export, export_number, args.repeat)
+    return results
+
+
+def bench_persistence(storage, args) -> dict:
+    """Снапшот в файл и загрузка (только для хранилища в памяти)"""
+    if not hasattr(storage, 'save_to_file'):
+        return {}
+
+    from data_manager import DataManager
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_data')
+    results = {
+        'storage.save_to_file': timed(lambda i: storage.save_to_file(path), 1, args.repeat)
+    }
+
+    def load(i):
+        loaded = DataManager(snapshot_format=storage.snapshot_format)
+        loaded.load_from_file(path)
+
+    results['storage.load_from_file'] = timed(load, 1, args.repeat)
+    results['storage.load_from_file']['file_mb'] = round(os.path.getsize(path) / 1024 / 1024, 2)
+    return results
+
+
+def bench_throughput(app, user_ids: list, args) -> dict:
+    """Параллельные клиенты: смесь чтений и записей, запросов в секунду и задержки"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(worker_id: int):
+        client = app.test_client()
+        rnd = random.Random(worker_id)
+        local = []
+        for i in range(args.requests):
+            user_id = rnd.choice(user_ids)
+            started = time.perf_counter()
+            roll = rnd.random()
+            if roll < 0.6:
+                response = client.get(f'/api/user_data?user_id={user_id}')
+            elif roll < 0.8:
+                response = client.get(f'/api/summary?user_id={user_id}')
+            else:
+                response = client.post('/api/update_transaction', json={
+                    'user_id': user_id, 'id': f'tp-{worker_id}-{i}', 'type': 'expense',
+                    'amount': 10, 'category': 'еда', 'date': '01.02.2024, 10:00'})
+            local.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {'api.throughput_mixed': {
+        'ops': len(latencies),
+        'threads': args.threads,
+        'ops_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'errors': len(errors)
+    }}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(results: dict, baseline_path: str, threshold: float) -> bool:
+    """Печать отношения к базовому прогону (по ops_per_s); True - есть регрессии"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+
+    regressed = False
+    print(f"{'бенчмарк':40} {'было оп/с':>12} {'стало оп/с':>12} {'x':>7}", file=sys.stderr)
+    for name, result in results.items():
+        before = baseline.get(name, {}).get('ops_per_s')
+        after = result.get('ops_per_s')
+        if not before or not after:
+            continue
+        ratio = after / before
+        mark = ''
+        if ratio * threshold < 1:
+            mark = '  <- медленнее'
+            regressed = True
+        print(f"{name:40} {before:12.1f} {after:12.1f} {ratio:7.2f}{mark}", file=sys.stderr)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--columnar', action='store_true', help='колоночное хранение транзакций')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=1000, help='транзакций на пользователя')
+    parser.add_argument('--goals', type=int, default=10)
+    parser.add_argument('--investments', type=int, default=10)
+    parser.add_argument('--number', type=int, default=200, help='вызовов в одном прогоне')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='запросов на поток')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='файл для результатов JSON')
+    parser.add_argument('--compare', help='базовый JSON для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='во сколько раз медленнее считается регрессией')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    storage = create_storage(args.backend, path=os.path.join(tempfile.mkdtemp(), 'bench.db'),
+                             columnar=args.columnar)
+    user_ids = populate(storage, args)
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_app(storage)
+
+    results = {}
+    results.update(bench_storage(storage, user_ids, args))
+    results.update(bench_api(app, user_ids, args))
+    results.update(bench_persistence(storage, args))
+    results.update(bench_throughput(app, user_ids, args))
+    storage.close()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'serializer': serializers.backend(),
+            'args': {key: value for key, value in vars(args).items()
+                     if key not in ('output', 'compare', 'threshold')}
+        },
+        'results': results
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пропускная способность обработки обновлений: синхронный TeleBot (как при
+polling) против асинхронного вебхука, оба против fake_telegram.py с задержкой
+
+    python benchmarks/webhook_throughput.py --updates 200 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_telegram import FakeTelegram  # noqa: E402
+
+
+def wait_for(predicate, timeout: float = 120.0):
+    """Ожидание условия с опросом"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("обновления не обработаны за отведенное время")
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка Bot API, с')
+    args = parser.parse_args()
+
+    # Fake Telegram в собственном цикле событий
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    fake = FakeTelegram(latency=args.latency)
+    url = asyncio.run_coroutine_threadsafe(fake.start(), loop).result()
+
+    os.environ['PERSISTENCE_ENABLED'] = 'False'
+    os.environ['TELEGRAM_API_URL'] = url
+
+    import telebot
+    import async_bot
+    import bot
+    import config
+
+    telebot.apihelper.API_URL = url + '/bot{0}/{1}'
+    updates = [fake.message_update(700000 + i, '/stats') for i in range(args.updates)]
+    results = {}
+
+    # Синхронный бот: те же обработчики через пул потоков TeleBot
+    started = time.perf_counter()
+    bot.bot.process_new_updates([telebot.types.Update.de_json(u) for u in updates])
+    wait_for(lambda: len(fake.calls_of('sendMessage')) >= args.updates)
+    results['sync_telebot'] = time.perf_counter() - started
+
+    # Асинхронный бот: обновления приходят на вебхук Flask-приложения
+    fake.calls.clear()
+    client = async_bot.app.test_client()
+    started = time.perf_counter()
+    for update in updates:
+        client.post(config.WEBHOOK_PATH, json=update)
+    wait_for(lambda: len(fake.calls_of('sendMessage')) >= args.updates)
+    results['async_webhook'] = time.perf_counter() - started
+
+    async_bot.update_loop.stop()
+    asyncio.run_coroutine_threadsafe(fake.stop(), loop).result()
+
+    print(json.dumps({
+        'updates': args.updates,
+        'latency': args.latency,
+        'seconds': {name: round(value, 3) for name, value in results.items()},
+        'updates_per_second': {name: round(args.updates / value, 1) for name, value in results.items()}
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тексты и клавиатуры команд бота
+Общие для синхронного бота (polling) и асинхронного (webhook)
+"""
+
+from datetime import datetime
+from typing import Dict
+
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
+
+import config
+
+HELP_TEXT = """
+📚 Доступные команды:
+
+/start - Начать работу с ботом
+/help - Показать это сообщение
+/stats - Получить краткую статистику
+/reset - Сбросить данные (осторожно!)
+
+💡 Просто нажми на кнопку "Открыть финансовый трекер" для полноценной работы с приложением!
+"""
+
+RESET_CONFIRM_TEXT = (
+    "⚠️ *Внимание!* Вы уверены, что хотите сбросить все ваши финансовые данные? "
+    "Это действие нельзя отменить!"
+)
+RESET_DONE_TEXT = "🗑️ Все ваши данные были удалены. Нажмите /start для начала заново."
+STATS_NOT_FOUND_TEXT = "❌ Данные не найдены. Нажмите /start для начала работы."
+
+
+def new_user(user_id: int, username: str, first_name: str) -> Dict:
+    """Данные нового пользователя"""
+    return {
+        'user_id': user_id,
+        'username': username,
+        'first_name': first_name,
+        'join_date': datetime.now().strftime('%Y-%m-%d'),
+        'balance': 25000,
+        'monthly_income': 120000,
+        'monthly_expenses': 95000,
+        'savings_percent': 20.8,
+        'investments_total': 25000,
+        'financial_health': 75,
+        'main_goal': 'Накопить на квартиру',
+        'savings_goal': 50000,
+        'investment_percent': 15
+    }
+
+
+def welcome_keyboard(user_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура с кнопкой для открытия Web App"""
+    keyboard = InlineKeyboardMarkup()
+    web_app_button = InlineKeyboardButton(
+        text="📊 Открыть финансовый трекер",
+        web_app=WebAppInfo(url=f"{config.WEB_APP_URL}?user_id={user_id}")
+    )
+    keyboard.add(web_app_button)
+    return keyboard
+
+
+def welcome_text(first_name: str) -> str:
+    """Приветственное сообщение"""
+    return f"""
+👋 Привет, {first_name}!
+
+Добро пожаловать в **Финансовый Трекер** 🚀
+
+Здесь ты сможешь:
+• 📈 Отслеживать доходы и расходы
+• 🎯 Ставить финансовые цели
+• 📊 Анализировать свою статистику
+• 💰 Управлять инвестициями
+• 🧠 Получать персональные советы
+
+Нажми кнопку ниже, чтобы открыть приложение 👇
+"""
+
+
+def stats_text(user_data: Dict) -> str:
+    """Краткая статистика пользователя"""
+    return f"""
+📊 Ваша финансовая статистика:
+
+💰 Баланс: *{user_data['balance']:,} ₽*
+📈 Доходы (месяц): *{user_data['monthly_income']:,} ₽*
+📉 Расходы (месяц): *{user_data['monthly_expenses']:,} ₽*
+💎 Сбережения: *{user_data['savings_percent']}%*
+🏆 Финансовое здоровье: *{user_data['financial_health']}/100*
+
+🎯 Главная цель: {user_data['main_goal']}
+"""
+
+
+def reset_keyboard(user_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура подтверждения сброса"""
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(
+        InlineKeyboardButton("✅ Да, сбросить", callback_data=f"reset_confirm_{user_id}"),
+        InlineKeyboardButton("❌ Нет, отмена", callback_data=f"reset_cancel_{user_id}")
+    )
+    return keyboard
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Автоматическая категоризация транзакций по описанию
+Правила (ключевые слова, регулярное выражение, диапазон суммы, тип)
+пользователя и глобальные собираются в один CategoryMatcher: все ключевые
+слова - в одно регулярное выражение, которое за проход по описанию находит
+все совпадения. Сборка кешируется по пользователю и сбрасывается при
+изменении его правил (версия правил хранится в профиле)
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from search import normalize_text
+from storage import Storage
+
+# Категория по умолчанию (update_transaction) - её можно заменить автоматически
+DEFAULT_CATEGORY = 'other'
+UNSET_CATEGORIES = {'', DEFAULT_CATEGORY, 'другое'}
+
+# Глобальные правила (категории Web App); пользовательские правила проверяются раньше
+GLOBAL_RULES = [
+    {'category': 'зарплата', 'type': 'income', 'keywords': ['зарплат', 'заработн', 'аванс', 'оклад', 'премия']},
+    {'category': 'дивиденды', 'type': 'income', 'keywords': ['дивиденд', 'купон']},
+    {'category': 'подработка', 'type': 'income', 'keywords': ['фриланс', 'подработ', 'гонорар']},
+    {'category': 'еда', 'type': 'expense', 'keywords': [
+        'продукт', 'пятерочка', 'магнит', 'перекресток', 'ашан', 'лента', 'вкусвилл', 'дикси',
+        'самокат', 'кафе', 'кофе', 'кофейня', 'ресторан', 'столовая', 'пицц', 'бургер',
+        'макдоналдс', 'вкусно и точка', 'kfc', 'delivery club', 'яндекс еда', 'обед', 'ужин'
+    ]},
+    {'category': 'транспорт', 'type': 'expense', 'keywords': [
+        'бензин', 'топливо', 'азс', 'лукойл', 'газпромнефть', 'роснефть', 'такси', 'яндекс go',
+        'uber', 'метро', 'автобус', 'электричк', 'тройка', 'парковк', 'каршеринг', 'делимобиль'
+    ]},
+    {'category': 'жилье', 'type': 'expense', 'keywords': [
+        'аренда', 'квартплат', 'жкх', 'коммунал', 'электроэнерг', 'водоканал', 'интернет', 'ипотек'
+    ]},
+    {'category': 'здоровье', 'type': 'expense', 'keywords': [
+        'аптек', 'клиник', 'врач', 'стоматолог', 'анализ', 'медицин', 'лекарств'
+    ]},
+    {'category': 'развлечения', 'type': 'expense', 'keywords': [
+        'кино', 'театр', 'концерт', 'музей', 'steam', 'playstation', 'netflix', 'кинопоиск', 'боулинг'
+    ]},
+    {'category': 'образование', 'type': 'expense', 'keywords': [
+        'курс', 'обучени', 'учебник', 'книг', 'литрес', 'skillbox', 'нетология', 'репетитор'
+    ]},
+    {'category': 'одежда', 'type': 'expense', 'keywords': [
+        'одежд', 'обувь', 'zara', 'lamoda', 'спортмастер', 'gloria jeans'
+    ]},
+    {'category': 'техника', 'type': 'expense', 'keywords': [
+        'dns', 'м.видео', 'мвидео', 'эльдорадо', 'ситилинк', 'ноутбук', 'смартфон'
+    ]},
+    {'category': 'путешествия', 'type': 'expense', 'keywords': [
+        'авиабилет', 'аэрофлот', 'победа', 'ржд', 'отель', 'гостиниц', 'хостел', 'booking', 'турагент'
+    ]},
+    {'category': 'подарки', 'type': 'expense', 'keywords': ['подар', 'цветы']},
+]
+
+
+def normalize_rule(rule: Any) -> Dict[str, Any]:
+    """Проверенное правило; ValueError - правило некорректно"""
+    if not isinstance(rule, dict):
+        raise ValueError('Rule must be an object')
+
+    category = str(rule.get('category') or '').strip()
+    if not category:
+        raise ValueError('Rule category required')
+
+    keywords = rule.get('keywords') or []
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    if not isinstance(keywords, list):
+        raise ValueError('Keywords must be a list')
+    keywords = [normalize_text(keyword).strip() for keyword in keywords]
+    keywords = [keyword for keyword in keywords if keyword]
+
+    normalized = {'category': category, 'keywords': keywords}
+
+    if rule.get('pattern'):
+        try:
+            re.compile(rule['pattern'])
+        except (re.error, TypeError) as e:
+            raise ValueError(f'Invalid pattern: {e}') from e
+        normalized['pattern'] = rule['pattern']
+
+    for bound in ('min_amount', 'max_amount'):
+        if rule.get(bound) is not None:
+            normalized[bound] = float(rule[bound])
+
+    if rule.get('type') is not None:
+        if rule['type'] not in ('income', 'expense'):
+            raise ValueError('Rule type must be income or expense')
+        normalized['type'] = rule['type']
+
+    return normalized
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Выражение для набора слов в виде префиксного дерева ('кофе(?:йня)?'):
+    общие префиксы проверяются один раз, а не для каждой альтернативы
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Продолжение пробуется раньше конца слова - совпадает самое длинное слово
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+
+class CategoryMatcher:
+    """
+    Скомпилированный набор правил; при нескольких совпадениях побеждает
+    правило, стоящее в списке раньше. Ключевое слово совпадает с начала
+    слова ('бензин' - в 'Бензин АИ-95', 'продукт' - в 'Продукты на неделю')
+    """
+
+    def __init__(self, rules: Iterable[Dict]):
+        self.rules = [normalize_rule(rule) for rule in rules]
+
+        # Ключевое слово -> номера правил с ним
+        keyword_rules: Dict[str, List[int]] = {}
+        # Правила без ключевых слов (выражение, только сумма) проверяются по очереди
+        self._scan_rules: List[Tuple[int, Optional[re.Pattern]]] = []
+
+        for index, rule in enumerate(self.rules):
+            for keyword in rule['keywords']:
+                keyword_rules.setdefault(keyword, []).append(index)
+            if rule.get('pattern') or not rule['keywords']:
+                pattern = re.compile(rule['pattern'], re.IGNORECASE) if rule.get('pattern') else None
+                self._scan_rules.append((index, pattern))
+
+        # Слово -> правила с ним и со всеми его словами-префиксами: в одной
+        # позиции выражение находит самое длинное слово, короткие подразумеваются
+        keywords = sorted(keyword_rules)
+        self._keyword_rules: Dict[str, List[int]] = {}
+        for keyword in keywords:
+            indices = set()
+            for end in range(1, len(keyword) + 1):
+                indices.update(keyword_rules.get(keyword[:end], ()))
+            self._keyword_rules[keyword] = sorted(indices)
+
+        # Просмотр вперед не поглощает текст: finditer отдает совпадение в каждом начале слова
+        self._regex = re.compile(r'\b(?=(' + _trie_pattern(keywords) + '))') if keywords else None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _fits(self, index: int, amount: Optional[float], tx_type: Optional[str]) -> bool:
+        rule = self.rules[index]
+        if 'type' in rule and tx_type is not None and rule['type'] != tx_type:
+            return False
+        if amount is not None:
+            if 'min_amount' in rule and amount < rule['min_amount']:
+                return False
+            if 'max_amount' in rule and amount > rule['max_amount']:
+                return False
+        return True
+
+    def match(self, description: Any, amount: Optional[float] = None,
+              tx_type: Optional[str] = None) -> Optional[str]:
+        """Категория по описанию, сумме и типу; None - ни одно правило не подошло"""
+        best = None
+
+        if self._regex is not None:
+            for found in self._regex.finditer(normalize_text(description)):
+                for index in self._keyword_rules[found.group(1)]:
+                    if best is not None and index >= best:
+                        break
+                    if self._fits(index, amount, tx_type):
+                        best = index
+                        break
+
+        for index, pattern in self._scan_rules:
+            if best is not None and index >= best:
+                break
+            if (pattern is None or pattern.search(str(description or ''))) and self._fits(index, amount, tx_type):
+                best = index
+                break
+
+        return self.rules[best]['category'] if best is not None else None
+
+    def apply(self, transaction: Dict) -> bool:
+        """Категория для транзакции без категории; True - категория назначена"""
+        if str(transaction.get('category') or '').strip() not in UNSET_CATEGORIES:
+            return False
+
+        try:
+            amount = float(transaction.get('amount', 0) or 0)
+        except (TypeError, ValueError):
+            amount = None
+
+        category = self.match(transaction.get('description'), amount, transaction.get('type'))
+        if category is None:
+            return False
+        transaction['category'] = category
+        return True
+
+    def apply_many(self, transactions: Iterable[Dict]) -> int:
+        """Категоризация пачки транзакций; число назначенных категорий"""
+        return sum(self.apply(transaction) for transaction in transactions)
+
+
+class Categorizer:
+    """
+    Сборки CategoryMatcher по пользователям (LRU на max_users) с проверкой
+    версии правил из профиля - изменение правил в другом процессе тоже видно
+    """
+
+    def __init__(self, storage: Storage, global_rules: Optional[List[Dict]] = None, max_users: int = 1024):
+        self.storage = storage
+        self.global_rules = [normalize_rule(rule) for rule in (GLOBAL_RULES if global_rules is None else global_rules)]
+        self.max_users = max_users
+
+        self._global = CategoryMatcher(self.global_rules)
+        self._cache: 'OrderedDict[Any, Tuple[int, CategoryMatcher]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0}
+
+    def matcher_for(self, user_id: Any) -> CategoryMatcher:
+        """Правила пользователя перед глобальными"""
+        user_data = self.storage.get_user_data(user_id) or {}
+        rules = user_data.get('category_rules') or []
+        if not rules:
+            return self._global
+
+        version = user_data.get('category_rules_version', 0)
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(user_id)
+                self._counters['hits'] += 1
+                return cached[1]
+            self._counters['misses'] += 1
+
+        matcher = CategoryMatcher(list(rules) + self.global_rules)
+        with self._lock:
+            self._cache[user_id] = (version, matcher)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_users:
+                self._cache.popitem(last=False)
+        return matcher
+
+    def invalidate(self, user_id: Any):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def get_rules(self, user_id: Any) -> List[Dict]:
+        """Правила пользователя"""
+        user_data = self.storage.get_user_data(user_id) or {}
+        return list(user_data.get('category_rules') or [])
+
+    def set_rules(self, user_id: Any, rules: List[Any]) -> Optional[List[Dict]]:
+        """
+        Замена правил пользователя (ValueError - правило некорректно);
+        None - пользователь не найден
+        """
+        normalized = [normalize_rule(rule) for rule in rules]
+
+        with self.storage.user_lock(user_id):
+            user_data = self.storage.get_user_data(user_id)
+            if not user_data:
+                return None
+            user_data['category_rules'] = normalized
+            user_data['category_rules_version'] = user_data.get('category_rules_version', 0) + 1
+            self.storage.save_user_data(user_id, user_data)
+
+        self.invalidate(user_id)
+        return normalized
+
+    def categorize(self, user_id: Any, transaction: Dict) -> bool:
+        """Категория для одной транзакции пользователя"""
+        return self.matcher_for(user_id).apply(transaction)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, 'cached_users': len(self._cache)}
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Журнал изменений пользователя для дельта-синхронизации
+Каждая мутация увеличивает ревизию; для каждой записи хранится
+только последняя ревизия, в которой она изменилась или была удалена
+"""
+
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from record_store import normalize_id
+
+
+class ChangeLog:
+    """Ревизии изменений одного пользователя"""
+
+    # Сколько удалений помнить; клиенты старше забытых ревизий получают полную выгрузку
+    MAX_TOMBSTONES = 10000
+
+    def __init__(self):
+        self.revision = 0
+        # Ревизия, начиная с которой история полна (since < floor - полная выгрузка)
+        self.floor = 0
+        # (вид, ключ) -> (ревизия, исходный id, удалена ли)
+        self._changes: 'OrderedDict[Tuple[str, Any], Tuple[int, Any, bool]]' = OrderedDict()
+        self._tombstones = 0
+
+    def record(self, kind: str, record_id: Any = None, deleted: bool = False) -> int:
+        """Фиксация изменения записи вида kind ('user', 'transactions', ...)"""
+        self.revision += 1
+        key = (kind, normalize_id(record_id))
+
+        previous = self._changes.pop(key, None)
+        if previous is not None and previous[2]:
+            self._tombstones -= 1
+
+        self._changes[key] = (self.revision, record_id, deleted)
+        if deleted:
+            self._tombstones += 1
+            self._trim()
+        return self.revision
+
+    def reset(self) -> int:
+        """Сброс истории (например, при удалении пользователя)"""
+        self.revision += 1
+        self.floor = self.revision
+        self._changes.clear()
+        self._tombstones = 0
+        return self.revision
+
+    def _trim(self):
+        """Забываем самые старые изменения, пока удалений больше лимита"""
+        while self._tombstones > self.MAX_TOMBSTONES:
+            _, (revision, _, deleted) = self._changes.popitem(last=False)
+            self.floor = revision
+            if deleted:
+                self._tombstones -= 1
+
+    def since(self, revision: int) -> Optional[List[Tuple[str, Any, bool]]]:
+        """
+        Изменения после ревизии revision по возрастанию: (вид, id, удалена).
+        None - история неполна, нужна полная выгрузка
+        """
+        if revision < self.floor or revision > self.revision:
+            return None
+
+        changes = []
+        for (kind, _), (rev, record_id, deleted) in reversed(self._changes.items()):
+            if rev <= revision:
+                break
+            changes.append((kind, record_id, deleted))
+        changes.reverse()
+        return changes
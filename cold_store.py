@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Файл вытеснения "холодных" пользователей DataManager
+Сюда пишутся данные пользователей, измененных после последнего снапшота,
+когда их вытесняют из памяти; при компактизации они попадают в новый снапшот.
+После перезапуска файл не нужен - изменения восстанавливаются из журнала
+"""
+
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class ColdStore:
+    """Анонимный временный файл JSON-записей пользователей с индексом в памяти"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._end = 0
+
+        # user_id -> (смещение, длина); None - пользователь удален
+        self._index: Dict[Any, Optional[Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, user_id: Any) -> bool:
+        return user_id in self._index
+
+    def ids(self) -> Iterator[Any]:
+        """user_id вытесненных пользователей"""
+        return iter(list(self._index))
+
+    def is_deleted(self, user_id: Any) -> bool:
+        """Пользователь вытеснен как удаленный"""
+        return user_id in self._index and self._index[user_id] is None
+
+    def put(self, user_id: Any, blob: Optional[bytes]):
+        """Запись данных пользователя (None - пользователь удален)"""
+        with self._lock:
+            if blob is None:
+                self._index[user_id] = None
+                return
+
+            os.pwrite(self._file.fileno(), blob, self._end)
+            self._index[user_id] = (self._end, len(blob))
+            self._end += len(blob)
+
+    def _read(self, entry: Optional[Tuple[int, int]]) -> Optional[bytes]:
+        if entry is None:
+            return None
+        offset, length = entry
+        return os.pread(self._file.fileno(), length, offset)
+
+    def raw(self, user_id: Any) -> Optional[bytes]:
+        """Данные пользователя (None - удален или не вытеснялся)"""
+        return self._read(self._index.get(user_id))
+
+    def pop(self, user_id: Any) -> Optional[bytes]:
+        """Данные пользователя с удалением из индекса (при загрузке обратно в память)"""
+        with self._lock:
+            entry = self._index.pop(user_id, None)
+        return self._read(entry)
+
+    def entries(self) -> Dict[Any, Optional[Tuple[int, int]]]:
+        """Копия индекса - что именно попало в снапшот"""
+        with self._lock:
+            return dict(self._index)
+
+    def drop(self, entries: Dict[Any, Optional[Tuple[int, int]]]):
+        """
+        Удаление записей, которые уже есть в новом снапшоте (если с тех пор
+        пользователя не вытесняли заново); пустой файл обрезается
+        """
+        with self._lock:
+            for user_id, entry in entries.items():
+                if user_id in self._index and self._index[user_id] == entry:
+                    del self._index[user_id]
+
+            if not self._index:
+                self._file.truncate(0)
+                self._end = 0
+
+    def clear(self):
+        """Сброс всех записей (загружен другой снапшот)"""
+        self.drop(self.entries())
+
+    def close(self):
+        """Закрытие (и удаление) файла"""
+        self._file.close()
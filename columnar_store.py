@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Колоночное хранилище транзакций
+Вместо dict на каждую транзакцию - массивы array('d') для сумм, дат и id,
+коды для типов и категорий, отдельный список описаний.
+Словари собираются только при чтении
+"""
+
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aggregates import DailyBalance, MonthlyTotals
+from record_store import DATE_FORMAT, normalize_id, parse_date
+from search import SearchIndex
+
+# Маркер ключа, которого не было в исходной транзакции
+_ABSENT = object()
+
+# Наибольшее целое, которое double хранит без потерь
+_MAX_EXACT_ID = 2 ** 53
+
+
+class CodeTable:
+    """Таблица интернирования строк: строка <-> короткий код"""
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._values: List[str] = []
+        self._lock = threading.Lock()
+
+    def code(self, value: str) -> int:
+        """Код строки (новая строка получает следующий код)"""
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(value)
+                    self._codes[value] = code
+        return code
+
+    def find(self, value: str) -> Optional[int]:
+        """Код строки без добавления в таблицу"""
+        return self._codes.get(value)
+
+    def value(self, code: int) -> str:
+        """Строка по коду"""
+        return self._values[code]
+
+
+# Общие для всех пользователей таблицы типов и категорий
+TYPE_CODES = CodeTable()
+CATEGORY_CODES = CodeTable()
+
+# Код 0 всегда занят - он стоит в колонке, когда значение лежит в исключениях
+TYPE_CODES.code('expense')
+CATEGORY_CODES.code('other')
+
+
+class ColumnarTransactionStore:
+    """
+    Колоночный аналог TransactionStore с тем же интерфейсом:
+    get/upsert/remove/items, range/recent по дате и нарастающие итоги
+    """
+
+    COMPACT_RATIO = 0.5
+
+    def __init__(self, records: Optional[List[Dict]] = None):
+        self._ids = array('d')
+        self._amounts = array('d')
+        self._timestamps = array('d')
+        self._types = array('H')
+        self._categories = array('H')
+        self._descriptions: List[Any] = []
+        self._alive = bytearray()
+
+        # Позиция -> значения, которые не укладываются в колонки
+        # (нечисловой id, дата в другом формате, дополнительные ключи)
+        self._odd: Dict[int, Dict[str, Any]] = {}
+        self._index: Dict[Any, int] = {}
+        # Позиции строк, отсортированные по дате
+        self._by_date = array('q')
+        self._dead = 0
+        self.totals = MonthlyTotals()
+        self.daily = DailyBalance()
+        # Поисковый индекс по ключам транзакций - строится при первом поиске
+        self._search: Optional[SearchIndex] = None
+
+        for record in records or []:
+            self.upsert(record)
+
+    def __len__(self) -> int:
+        return len(self._alive) - self._dead
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.items())
+
+    def __contains__(self, record_id: Any) -> bool:
+        return normalize_id(record_id) in self._index
+
+    # ---------- чтение ----------
+
+    def _row(self, pos: int) -> Dict:
+        """Сборка словаря транзакции из колонок"""
+        record_id = self._ids[pos]
+        timestamp = self._timestamps[pos]
+        record = {
+            'id': int(record_id) if record_id.is_integer() else record_id,
+            'type': TYPE_CODES.value(self._types[pos]),
+            'category': CATEGORY_CODES.value(self._categories[pos]),
+            'amount': self._amounts[pos],
+            'description': self._descriptions[pos],
+            'date': '' if math.isnan(timestamp) else
+                    datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
+        }
+
+        odd = self._odd.get(pos)
+        if odd:
+            for key, value in odd.items():
+                if value is _ABSENT:
+                    record.pop(key, None)
+                else:
+                    record[key] = value
+        return record
+
+    def get(self, record_id: Any) -> Optional[Dict]:
+        """Получение транзакции по id"""
+        pos = self._index.get(normalize_id(record_id))
+        return None if pos is None else self._row(pos)
+
+    def items(self) -> List[Dict]:
+        """Живые транзакции в порядке добавления (словари собираются при чтении)"""
+        if self._dead:
+            self._compact()
+        return [self._row(pos) for pos in range(len(self._alive))]
+
+    def ids(self) -> List[Any]:
+        """Ключи живых транзакций в порядке добавления"""
+        return list(self._index)
+
+    # ---------- запись ----------
+
+    def upsert(self, record: Dict) -> Optional[Dict]:
+        """Добавление или замена транзакции, возвращает предыдущую версию"""
+        key = normalize_id(record.get('id'))
+        pos = self._index.get(key)
+        previous = None
+
+        if pos is not None:
+            previous = self._row(pos)
+            self.totals.add(previous, self._timestamp_of(pos), sign=-1)
+            self.daily.add(previous, self._timestamp_of(pos), sign=-1)
+            self._unindex_date(pos)
+            self._odd.pop(pos, None)
+        else:
+            pos = len(self._alive)
+            self._index[key] = pos
+            self._ids.append(0.0)
+            self._amounts.append(0.0)
+            self._timestamps.append(math.nan)
+            self._types.append(0)
+            self._categories.append(0)
+            self._descriptions.append('')
+            self._alive.append(1)
+
+        timestamp = self._write_row(pos, record)
+        self.totals.add(record, timestamp)
+        self.daily.add(record, timestamp)
+        if timestamp is not None:
+            self._index_date(pos)
+        if self._search is not None:
+            self._search.add(key, record, timestamp)
+        return previous
+
+    def _write_row(self, pos: int, record: Dict) -> Optional[float]:
+        """Раскладка словаря по колонкам; возвращает timestamp даты"""
+        odd = {}
+
+        # Колонка id отдается как int для целых значений и как float для дробных:
+        # целый float (4.0) и другие типы сохраняются в исключениях как есть
+        record_id = record.get('id', _ABSENT)
+        if ((type(record_id) is int or (type(record_id) is float and not record_id.is_integer()))
+                and abs(record_id) < _MAX_EXACT_ID):
+            self._ids[pos] = float(record_id)
+        else:
+            self._ids[pos] = 0.0
+            odd['id'] = record_id
+
+        for field, codes, column in (('type', TYPE_CODES, self._types),
+                                     ('category', CATEGORY_CODES, self._categories)):
+            value = record.get(field, _ABSENT)
+            if isinstance(value, str):
+                column[pos] = codes.code(value)
+            else:
+                column[pos] = 0
+                odd[field] = value
+
+        # Колонка сумм - float; целые суммы (120000) сохраняют свой тип в исключениях
+        amount = record.get('amount', _ABSENT)
+        if isinstance(amount, (int, float)) and not isinstance(amount, bool):
+            self._amounts[pos] = float(amount)
+            if type(amount) is not float:
+                odd['amount'] = amount
+        else:
+            self._amounts[pos] = 0.0
+            odd['amount'] = amount
+
+        description = record.get('description', _ABSENT)
+        if isinstance(description, str):
+            self._descriptions[pos] = description
+        else:
+            self._descriptions[pos] = ''
+            odd['description'] = description
+
+        date = record.get('date', _ABSENT)
+        timestamp = parse_date(date) if date is not _ABSENT else None
+        self._timestamps[pos] = math.nan if timestamp is None else timestamp
+        if (timestamp is None or not isinstance(date, str) or
+                datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT) != date):
+            odd['date'] = date
+
+        for field, value in record.items():
+            if field not in ('id', 'type', 'category', 'amount', 'description', 'date'):
+                odd[field] = value
+
+        if odd:
+            self._odd[pos] = odd
+        return timestamp
+
+    def remove(self, record_id: Any) -> Optional[Dict]:
+        """Удаление транзакции (строка помечается удаленной до уплотнения)"""
+        key = normalize_id(record_id)
+        pos = self._index.pop(key, None)
+        if pos is None:
+            return None
+
+        previous = self._row(pos)
+        self.totals.add(previous, self._timestamp_of(pos), sign=-1)
+        self.daily.add(previous, self._timestamp_of(pos), sign=-1)
+        self._unindex_date(pos)
+        self._odd.pop(pos, None)
+        self._descriptions[pos] = ''
+        self._alive[pos] = 0
+        self._dead += 1
+        if self._search is not None:
+            self._search.discard(key)
+
+        if self._dead > len(self._alive) * self.COMPACT_RATIO:
+            self._compact()
+        return previous
+
+    def _compact(self):
+        """Удаление помеченных строк и перестроение индексов"""
+        keep = [pos for pos in range(len(self._alive)) if self._alive[pos]]
+        remap = {old: new for new, old in enumerate(keep)}
+
+        self._ids = array('d', (self._ids[pos] for pos in keep))
+        self._amounts = array('d', (self._amounts[pos] for pos in keep))
+        self._timestamps = array('d', (self._timestamps[pos] for pos in keep))
+        self._types = array('H', (self._types[pos] for pos in keep))
+        self._categories = array('H', (self._categories[pos] for pos in keep))
+        self._descriptions = [self._descriptions[pos] for pos in keep]
+        self._alive = bytearray(b'\x01' * len(keep))
+        self._odd = {remap[pos]: odd for pos, odd in self._odd.items()}
+        self._index = {key: remap[pos] for key, pos in self._index.items()}
+        self._by_date = array('q', (remap[pos] for pos in self._by_date))
+        self._dead = 0
+
+    # ---------- индекс по дате ----------
+
+    def _timestamp_of(self, pos: int) -> Optional[float]:
+        """timestamp строки, None если дата не распознана"""
+        timestamp = self._timestamps[pos]
+        return None if math.isnan(timestamp) else timestamp
+
+    def _index_date(self, pos: int):
+        """Вставка позиции в отсортированный по дате индекс"""
+        timestamps = self._timestamps
+        at = bisect_right(self._by_date, timestamps[pos], key=timestamps.__getitem__)
+        self._by_date.insert(at, pos)
+
+    def _unindex_date(self, pos: int):
+        """Удаление позиции из индекса по дате"""
+        timestamp = self._timestamp_of(pos)
+        if timestamp is None:
+            return
+
+        at = bisect_left(self._by_date, timestamp, key=self._timestamps.__getitem__)
+        while self._by_date[at] != pos:
+            at += 1
+        del self._by_date[at]
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None,
+              tx_type: Optional[str] = None) -> List[Dict]:
+        """Транзакции с датой в [start, end] по возрастанию даты, O(log n + k)"""
+        key = self._timestamps.__getitem__
+        lo = 0 if start is None else bisect_left(self._by_date, start, key=key)
+        hi = len(self._by_date) if end is None else bisect_right(self._by_date, end, key=key)
+
+        if tx_type is None:
+            return [self._row(pos) for pos in self._by_date[lo:hi]]
+
+        # Фильтр по типу - по колонке кодов, без сборки словарей
+        code = TYPE_CODES.find(tx_type)
+        types = self._types
+        return [
+            self._row(pos) for pos in self._by_date[lo:hi]
+            if types[pos] == code and 'type' not in self._odd.get(pos, ())
+        ]
+
+    def recent(self, limit: int, start: Optional[float] = None,
+               end: Optional[float] = None) -> List[Dict]:
+        """Последние limit транзакций (новые первыми) с датой в [start, end]"""
+        timestamps = self._timestamps
+        hi = len(self._by_date) if end is None else bisect_right(
+            self._by_date, end, key=timestamps.__getitem__
+        )
+
+        result = []
+        for at in range(hi - 1, -1, -1):
+            pos = self._by_date[at]
+            if len(result) >= limit or (start is not None and timestamps[pos] < start):
+                break
+            result.append(self._row(pos))
+        return result
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+        """Поиск по описанию и категории: всего найдено и страница, новые первыми"""
+        if self._search is None:
+            self._search = SearchIndex(
+                (key, self._row(pos), self._timestamp_of(pos)) for key, pos in self._index.items())
+        total, keys = self._search.search(query, offset, limit)
+        return total, [self.get(key) for key in keys]
@@ -29,6 +29,69 @@ DEFAULT_LANGUAGE = 'ru'
 
 # Пути к файлам
 HTML_FILE_PATH = 'index.html'
-DATA_FILE_PATH = 'user_data.json'
+
+# Хранилище: memory (DataManager) или sqlite (общий файл для воркеров gunicorn)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'memory')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'finance.db')
+
+# Долговременное хранение: снапшот + журнал мутаций (WAL)
+PERSISTENCE_ENABLED = os.getenv('PERSISTENCE_ENABLED', 'True').lower() == 'true'
+WAL_FSYNC_INTERVAL = float(os.getenv('WAL_FSYNC_INTERVAL', '1.0'))
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', '300'))
+# Формат снапшота: binary (индекс пользователей, ленивая загрузка через mmap) или json
+SNAPSHOT_FORMAT = os.getenv('SNAPSHOT_FORMAT', 'binary')
+# Файл снапшота: расширение соответствует формату. Прежний user_data.json
+# загружается один раз, пока нового файла нет, и остается на месте нетронутым
+LEGACY_DATA_FILE_PATH = 'user_data.json'
+DATA_FILE_PATH = os.getenv('DATA_FILE_PATH', 'user_data.snap' if SNAPSHOT_FORMAT == 'binary' else LEGACY_DATA_FILE_PATH)
+
+# Лимиты данных в памяти (DataManager): давно не запрошенные пользователи
+# вытесняются и подгружаются снова при обращении; 0 - без ограничения.
+# Записи - транзакции, цели и инвестиции (~ занимаемая память)
+MAX_RESIDENT_USERS = int(os.getenv('MAX_RESIDENT_USERS', '0'))
+MAX_RESIDENT_RECORDS = int(os.getenv('MAX_RESIDENT_RECORDS', '0'))
+
+# Максимальное число операций в одном запросе /api/batch
+BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '1000'))
+
+# Лимит памяти кеша сериализованных ответов /api/user_data (байт)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Метрики /metrics (Prometheus) и выборочное профилирование медленных запросов:
+# доля профилируемых запросов (0 - выключено), порог "медленного" запроса и каталог профилей
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '500'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+# Фоновый пересчет days_left/daily целей после полуночи (чтения пересчитывают цели и без него)
+GOAL_SCHEDULER_ENABLED = os.getenv('GOAL_SCHEDULER_ENABLED', 'True').lower() == 'true'
+# Проход по уже загруженным в память пользователям при запуске (остальные - при первом чтении)
+GOAL_SCHEDULER_RESIDENT_PASS = os.getenv('GOAL_SCHEDULER_RESIDENT_PASS', 'False').lower() == 'true'
+
+# Файл цен инструментов (JSON или CSV) для переоценки инвестиций; пусто - стоимость вводит пользователь
+PRICES_FILE = os.getenv('PRICES_FILE', '')
+PRICE_REFRESH_INTERVAL = float(os.getenv('PRICE_REFRESH_INTERVAL', '60'))
+
+# Максимальный размер загружаемой выписки для /api/import
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Максимум пользовательских правил категоризации
+CATEGORY_RULES_MAX = int(os.getenv('CATEGORY_RULES_MAX', '200'))
+
+# Размер страницы поиска по транзакциям (/api/search) и её максимум
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))
+SEARCH_PAGE_SIZE_MAX = int(os.getenv('SEARCH_PAGE_SIZE_MAX', '100'))
+
+# Компактное колоночное хранение транзакций в памяти
+COLUMNAR_TRANSACTIONS = os.getenv('COLUMNAR_TRANSACTIONS', 'False').lower() == 'true'
+
+# Асинхронный режим бота (async_bot.py): обновления приходят на вебхук
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+BOT_MAX_CONCURRENT_UPDATES = int(os.getenv('BOT_MAX_CONCURRENT_UPDATES', '256'))
+# Адрес Bot API (для локального fake_telegram.py), по умолчанию api.telegram.org
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
 
 print(f"Конфигурация загружена: BOT_USERNAME={BOT_USERNAME}, WEB_APP_URL={WEB_APP_URL}")
\ No newline at end of file
@@ -5,20 +5,74 @@
 Вместо базы данных используем хранение в памяти
 """
 
-import json
 import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 
-class DataManager:
+import serializers
+import snapshot
+from aggregates import DailyBalance, summarize_transactions
+from changelog import ChangeLog
+from cold_store import ColdStore
+from columnar_store import ColumnarTransactionStore
+from record_store import RecordStore, TransactionStore
+from storage import Storage
+from wal import WriteAheadLog, read_records
+
+class DataManager(Storage):
     """Класс для управления данными пользователей в памяти"""
     
-    def __init__(self):
+    # Число блокировок, по которым распределяются пользователи
+    LOCK_STRIPES = 64
+    
+    def __init__(self, columnar: bool = False, snapshot_format: str = 'binary'):
+        # Класс хранилища транзакций: словари или компактные колонки
+        self._transaction_store = ColumnarTransactionStore if columnar else TransactionStore
+        
+        # Формат снапшота: binary (индекс + ленивая загрузка) или json
+        self.snapshot_format = snapshot_format
+        self._snapshot = None
+        # Пользователи, уже загруженные из снапшота (или удаленные после его открытия)
+        self._faulted = set()
+        # Пользователи, измененные после записи снапшота
+        self._dirty = set()
+        
+        # Вытеснение холодных пользователей (включается через enable_tiering)
+        self._cold = None
+        self._resident = OrderedDict()
+        self._resident_records = 0
+        self._max_resident_users = 0
+        self._max_resident_records = 0
+        self._tier_lock = threading.Lock()
+        self._tier_counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'spills': 0}
+        
         self.users_data = {}
         self.transactions = {}
         self.goals = {}
         self.investments = {}
         
+        # Ревизии изменений пользователей для /api/sync
+        self._changelogs = {}
+        self.sync_epoch = uuid.uuid4().hex
+        
+        # Изменения одного пользователя сериализуются, разные пользователи
+        # попадают на разные блокировки и работают параллельно
+        self._stripes = [threading.RLock() for _ in range(self.LOCK_STRIPES)]
+        
+        # Долговременное хранение (включается через enable_persistence)
+        self._wal = None
+        self._wal_seq = 0
+        self._data_file = None
+        self._compact_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._background = None
+        
         # Загружаем тестовые данные
         self._load_initial_data()
     
@@ -43,7 +97,7 @@ class DataManager:
         }
         
         # Тестовые транзакции
-        self.transactions[test_user_id] = [
+        self.transactions[test_user_id] = self._transaction_store([
             {
                 'id': 1,
                 'type': 'income',
@@ -68,10 +122,10 @@ class DataManager:
                 'description': 'Бензин',
                 'date': '02.02.2024, 14:15'
             }
-        ]
+        ])
         
         # Тестовые цели
-        self.goals[test_user_id] = [
+        self.goals[test_user_id] = RecordStore([
             {
                 'id': 1,
                 'name': 'Новый ноутбук',
@@ -96,10 +150,10 @@ class DataManager:
                 'daily': 740.74,
                 'created': '2024-01-20'
             }
-        ]
+        ])
         
         # Тестовые инвестиции
-        self.investments[test_user_id] = [
+        self.investments[test_user_id] = RecordStore([
             {
                 'id': 1,
                 'name': 'ЛУКОЙЛ',
@@ -133,153 +187,777 @@ class DataManager:
                 'profit_percent': 6.7,
                 'buy_date': '2024-01-20'
             }
-        ]
+        ])
+    
+    # ========== БЛОКИРОВКИ ==========
+    
+    def _user_lock(self, user_id: Any) -> threading.RLock:
+        """Блокировка (полоса), за которой закреплен пользователь"""
+        return self._stripes[hash(user_id) % self.LOCK_STRIPES]
+    
+    def user_lock(self, user_id: int) -> threading.RLock:
+        """
+        Блокировка пользователя для составных операций (чтение-изменение-запись
+        баланса и т.п.); методы DataManager берут её сами, она реентерабельна
+        """
+        return self._user_lock(user_id)
+    
+    @contextmanager
+    def batch(self):
+        """Пакет изменений: записи журнала сбрасываются на диск один раз в конце"""
+        if self._wal is None:
+            yield
+            return
+        
+        with self._wal.deferred():
+            yield
+    
+    @contextmanager
+    def _all_locks(self):
+        """Захват всех полос - для снапшота всего состояния"""
+        with ExitStack() as stack:
+            for lock in self._stripes:
+                stack.enter_context(lock)
+            yield
     
     # ========== МЕТОДЫ ДЛЯ ПОЛЬЗОВАТЕЛЕЙ ==========
     
     def get_user_data(self, user_id: int) -> Optional[Dict]:
         """Получение данных пользователя"""
-        return self.users_data.get(user_id)
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            return self.users_data.get(user_id)
     
     def save_user_data(self, user_id: int, data: Dict) -> bool:
         """Сохранение данных пользователя"""
-        self.users_data[user_id] = data
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            self.users_data[user_id] = data
+            self._record_change(user_id, 'user')
+            self._log('user', user_id, data)
         return True
     
     def delete_user_data(self, user_id: int) -> bool:
         """Удаление данных пользователя"""
-        if user_id in self.users_data:
-            del self.users_data[user_id]
-        if user_id in self.transactions:
-            del self.transactions[user_id]
-        if user_id in self.goals:
-            del self.goals[user_id]
-        if user_id in self.investments:
-            del self.investments[user_id]
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            if user_id in self.users_data:
+                del self.users_data[user_id]
+            if user_id in self.transactions:
+                del self.transactions[user_id]
+            if user_id in self.goals:
+                del self.goals[user_id]
+            if user_id in self.investments:
+                del self.investments[user_id]
+            if user_id in self._changelogs:
+                self._changelogs[user_id].reset()
+            self._log('del_user', user_id)
         return True
     
     # ========== МЕТОДЫ ДЛЯ ТРАНЗАКЦИЙ ==========
     
     def get_user_transactions(self, user_id: int) -> List[Dict]:
         """Получение транзакций пользователя"""
-        return self.transactions.get(user_id, [])
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            return list(store.items()) if store is not None else []
+    
+    def get_transaction(self, user_id: int, transaction_id: Any) -> Optional[Dict]:
+        """Получение транзакции по id"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            return store.get(transaction_id) if store is not None else None
+    
+    def get_transactions_range(self, user_id: int, start: Any = None, end: Any = None,
+                               type: Optional[str] = None) -> List[Dict]:
+        """
+        Транзакции пользователя за период [start, end] (datetime или timestamp,
+        None - без ограничения), отсортированные по дате
+        """
+        if isinstance(start, datetime):
+            start = start.timestamp()
+        if isinstance(end, datetime):
+            end = end.timestamp()
+        
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            return store.range(start, end, type) if store is not None else []
     
     def add_transaction(self, user_id: int, transaction: Dict) -> bool:
         """Добавление новой транзакции"""
-        if user_id not in self.transactions:
-            self.transactions[user_id] = []
-        
-        # Генерируем ID если нет
-        if 'id' not in transaction:
-            transaction['id'] = int(datetime.now().timestamp() * 1000)
-        
-        self.transactions[user_id].append(transaction)
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            if user_id not in self.transactions:
+                self.transactions[user_id] = self._transaction_store()
+            
+            # Генерируем ID если нет
+            if 'id' not in transaction:
+                transaction['id'] = int(datetime.now().timestamp() * 1000)
+            
+            self.transactions[user_id].upsert(transaction)
+            self._record_change(user_id, 'transactions', transaction['id'])
+            self._log('tx', user_id, transaction)
         return True
     
     def delete_transaction(self, user_id: int, transaction_id: Any) -> bool:
         """Удаление транзакции"""
-        if user_id in self.transactions:
-            self.transactions[user_id] = [
-                t for t in self.transactions[user_id] 
-                if str(t.get('id')) != str(transaction_id)
-            ]
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            if user_id in self.transactions and self.transactions[user_id].remove(transaction_id) is not None:
+                self._record_change(user_id, 'transactions', transaction_id, deleted=True)
+            self._log('del_tx', user_id, transaction_id)
         return True
     
+    def search_transactions(self, user_id: int, query: str, offset: int = 0,
+                            limit: int = 20) -> Tuple[int, List[Dict]]:
+        """Поиск по обратному индексу хранилища (строится при первом поиске)"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            return store.search(query, offset, limit) if store is not None else (0, [])
+    
+    # ========== АГРЕГАТЫ ПО ТРАНЗАКЦИЯМ ==========
+    
+    def get_monthly_totals(self, user_id: int, month: Optional[str] = None) -> Dict[str, float]:
+        """Доходы и расходы пользователя за месяц 'YYYY-MM' (по умолчанию текущий)"""
+        month = month or datetime.now().strftime('%Y-%m')
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            if store is None:
+                return {'income': 0.0, 'expense': 0.0}
+            return store.totals.month_totals(month)
+    
+    def refresh_monthly_stats(self, user_id: int, user_data: Optional[Dict] = None) -> Optional[Dict]:
+        """Пересчет месячных показателей пользователя по нарастающим итогам"""
+        with self._user_lock(user_id):
+            return super().refresh_monthly_stats(user_id, user_data)
+    
+    def _period_totals(self, user_id: int, start: Optional[float], end: Optional[float],
+                       months: Optional[List[str]]) -> Dict:
+        """Календарные периоды - по нарастающим итогам, неделя - по индексу дат"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            if store is None:
+                return summarize_transactions([])
+            
+            if months is None and start is not None:
+                return summarize_transactions(store.range(start, end))
+            return store.totals.summarize(months)
+    
+    def _recent_transactions(self, user_id: int, limit: int, start: Optional[float],
+                             end: Optional[float]) -> List[Dict]:
+        """Последние транзакции периода по индексу дат"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            return store.recent(limit, start, end) if store is not None else []
+    
+    def _daily_balance(self, user_id: int) -> DailyBalance:
+        """Изменения баланса по дням из хранилища транзакций пользователя"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.transactions.get(user_id)
+            return store.daily if store is not None else DailyBalance()
+    
     # ========== МЕТОДЫ ДЛЯ ЦЕЛЕЙ ==========
     
     def get_user_goals(self, user_id: int) -> List[Dict]:
         """Получение целей пользователя"""
-        return self.goals.get(user_id, [])
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.goals.get(user_id)
+            return list(store.items()) if store is not None else []
+    
+    def get_goal(self, user_id: int, goal_id: Any) -> Optional[Dict]:
+        """Получение цели по id"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.goals.get(user_id)
+            return store.get(goal_id) if store is not None else None
     
     def save_goal(self, user_id: int, goal: Dict) -> bool:
-        """Сохранение цели"""
-        if user_id not in self.goals:
-            self.goals[user_id] = []
-        
-        # Проверяем, существует ли уже цель с таким ID
-        for i, existing_goal in enumerate(self.goals[user_id]):
-            if str(existing_goal.get('id')) == str(goal.get('id')):
-                self.goals[user_id][i] = goal
-                return True
-        
-        # Если цель новая, добавляем
-        self.goals[user_id].append(goal)
+        """Сохранение цели (новая добавляется, существующая с тем же id заменяется)"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            if user_id not in self.goals:
+                self.goals[user_id] = RecordStore()
+            
+            self.goals[user_id].upsert(goal)
+            self._record_change(user_id, 'goals', goal.get('id'))
+            self._log('goal', user_id, goal)
         return True
     
     def delete_goal(self, user_id: int, goal_id: Any) -> bool:
         """Удаление цели"""
-        if user_id in self.goals:
-            self.goals[user_id] = [
-                g for g in self.goals[user_id] 
-                if str(g.get('id')) != str(goal_id)
-            ]
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            if user_id in self.goals and self.goals[user_id].remove(goal_id) is not None:
+                self._record_change(user_id, 'goals', goal_id, deleted=True)
+            self._log('del_goal', user_id, goal_id)
         return True
     
     # ========== МЕТОДЫ ДЛЯ ИНВЕСТИЦИЙ ==========
     
     def get_user_investments(self, user_id: int) -> List[Dict]:
         """Получение инвестиций пользователя"""
-        return self.investments.get(user_id, [])
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.investments.get(user_id)
+            return list(store.items()) if store is not None else []
+    
+    def get_investment(self, user_id: int, investment_id: Any) -> Optional[Dict]:
+        """Получение инвестиции по id"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = self.investments.get(user_id)
+            return store.get(investment_id) if store is not None else None
     
     def save_investment(self, user_id: int, investment: Dict) -> bool:
-        """Сохранение инвестиции"""
-        if user_id not in self.investments:
-            self.investments[user_id] = []
-        
-        # Проверяем, существует ли уже инвестиция с таким ID
-        for i, existing_investment in enumerate(self.investments[user_id]):
-            if str(existing_investment.get('id')) == str(investment.get('id')):
-                self.investments[user_id][i] = investment
-                return True
-        
-        # Если инвестиция новая, добавляем
-        self.investments[user_id].append(investment)
+        """Сохранение инвестиции (новая добавляется, существующая с тем же id заменяется)"""
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            if user_id not in self.investments:
+                self.investments[user_id] = RecordStore()
+            
+            self.investments[user_id].upsert(investment)
+            self._record_change(user_id, 'investments', investment.get('id'))
+            self._log('inv', user_id, investment)
         return True
     
     def delete_investment(self, user_id: int, investment_id: Any) -> bool:
         """Удаление инвестиции"""
-        if user_id in self.investments:
-            self.investments[user_id] = [
-                inv for inv in self.investments[user_id] 
-                if str(inv.get('id')) != str(investment_id)
-            ]
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            if user_id in self.investments and self.investments[user_id].remove(investment_id) is not None:
+                self._record_change(user_id, 'investments', investment_id, deleted=True)
+            self._log('del_inv', user_id, investment_id)
         return True
     
+    # ========== ПОТОКОВОЕ ЧТЕНИЕ ==========
+    
+    def user_ids(self) -> List[Any]:
+        """user_id всех пользователей, включая незагруженных и вытесненных"""
+        with self._all_locks():
+            user_ids = set(self.users_data) | set(self.transactions) | set(self.goals) | set(self.investments)
+            skip = user_ids | self._faulted
+            if self._cold is not None:
+                for user_id in self._cold.ids():
+                    if user_id not in skip:
+                        skip.add(user_id)
+                        if not self._cold.is_deleted(user_id):
+                            user_ids.add(user_id)
+            if self._snapshot is not None:
+                user_ids.update(user_id for user_id in self._snapshot.ids() if user_id not in skip)
+        return list(user_ids)
+    
+    def resident_user_ids(self) -> List[Any]:
+        """user_id пользователей в памяти: незагруженные и вытесненные не подгружаются"""
+        with self._all_locks():
+            return list(set(self.users_data) | set(self.transactions) | set(self.goals) | set(self.investments))
+    
+    
+    def iter_records(self, kind: str, user_id: int, chunk_size: int = 500) -> Iterator[Dict]:
+        """
+        Записи пользователя порциями: блокировка берется на каждую порцию,
+        а не на весь экспорт; записи, удаленные по ходу чтения, пропускаются
+        """
+        stores = {'transactions': self.transactions, 'goals': self.goals,
+                  'investments': self.investments}[kind]
+        
+        with self._user_lock(user_id):
+            self._ensure_loaded(user_id)
+            store = stores.get(user_id)
+            keys = store.ids() if store is not None else []
+        
+        for start in range(0, len(keys), chunk_size):
+            with self._user_lock(user_id):
+                # Между порциями пользователя могли вытеснить из памяти
+                self._ensure_loaded(user_id)
+                store = stores.get(user_id)
+                if store is None:
+                    return
+                chunk = [store.get(key) for key in keys[start:start + chunk_size]]
+            
+            for record in chunk:
+                if record is not None:
+                    yield record
+    
+    # ========== РЕВИЗИИ ДЛЯ СИНХРОНИЗАЦИИ ==========
+    
+    def _record_change(self, user_id: Any, kind: str, record_id: Any = None, deleted: bool = False):
+        """Новая ревизия пользователя (вызывается под его блокировкой)"""
+        changelog = self._changelogs.get(user_id)
+        if changelog is None:
+            changelog = self._changelogs[user_id] = ChangeLog()
+        changelog.record(kind, record_id, deleted)
+    
+    def get_revision(self, user_id: int) -> int:
+        """Текущая ревизия данных пользователя"""
+        with self._user_lock(user_id):
+            changelog = self._changelogs.get(user_id)
+            return changelog.revision if changelog is not None else 0
+    
+    def _changes_since(self, user_id: int, revision: int) -> Optional[List]:
+        """Изменения после ревизии из журнала изменений пользователя"""
+        with self._user_lock(user_id):
+            changelog = self._changelogs.get(user_id)
+            if changelog is None:
+                return [] if revision == 0 else None
+            return changelog.since(revision)
+    
+    # ========== ВЫТЕСНЕНИЕ ХОЛОДНЫХ ПОЛЬЗОВАТЕЛЕЙ ==========
+    
+    def enable_tiering(self, max_users: int = 0, max_records: int = 0,
+                       directory: Optional[str] = None):
+        """
+        Ограничение данных в памяти: не больше max_users пользователей и
+        max_records записей (транзакций, целей, инвестиций) - 0 без ограничения.
+        Давно не запрошенные пользователи вытесняются: неизмененные просто
+        выгружаются (читаются снова из снапшота), измененные после снапшота
+        сначала записываются в файл вытеснения в directory
+        """
+        with self._all_locks():
+            if self._cold is None:
+                self._cold = ColdStore(directory)
+            self._max_resident_users = max_users
+            self._max_resident_records = max_records
+    
+    def _user_weight(self, user_id: Any) -> int:
+        """Размер данных пользователя в записях (оценка занимаемой памяти)"""
+        weight = 1
+        for stores in (self.transactions, self.goals, self.investments):
+            store = stores.get(user_id)
+            if store is not None:
+                weight += len(store)
+        return weight
+    
+    def _touch(self, user_id: Any, hit: bool):
+        """Обращение к пользователю: обновление LRU и вытеснение при превышении лимита"""
+        weight = self._user_weight(user_id)
+        with self._tier_lock:
+            self._resident_records += weight - self._resident.pop(user_id, 0)
+            self._resident[user_id] = weight
+            self._tier_counters['hits' if hit else 'misses'] += 1
+        
+        if self._over_budget():
+            self._evict_cold(user_id)
+    
+    def _over_budget(self) -> bool:
+        return bool(
+            (self._max_resident_users and len(self._resident) > self._max_resident_users) or
+            (self._max_resident_records and self._resident_records > self._max_resident_records)
+        )
+    
+    def _evict_cold(self, current: Any):
+        """
+        Вытеснение самых давних пользователей, пока не уложимся в лимит.
+        Блокировки чужих пользователей берутся без ожидания (занятых пропускаем),
+        поэтому взаимоблокировки с другими потоками невозможны
+        """
+        while self._over_budget():
+            with self._tier_lock:
+                candidates = [user_id for user_id in islice(self._resident, 16) if user_id != current]
+            
+            evicted = False
+            for user_id in candidates:
+                lock = self._user_lock(user_id)
+                if not lock.acquire(blocking=False):
+                    continue
+                try:
+                    evicted = self._evict(user_id) or evicted
+                finally:
+                    lock.release()
+                if not self._over_budget():
+                    return
+            
+            if not evicted:
+                return
+    
+    def _evict(self, user_id: Any) -> bool:
+        """Выгрузка пользователя из памяти (под его блокировкой)"""
+        if user_id not in self._faulted:
+            return False
+        
+        # Изменения после снапшота сохраняются в файл вытеснения
+        if self._snapshot is None or user_id in self._dirty:
+            record = self._user_record(user_id)
+            if record['user'] is not None or any(record[kind] for kind in ('transactions', 'goals', 'investments')):
+                self._cold.put(user_id, serializers.dumps_bytes(record))
+            else:
+                self._cold.put(user_id, None)
+            self._tier_counters['spills'] += 1
+        
+        for stores in (self.users_data, self.transactions, self.goals, self.investments):
+            stores.pop(user_id, None)
+        self._faulted.discard(user_id)
+        self._dirty.discard(user_id)
+        
+        with self._tier_lock:
+            self._resident_records -= self._resident.pop(user_id, 0)
+            self._tier_counters['evictions'] += 1
+        return True
+    
+    def _reset_tiers(self):
+        """Сброс состояния вытеснения при загрузке снапшота (под всеми блокировками)"""
+        self._faulted = set()
+        self._dirty = set()
+        if self._cold is not None:
+            self._cold.clear()
+        with self._tier_lock:
+            self._resident.clear()
+            self._resident_records = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики кеша пользователей в памяти"""
+        with self._tier_lock:
+            stats = dict(self._tier_counters)
+            stats.update({
+                'resident_users': len(self._resident),
+                'resident_records': self._resident_records,
+                'max_resident_users': self._max_resident_users,
+                'max_resident_records': self._max_resident_records
+            })
+        stats['cold_users'] = len(self._cold) if self._cold is not None else 0
+        stats['tiering'] = self._cold is not None
+        return stats
+    
     # ========== СЕРИАЛИЗАЦИЯ ДАННЫХ ==========
     
+    def _dump_state(self, wal_seq: int) -> bytes:
+        """Сериализация всех данных в формате снапшота (вызывается под блокировкой)"""
+        if self.snapshot_format == 'binary':
+            return snapshot.encode(self._dump_users(), wal_seq)
+        
+        # JSON прежнего формата: незагруженных и вытесненных пользователей
+        # приходится декодировать
+        data = {
+            'users': {},
+            'transactions': {},
+            'goals': {},
+            'investments': {},
+            'wal_seq': wal_seq,
+            'timestamp': datetime.now().isoformat()
+        }
+        for user_id, blob in self._dump_users():
+            record = serializers.loads(blob)
+            if record.get('user') is not None:
+                data['users'][user_id] = record['user']
+            for kind in ('transactions', 'goals', 'investments'):
+                if record.get(kind):
+                    data[kind][user_id] = record[kind]
+        return serializers.dumps_bytes(data)
+    
+    def _dump_users(self) -> Iterator:
+        """(user_id, JSON данных) всех пользователей для снапшота"""
+        user_ids = set(self.users_data) | set(self.transactions) | set(self.goals) | set(self.investments)
+        for user_id in user_ids:
+            yield user_id, serializers.dumps_bytes(self._user_record(user_id))
+        
+        # Вытесненные и незагруженные пользователи переносятся без декодирования
+        skip = user_ids | self._faulted
+        if self._cold is not None:
+            for user_id in self._cold.ids():
+                if user_id not in skip:
+                    skip.add(user_id)
+                    blob = self._cold.raw(user_id)
+                    if blob is not None:
+                        yield user_id, blob
+        
+        if self._snapshot is not None:
+            for user_id in self._snapshot.ids():
+                if user_id not in skip:
+                    yield user_id, self._snapshot.raw(user_id)
+    
+    def _user_record(self, user_id: Any) -> Dict:
+        """Все данные одного пользователя (запись бинарного снапшота)"""
+        stores = {
+            kind: getattr(self, kind).get(user_id)
+            for kind in ('transactions', 'goals', 'investments')
+        }
+        record = {kind: store.items() if store is not None else [] for kind, store in stores.items()}
+        record['user'] = self.users_data.get(user_id)
+        return record
+    
+    def _ensure_loaded(self, user_id: Any):
+        """
+        Загрузка данных пользователя при первом обращении - из файла вытеснения
+        или из снапшота (вызывается под его блокировкой)
+        """
+        if user_id in self._faulted:
+            if self._cold is not None:
+                self._touch(user_id, hit=True)
+            return
+        if self._snapshot is None and self._cold is None:
+            return
+        
+        if self._cold is not None and user_id in self._cold:
+            # В файле вытеснения - данные новее снапшота
+            blob = self._cold.pop(user_id)
+            self._dirty.add(user_id)
+            record = serializers.loads(blob) if blob is not None else None
+        else:
+            blob = self._snapshot.raw(user_id) if self._snapshot is not None else None
+            if blob is None and not self._has_data(user_id):
+                # Пользователя нет нигде - не запоминаем, иначе запросы
+                # со случайными id растят множество без предела
+                return
+            record = serializers.loads(blob) if blob is not None else None
+        
+        self._faulted.add(user_id)
+        if record is not None:
+            if record.get('user') is not None:
+                self.users_data[user_id] = record['user']
+            if record.get('transactions'):
+                self.transactions[user_id] = self._transaction_store(record['transactions'])
+            if record.get('goals'):
+                self.goals[user_id] = RecordStore(record['goals'])
+            if record.get('investments'):
+                self.investments[user_id] = RecordStore(record['investments'])
+        
+        if self._cold is not None:
+            self._touch(user_id, hit=False)
+    
+    def _has_data(self, user_id: Any) -> bool:
+        """Данные пользователя уже в памяти (созданы после снапшота или загружены из JSON)"""
+        return any(user_id in stores for stores in (self.users_data, self.transactions, self.goals, self.investments))
+    
+    def _open_snapshot(self, filepath: str):
+        """Переход на (новый) бинарный снапшот: данные пользователей подгружаются лениво"""
+        reader = snapshot.SnapshotReader(filepath)
+        previous = self._snapshot
+        self._snapshot = reader
+        if previous is not None:
+            previous.close()
+        return reader
+    
+    def _unload_unfaulted(self):
+        """
+        Выгрузка пользователей, попавших в память в обход ленивой загрузки
+        (тестовые данные, JSON прежнего формата) - они уже есть в снапшоте
+        """
+        for stores in (self.users_data, self.transactions, self.goals, self.investments):
+            for user_id in [user_id for user_id in stores if user_id not in self._faulted]:
+                del stores[user_id]
+    
+    @staticmethod
+    def _load_stores(data: Dict, store_class: type = RecordStore) -> Dict[int, RecordStore]:
+        """Списки из файла -> индексированные хранилища записей"""
+        return {
+            user_id: store_class(records)
+            for user_id, records in DataManager._int_keys(data).items()
+        }
+    
+    @staticmethod
+    def _write_atomic(filepath: str, content: bytes):
+        """Атомарная запись файла: временный файл + fsync + rename"""
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    
+    @staticmethod
+    def _int_keys(data: Dict) -> Dict:
+        """JSON превращает ключи user_id в строки - возвращаем им тип int"""
+        return {
+            int(k) if isinstance(k, str) and k.lstrip('-').isdigit() else k: v
+            for k, v in data.items()
+        }
+    
     def save_to_file(self, filepath: str) -> bool:
         """Сохранение всех данных в файл"""
         try:
-            data = {
-                'users': self.users_data,
-                'transactions': self.transactions,
-                'goals': self.goals,
-                'investments': self.investments,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with self._all_locks():
+                content = self._dump_state(self._wal.seq if self._wal else self._wal_seq)
             
+            self._write_atomic(filepath, content)
             return True
         except Exception as e:
             print(f"Ошибка при сохранении данных: {e}")
             return False
     
     def load_from_file(self, filepath: str) -> bool:
-        """Загрузка данных из файла"""
+        """Загрузка данных из файла: снапшот + воспроизведение журнала"""
+        loaded = False
         try:
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+            if snapshot.is_snapshot(filepath):
+                # Бинарный снапшот: читается только заголовок, пользователи - по требованию
+                with self._all_locks():
+                    self.users_data = {}
+                    self.transactions = {}
+                    self.goals = {}
+                    self.investments = {}
+                    self._reset_tiers()
+                    self._wal_seq = self._open_snapshot(filepath).wal_seq
                 
-                self.users_data = data.get('users', {})
-                self.transactions = data.get('transactions', {})
-                self.goals = data.get('goals', {})
-                self.investments = data.get('investments', {})
+                loaded = True
+            elif os.path.exists(filepath):
+                with open(filepath, 'rb') as f:
+                    data = serializers.loads(f.read())
                 
-                return True
+                with self._all_locks():
+                    self.users_data = self._int_keys(data.get('users', {}))
+                    self.transactions = self._load_stores(data.get('transactions', {}), self._transaction_store)
+                    self.goals = self._load_stores(data.get('goals', {}))
+                    self.investments = self._load_stores(data.get('investments', {}))
+                    self._reset_tiers()
+                    self._wal_seq = data.get('wal_seq', 0)
+                
+                loaded = True
+            
+            loaded = self._replay_wal(self._wal_path(filepath)) or loaded
         except Exception as e:
             print(f"Ошибка при загрузке данных: {e}")
         
-        return False
\ No newline at end of file
+        return loaded
+    
+    # ========== ЖУРНАЛ И СНАПШОТЫ ==========
+    
+    # Операция журнала -> метод, который её повторяет
+    _REPLAY_METHODS = {
+        'user': 'save_user_data',
+        'del_user': 'delete_user_data',
+        'tx': 'add_transaction',
+        'del_tx': 'delete_transaction',
+        'goal': 'save_goal',
+        'del_goal': 'delete_goal',
+        'inv': 'save_investment',
+        'del_inv': 'delete_investment',
+    }
+    
+    @staticmethod
+    def _wal_path(filepath: str) -> str:
+        """Путь к журналу для файла данных"""
+        return filepath + '.wal'
+    
+    def _log(self, op: str, user_id: Any, payload: Any = None):
+        """
+        Запись мутации в журнал (если включено долговременное хранение);
+        пользователь отличается от снапшота до следующей компактизации
+        """
+        self._dirty.add(user_id)
+        # Новый пользователь (его не было в снапшоте) загружен с момента создания
+        if user_id not in self._faulted and self._has_data(user_id):
+            self._faulted.add(user_id)
+        if self._wal is not None:
+            self._wal.append(op, user_id, payload)
+    
+    def _replay_wal(self, wal_path: str) -> bool:
+        """Повтор записей журнала, которые новее снапшота"""
+        replayed = False
+        for seq, op, user_id, payload in read_records(wal_path):
+            if seq <= self._wal_seq:
+                continue
+            
+            method = getattr(self, self._REPLAY_METHODS[op])
+            if op == 'del_user':
+                method(user_id)
+            else:
+                method(user_id, payload)
+            
+            self._wal_seq = seq
+            replayed = True
+        
+        return replayed
+    
+    def enable_persistence(self, filepath: str, fsync_interval: float = 1.0,
+                           compact_interval: float = 300.0,
+                           compact_size: int = 16 * 1024 * 1024,
+                           legacy_filepath: Optional[str] = None) -> bool:
+        """
+        Включение долговременного хранения: снапшот + журнал мутаций.
+        Журнал сбрасывается на диск раз в fsync_interval секунд,
+        в фоне периодически сворачивается в новый снапшот.
+        legacy_filepath - прежний файл данных, из которого загружаемся,
+        пока filepath еще не создан (сам он не перезаписывается)
+        """
+        if (legacy_filepath and legacy_filepath != filepath and not os.path.exists(filepath)
+                and os.path.exists(legacy_filepath)):
+            print(f"Перенос данных из {legacy_filepath} в {filepath}")
+            self.load_from_file(legacy_filepath)
+        else:
+            self.load_from_file(filepath)
+        
+        self._data_file = filepath
+        self._wal = WriteAheadLog(self._wal_path(filepath), fsync_interval=fsync_interval)
+        self._wal.seq = self._wal_seq
+        
+        # Сразу сворачиваем воспроизведенный журнал в снапшот
+        self.compact()
+        
+        self._stop_event.clear()
+        self._background = threading.Thread(
+            target=self._background_loop,
+            args=(fsync_interval, compact_interval, compact_size),
+            daemon=True
+        )
+        self._background.start()
+        return True
+    
+    def compact(self) -> bool:
+        """Запись снапшота текущего состояния и сброс журнала"""
+        if not self._data_file:
+            return False
+        
+        with self._compact_lock:
+            try:
+                with self._all_locks():
+                    seq = self._wal.rotate() if self._wal else self._wal_seq
+                    content = self._dump_state(seq)
+                    dumped_cold = self._cold.entries() if self._cold is not None else {}
+                    dirty, self._dirty = self._dirty, set()
+                
+                try:
+                    self._write_atomic(self._data_file, content)
+                except Exception:
+                    self._dirty |= dirty
+                    raise
+                self._wal_seq = seq
+                
+                # Незагруженные и вытесненные пользователи теперь читаются из нового файла
+                if self.snapshot_format == 'binary':
+                    with self._all_locks():
+                        self._open_snapshot(self._data_file)
+                        if self._cold is not None:
+                            self._cold.drop(dumped_cold)
+                            self._unload_unfaulted()
+                
+                if self._wal:
+                    self._wal.discard_old()
+                return True
+            except Exception as e:
+                print(f"Ошибка при компактизации данных: {e}")
+                return False
+    
+    def _background_loop(self, fsync_interval: float, compact_interval: float, compact_size: int):
+        """Фоновый поток: пакетный fsync журнала и периодическая компактизация"""
+        last_compact = time.monotonic()
+        
+        while not self._stop_event.wait(fsync_interval):
+            self._wal.flush()
+            
+            wal_size = self._wal.size()
+            if wal_size and (wal_size >= compact_size or
+                             time.monotonic() - last_compact >= compact_interval):
+                self.compact()
+                last_compact = time.monotonic()
+    
+    def close(self):
+        """Остановка фонового потока, финальный снапшот и закрытие журнала"""
+        if self._wal is None:
+            return
+        
+        self._stop_event.set()
+        if self._background is not None:
+            self._background.join()
+            self._background = None
+        
+        self.compact()
+        self._wal.close()
+        self._wal = None
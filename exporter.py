@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Потоковый экспорт данных пользователя (CSV, JSON, NDJSON)
+Данные отдаются кусками по мере чтения из хранилища, поэтому память
+не зависит от длины истории; при необходимости поток сжимается gzip на лету
+"""
+
+import csv
+import zlib
+from typing import Dict, Iterable, Iterator, List
+
+import serializers
+from storage import Storage
+
+# Размер куска, которым отдается ответ (строки копятся до этого размера)
+CHUNK_SIZE = 64 * 1024
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: writerow возвращает готовую строку"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _chunked(parts: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Склейка мелких строк в куски по chunk_size байт"""
+    buffer: List[bytes] = []
+    size = 0
+    for part in parts:
+        data = part.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _dumps(data) -> str:
+    """Компактная сериализация одной записи"""
+    return serializers.dumps(data)
+
+
+def _csv_rows(storage: Storage, user_id: int, user_data: Dict, export_date: str) -> Iterator[list]:
+    """Строки CSV: шапка, общая информация, транзакции, цели, инвестиции"""
+    # Заголовок
+    yield ['Финансовые данные пользователя', user_data.get('first_name', '')]
+    yield ['Дата экспорта:', export_date]
+    yield []
+
+    # Общая информация
+    yield ['ОБЩАЯ ИНФОРМАЦИЯ']
+    yield ['Баланс:', f"{user_data.get('balance', 0):,} ₽"]
+    yield ['Доходы (месяц):', f"{user_data.get('monthly_income', 0):,} ₽"]
+    yield ['Расходы (месяц):', f"{user_data.get('monthly_expenses', 0):,} ₽"]
+    yield ['Сбережения:', f"{user_data.get('savings_percent', 0)}%"]
+    yield ['Инвестиции:', f"{user_data.get('investments_total', 0):,} ₽"]
+    yield []
+
+    # Транзакции
+    yield ['ТРАНЗАКЦИИ']
+    yield ['Дата', 'Тип', 'Категория', 'Сумма', 'Описание']
+    for t in storage.iter_records('transactions', user_id):
+        yield [
+            t.get('date', ''),
+            'Доход' if t.get('type') == 'income' else 'Расход',
+            t.get('category', ''),
+            f"{t.get('amount', 0):,} ₽",
+            t.get('description', '')
+        ]
+    yield []
+
+    # Цели
+    yield ['ФИНАНСОВЫЕ ЦЕЛИ']
+    yield ['Название', 'Категория', 'Текущее/Цель', 'Прогресс', 'Дедлайн']
+    for g in storage.iter_records('goals', user_id):
+        yield [
+            g.get('name', ''),
+            g.get('category', ''),
+            f"{g.get('current', 0):,} / {g.get('target', 0):,} ₽",
+            f"{g.get('progress', 0)}%",
+            g.get('deadline', '')
+        ]
+    yield []
+
+    # Инвестиции
+    yield ['ИНВЕСТИЦИИ']
+    yield ['Название', 'Тип', 'Текущая стоимость', 'Инвестировано', 'Прибыль', 'Дата покупки']
+    for i in storage.iter_records('investments', user_id):
+        yield [
+            i.get('name', ''),
+            i.get('type', ''),
+            f"{i.get('amount', 0):,} ₽",
+            f"{i.get('invested', 0):,} ₽",
+            f"+{i.get('profit', 0):,} ₽ ({i.get('profit_percent', 0)}%)",
+            i.get('buy_date', '')
+        ]
+
+
+def stream_csv(storage: Storage, user_id: int, user_data: Dict, export_date: str) -> Iterator[bytes]:
+    """CSV-экспорт кусками"""
+    writer = csv.writer(_Echo())
+    return _chunked(
+        writer.writerow(row) for row in _csv_rows(storage, user_id, user_data, export_date)
+    )
+
+
+def _json_parts(storage: Storage, user_id: int, user_data: Dict, export_date: str) -> Iterator[str]:
+    """Тот же документ, что и jsonify(export_data), но по частям"""
+    yield '{"user":' + _dumps(user_data)
+    for kind in ('transactions', 'goals', 'investments'):
+        yield f',"{kind}":['
+        separator = ''
+        for record in storage.iter_records(kind, user_id):
+            yield separator + _dumps(record)
+            separator = ','
+        yield ']'
+    yield ',"export_date":' + _dumps(export_date) + '}'
+
+
+def stream_json(storage: Storage, user_id: int, user_data: Dict, export_date: str) -> Iterator[bytes]:
+    """JSON-экспорт одним документом, сериализуемым по записи"""
+    return _chunked(_json_parts(storage, user_id, user_data, export_date))
+
+
+# Вид записей -> значение поля type в строке NDJSON
+_NDJSON_TYPES = {'transactions': 'transaction', 'goals': 'goal', 'investments': 'investment'}
+
+
+def _ndjson_lines(storage: Storage, user_id: int, user_data: Dict, export_date: str) -> Iterator[str]:
+    """Строки NDJSON: сначала пользователь, затем по строке на запись"""
+    yield _dumps({'type': 'user', 'data': user_data, 'export_date': export_date}) + '\n'
+    for kind, line_type in _NDJSON_TYPES.items():
+        for record in storage.iter_records(kind, user_id):
+            yield _dumps({'type': line_type, 'data': record}) + '\n'
+
+
+def stream_ndjson(storage: Storage, user_id: int, user_data: Dict, export_date: str) -> Iterator[bytes]:
+    """NDJSON-экспорт: одна запись - одна строка"""
+    return _chunked(_ndjson_lines(storage, user_id, user_data, export_date))
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Сжатие потока gzip на лету (без буферизации всего ответа)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
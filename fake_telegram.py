@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальная имитация Telegram Bot API для проверки асинхронного бота
+без сети: принимает вызовы методов (sendMessage и т.д.), запоминает их
+и отвечает как настоящий API; умеет отправлять обновления на вебхук
+
+    python fake_telegram.py --port 8081
+    TELEGRAM_API_URL=http://127.0.0.1:8081 python async_bot.py
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from aiohttp import ClientSession, web
+
+# Методы, которые возвращают True вместо сообщения
+_BOOLEAN_METHODS = {
+    'answerCallbackQuery', 'deleteMessage', 'setWebhook', 'deleteWebhook',
+    'setMyCommands', 'sendChatAction'
+}
+
+
+class FakeTelegram:
+    """Сервер, отвечающий на вызовы /bot<token>/<method>"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        # Задержка ответа на каждый вызов - имитация сетевого RTT до Telegram
+        self.latency = latency
+
+        self.calls: List[Tuple[str, Dict]] = []
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        """Базовый адрес для TELEGRAM_API_URL"""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        """Запуск сервера (port=0 - свободный порт), возвращает базовый адрес"""
+        application = web.Application()
+        application.router.add_post('/bot{token}/{method}', self._handle)
+        application.router.add_get('/bot{token}/{method}', self._handle)
+
+        self._runner = web.AppRunner(application, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        """Остановка сервера"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def calls_of(self, method: str) -> List[Dict]:
+        """Параметры всех вызовов метода"""
+        return [params for name, params in self.calls if name == method]
+
+    # ---------- обработка вызовов ----------
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = await self._read_params(request)
+
+        self.calls.append((method, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return web.json_response({'ok': True, 'result': self._result(method, params)})
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> Dict:
+        """
+        Параметры вызова: telebot шлет форму даже в GET-запросах,
+        поэтому тело разбирается независимо от HTTP-метода
+        """
+        params = dict(request.query)
+        if request.content_type == 'application/json':
+            params.update(await request.json())
+        elif request.content_type == 'multipart/form-data':
+            reader = await request.multipart()
+            async for part in reader:
+                if part.filename is None:
+                    params[part.name] = await part.text()
+        elif request.can_read_body:
+            params.update(parse_qsl((await request.read()).decode('utf-8')))
+        return params
+
+    def _result(self, method: str, params: Dict):
+        """Ответ метода в формате Bot API"""
+        if method in _BOOLEAN_METHODS:
+            return True
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}
+        if method == 'getWebhookInfo':
+            return {'url': '', 'has_custom_certificate': False, 'pending_update_count': 0}
+
+        # sendMessage и прочие send* - отправленное сообщение
+        chat_id = int(params.get('chat_id', 0))
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': params.get('text', '')
+        }
+
+    # ---------- обновления ----------
+
+    def message_update(self, user_id: int, text: str, first_name: str = 'Тест') -> Dict:
+        """Обновление с сообщением (например, командой /start)"""
+        user = {'id': user_id, 'is_bot': False, 'first_name': first_name, 'username': f'user_{user_id}'}
+        entities = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}] \
+            if text.startswith('/') else []
+        return {
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': user,
+                'text': text,
+                'entities': entities
+            }
+        }
+
+    def callback_update(self, user_id: int, data: str, message_id: int = 1) -> Dict:
+        """Обновление с нажатием inline-кнопки"""
+        user = {'id': user_id, 'is_bot': False, 'first_name': 'Тест'}
+        return {
+            'update_id': next(self._update_ids),
+            'callback_query': {
+                'id': str(next(self._update_ids)),
+                'from': user,
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': message_id,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'text': ''
+                }
+            }
+        }
+
+    @staticmethod
+    async def send_update(webhook_url: str, update: Dict, secret: str = '') -> int:
+        """Отправка обновления на вебхук, как это делает Telegram; возвращает HTTP-статус"""
+        headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+        async with ClientSession() as session:
+            async with session.post(webhook_url, data=json.dumps(update),
+                                    headers={'Content-Type': 'application/json', **headers}) as resp:
+                return resp.status
+
+
+async def _serve(host: str, port: int, latency: float):
+    fake = FakeTelegram(host, port, latency)
+    url = await fake.start()
+    print(f"Fake Telegram Bot API: {url}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа, с')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_serve(args.host, args.port, args.latency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
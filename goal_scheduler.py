@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пересчет производных полей целей (progress, days_left, daily)
+days_left и daily зависят от текущей даты, поэтому сохраненные цели
+устаревают каждый день. Планировщик держит кучу пользователей по дню
+следующего пересчета: фоновый поток после полуночи одним проходом
+обновляет всех, у кого он наступил, а чтения проверяют только дневную
+отметку пользователя и при необходимости пересчитывают его цели сразу.
+В кучу попадают только пользователи, к которым обращались: при запуске
+хранилище не обходится целиком
+"""
+
+import heapq
+import threading
+from datetime import date, datetime, time as dt_time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from storage import Storage
+
+# Самое долгое ожидание фонового потока - на случай перевода часов или сна машины
+MAX_SLEEP_SECONDS = 3600
+
+
+def derive_goal_fields(goal: Dict, today: date) -> Dict[str, Any]:
+    """
+    Производные поля цели на дату today; days_left - полные календарные дни
+    до дедлайна (как в Web App). ValueError - дедлайн не в формате YYYY-MM-DD
+    """
+    current = float(goal.get('current', 0) or 0)
+    target = float(goal.get('target', 0) or 0)
+    deadline = datetime.strptime(goal['deadline'], '%Y-%m-%d').date()
+    days_left = max((deadline - today).days, 0)
+
+    return {
+        'progress': round((current / target) * 100, 1) if target > 0 else 0,
+        'days_left': days_left,
+        'daily': round((target - current) / days_left, 2) if days_left > 0 else 0
+    }
+
+
+class GoalScheduler:
+    """
+    Куча (день пересчета, user_id) и дневная отметка по пользователям
+    Пользователь попадает в кучу на завтра, пока у него есть цели
+    с ненаступившим дедлайном; цели с прошедшим дедлайном больше не меняются
+    """
+
+    def __init__(self, storage: Storage, clock: Callable[[], date] = date.today):
+        self.storage = storage
+        self._clock = clock
+
+        self._heap: List[Tuple[int, Any]] = []
+        # user_id -> день в куче (устаревшие записи кучи пропускаются)
+        self._scheduled: Dict[Any, int] = {}
+        # user_id пользователей, чьи цели уже пересчитаны за _fresh_day
+        self._fresh: set = set()
+        self._fresh_day = 0
+        self._lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {'passes': 0, 'refreshed_users': 0, 'updated_goals': 0}
+
+    def _today(self) -> int:
+        return self._clock().toordinal()
+
+    def _schedule(self, user_id: Any, day: int):
+        """Пересчет пользователя не позже дня day"""
+        with self._lock:
+            scheduled = self._scheduled.get(user_id)
+            if scheduled is not None and scheduled <= day:
+                return
+            self._scheduled[user_id] = day
+            heapq.heappush(self._heap, (day, user_id))
+
+    def schedule_resident(self):
+        """
+        Пользователи, уже загруженные в память, - на сегодня (пакетный проход
+        по запросу). Остальные пересчитываются при первом чтении (ensure_fresh):
+        полный обход поднял бы из снапшота всех пользователей
+        """
+        today = self._today()
+        for user_id in self.storage.resident_user_ids():
+            self._schedule(user_id, today)
+
+    def track(self, user_id: Any):
+        """Цели пользователя изменились - пересчет со следующего дня"""
+        self._schedule(user_id, self._today() + 1)
+
+    def ensure_fresh(self, user_id: Any) -> int:
+        """
+        Вызывается перед чтением целей: пересчет не чаще раза в день
+        на пользователя; возвращает число обновленных целей
+        """
+        today = self._today()
+        with self._lock:
+            if self._fresh_day == today and user_id in self._fresh:
+                return 0
+        return self.refresh_user(user_id, today)
+
+    def refresh_user(self, user_id: Any, today: Optional[int] = None) -> int:
+        """Пересчет и сохранение изменившихся целей пользователя"""
+        today = today if today is not None else self._today()
+        day = date.fromordinal(today)
+        updated = 0
+        active = False
+
+        with self.storage.user_lock(user_id):
+            goals = self.storage.get_user_goals(user_id)
+            if not goals and self.storage.get_user_data(user_id) is None:
+                # Несуществующий пользователь (случайный user_id из запроса) не запоминается
+                return 0
+
+            for goal in goals:
+                try:
+                    fields = derive_goal_fields(goal, day)
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+                active = active or fields['days_left'] > 0
+                if any(goal.get(key) != value for key, value in fields.items()):
+                    self.storage.save_goal(user_id, {**goal, **fields})
+                    updated += 1
+
+        with self._lock:
+            if self._fresh_day != today:
+                self._fresh_day = today
+                self._fresh = set()
+            self._fresh.add(user_id)
+            self._counters['refreshed_users'] += 1
+            self._counters['updated_goals'] += updated
+
+        if active:
+            self._schedule(user_id, today + 1)
+        return updated
+
+    def run_due(self) -> int:
+        """Один проход: пересчет всех пользователей, чей день наступил; число пользователей"""
+        today = self._today()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= today:
+                day, user_id = heapq.heappop(self._heap)
+                if self._scheduled.get(user_id) == day:
+                    del self._scheduled[user_id]
+                    due.append(user_id)
+            self._counters['passes'] += 1
+
+        for user_id in due:
+            try:
+                self.refresh_user(user_id, today)
+            except Exception as e:
+                print(f"Ошибка пересчета целей пользователя {user_id}: {e}")
+        return len(due)
+
+    def _seconds_to_midnight(self) -> float:
+        tomorrow = datetime.combine(date.fromordinal(self._today() + 1), dt_time.min)
+        return max((tomorrow - datetime.now()).total_seconds(), 0) + 1
+
+    def _loop(self, resident_pass: bool):
+        """Фоновый поток: проход после каждой полуночи (и при запуске, если resident_pass)"""
+        if resident_pass:
+            try:
+                self.schedule_resident()
+                self.run_due()
+            except Exception as e:
+                print(f"Ошибка пересчета целей: {e}")
+
+        while not self._stop_event.wait(min(self._seconds_to_midnight(), MAX_SLEEP_SECONDS)):
+            self.run_due()
+
+    def start(self, resident_pass: bool = False):
+        """Запуск фонового потока; resident_pass - сразу пересчитать пользователей в памяти"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, args=(resident_pass,), name='goal-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка фонового потока"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики: проходы, пересчитанные пользователи и цели, размер очереди"""
+        with self._lock:
+            return {**self._counters, 'scheduled': len(self._scheduled)}
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Настройки gunicorn для API (gunicorn -c gunicorn.conf.py app:app)
+Несколько воркеров видят одни данные только с STORAGE_BACKEND=sqlite:
+у хранилища в памяти (memory) в каждом воркере своя копия данных
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', os.getenv('WEB_APP_PORT', '8080'))}"
+
+if os.getenv('STORAGE_BACKEND', 'memory') == 'sqlite':
+    workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+else:
+    workers = 1
+
+# Потоки внутри воркера: DataManager потокобезопасен (блокировки по пользователям)
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+worker_class = 'gthread'
+timeout = 60
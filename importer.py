@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Импорт банковских выписок (CSV, OFX) в транзакции пользователя
+Файл читается потоково и применяется порциями: каждая порция пишется
+одним пакетом хранилища с одним обновлением баланса и месячных показателей.
+Дубликаты (та же дата, тип, сумма и описание) отсекаются по индексу
+хешей уже сохраненных транзакций, поэтому выписку можно загружать повторно
+
+    python importer.py --user-id 123456 statement.csv
+    python importer.py --user-id 123456 --encoding cp1251 statement.ofx
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+from aggregates import balance_delta
+from categorizer import CategoryMatcher
+from record_store import DATE_FORMAT
+from storage import Storage
+
+# Транзакций в одном пакете записи
+IMPORT_BATCH_SIZE = 5000
+
+# Сколько ошибок разбора строк возвращать в отчете
+MAX_REPORTED_ERRORS = 20
+
+# Форматы дат в выписках (порядок важен: сначала с временем)
+STATEMENT_DATE_FORMATS = (
+    DATE_FORMAT, '%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M', '%d.%m.%Y',
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d',
+    '%d/%m/%Y %H:%M', '%d/%m/%Y', '%d.%m.%y'
+)
+
+# Заголовки колонок CSV (в нижнем регистре) -> поле транзакции
+CSV_COLUMNS = {
+    'date': ('date', 'дата', 'дата операции', 'дата платежа', 'дата транзакции',
+             'transaction date', 'posted', 'posting date'),
+    'amount': ('amount', 'сумма', 'сумма операции', 'сумма платежа', 'сумма в валюте счета'),
+    'debit': ('debit', 'расход', 'списание', 'сумма списания'),
+    'credit': ('credit', 'приход', 'зачисление', 'поступление', 'сумма зачисления'),
+    'type': ('type', 'тип', 'тип операции'),
+    'category': ('category', 'категория'),
+    'description': ('description', 'описание', 'описание операции', 'назначение платежа',
+                    'назначение', 'memo', 'payee', 'name', 'контрагент')
+}
+
+# Значения колонки типа
+INCOME_TYPES = {'income', 'credit', 'доход', 'приход', 'зачисление', 'пополнение'}
+EXPENSE_TYPES = {'expense', 'debit', 'расход', 'списание', 'покупка', 'оплата'}
+
+# Частые форматы дат разбираются без strptime: '15.01.2024 10:30[:00]', '2024-01-15T10:30:00'
+_DMY_RE = re.compile(r'(\d{1,2})[./](\d{1,2})[./](\d{4}),?(?:\s+(\d{1,2}):(\d{2})(?::\d{2})?)?$')
+_YMD_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2})(?::\d{2}(?:\.\d+)?)?)?$')
+
+_OFX_TAG_RE = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+class StatementError(ValueError):
+    """Файл выписки не удалось разобрать (формат, колонки)"""
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """Сумма из выписки: '-1 234,56', '1,234.56', '1.234,56', '−500'; None - пусто или не число"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    text = value.strip().replace(' ', '').replace('\u00a0', '').replace('\u2212', '-')
+    text = re.sub(r'[^\d,.\-+]', '', text)
+    if not text:
+        return None
+    if ',' in text and '.' in text:
+        # Десятичный разделитель - последний из двух, другой разделяет разряды
+        # ('1.234,56' и '1,234.56')
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    else:
+        text = text.replace(',', '.')
+
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def normalize_date(value: Any) -> Optional[str]:
+    """Дата выписки в формате транзакций '%d.%m.%Y, %H:%M'; None - не разобрать"""
+    if not isinstance(value, str):
+        return None
+
+    value = value.strip()
+    match = _DMY_RE.match(value)
+    if match:
+        day, month, year, hour, minute = match.groups()
+    else:
+        match = _YMD_RE.match(value)
+        if match:
+            year, month, day, hour, minute = match.groups()
+    if match:
+        try:
+            parsed = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0))
+        except ValueError:
+            return None
+        return f'{parsed.day:02d}.{parsed.month:02d}.{parsed.year:04d}, {parsed.hour:02d}:{parsed.minute:02d}'
+
+    for fmt in STATEMENT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+
+    # OFX: 20240115120000[+3:MSK], 20240115
+    digits = re.match(r'(\d{8})(\d{4})?', value)
+    if digits:
+        try:
+            parsed = datetime.strptime(digits.group(1) + (digits.group(2) or '0000'), '%Y%m%d%H%M')
+            return parsed.strftime(DATE_FORMAT)
+        except ValueError:
+            return None
+
+    try:
+        return datetime.fromisoformat(value).strftime(DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def transaction_hash(transaction: Dict) -> int:
+    """Ключ дубликата: дата, тип, сумма в копейках и описание"""
+    key = '\x1f'.join((
+        str(transaction.get('date', '')),
+        str(transaction.get('type', '')),
+        str(round(float(transaction.get('amount', 0) or 0) * 100)),
+        str(transaction.get('description', '')).strip().casefold()
+    ))
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _make_transaction(date: Any, amount: Any, tx_type: Any = None, category: Any = None,
+                      description: Any = None) -> Dict:
+    """Транзакция из полей строки выписки; ValueError - строку не разобрать"""
+    normalized_date = normalize_date(date)
+    if normalized_date is None:
+        raise ValueError(f'Invalid date: {date!r}')
+
+    value = parse_amount(amount)
+    if value is None:
+        raise ValueError(f'Invalid amount: {amount!r}')
+
+    kind = str(tx_type or '').strip().casefold()
+    if kind in INCOME_TYPES:
+        kind = 'income'
+    elif kind in EXPENSE_TYPES:
+        kind = 'expense'
+    else:
+        kind = 'income' if value > 0 else 'expense'
+
+    return {
+        'type': kind,
+        'category': str(category or '').strip() or 'other',
+        'amount': abs(value),
+        'description': str(description or '').strip(),
+        'date': normalized_date
+    }
+
+
+def _sniff_delimiter(line: str) -> str:
+    return max((';', ',', '\t'), key=line.count)
+
+
+def iter_csv(stream: IO[str]) -> Iterator[Dict]:
+    """
+    Строки CSV-выписки как транзакции (потоково); строка, которую не удалось
+    разобрать, отдается как {'error': текст}
+    """
+    header_line = stream.readline()
+    if not header_line:
+        return
+
+    delimiter = _sniff_delimiter(header_line)
+    header = [name.strip().strip('"').casefold() for name in next(csv.reader([header_line], delimiter=delimiter))]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for pos, name in enumerate(header):
+            if name in aliases:
+                columns[field] = pos
+                break
+
+    if 'date' not in columns or not ({'amount', 'debit', 'credit'} & set(columns)):
+        raise StatementError('Columns for date and amount not found')
+
+    def cell(row: List[str], field: str) -> Optional[str]:
+        pos = columns.get(field)
+        return row[pos] if pos is not None and pos < len(row) else None
+
+    for row in csv.reader(stream, delimiter=delimiter):
+        if not any(value.strip() for value in row):
+            continue
+
+        amount = cell(row, 'amount')
+        tx_type = cell(row, 'type')
+        value = parse_amount(amount)
+        if value is not None:
+            amount = value
+        else:
+            # Раздельные колонки списаний и зачислений
+            debit, credit = parse_amount(cell(row, 'debit')), parse_amount(cell(row, 'credit'))
+            if credit:
+                amount, tx_type = credit, 'income'
+            elif debit:
+                amount, tx_type = debit, 'expense'
+
+        try:
+            yield _make_transaction(cell(row, 'date'), amount, tx_type,
+                                    cell(row, 'category'), cell(row, 'description'))
+        except ValueError as e:
+            yield {'error': str(e)}
+
+
+def iter_ofx(stream: IO[str]) -> Iterator[Dict]:
+    """Операции <STMTTRN> из OFX (SGML 1.x и XML 2.x), потоково"""
+    fields: Optional[Dict[str, str]] = None
+
+    def flush(fields: Dict[str, str]) -> Dict:
+        description = fields.get('NAME') or fields.get('MEMO') or ''
+        if fields.get('NAME') and fields.get('MEMO') and fields['MEMO'] != fields['NAME']:
+            description = f"{fields['NAME']} {fields['MEMO']}"
+        try:
+            transaction = _make_transaction(fields.get('DTPOSTED'), fields.get('TRNAMT'),
+                                            description=description)
+        except ValueError as e:
+            return {'error': str(e)}
+        if fields.get('FITID'):
+            transaction['id'] = f"ofx-{fields['FITID']}"
+        return transaction
+
+    for line in stream:
+        for closing, tag, value in _OFX_TAG_RE.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if fields is not None:
+                    yield flush(fields)
+                fields = None if closing else {}
+            elif fields is not None and not closing:
+                fields[tag] = value.strip()
+
+    if fields:
+        yield flush(fields)
+
+
+PARSERS = {'csv': iter_csv, 'ofx': iter_ofx}
+
+
+def detect_format(filename: str) -> str:
+    """Формат по расширению файла (по умолчанию CSV)"""
+    return 'ofx' if filename.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+
+def _chunks(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_transactions(storage: Storage, user_id: Any, rows: Iterable[Dict],
+                        batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False,
+                        matcher: Optional[CategoryMatcher] = None) -> Dict[str, Any]:
+    """
+    Применение разобранных строк выписки к пользователю порциями по batch_size;
+    строкам без категории она назначается по правилам matcher.
+    Отчет: импортировано, категоризировано, дубликатов, ошибок разбора
+    (с первыми сообщениями)
+    """
+    # Сколько раз каждый ключ уже встречается у пользователя: повтор внутри
+    # выписки (две одинаковые покупки за день) не считается дубликатом
+    existing = Counter(transaction_hash(tx) for tx in storage.iter_records('transactions', user_id))
+    seen: Counter = Counter()
+    report: Dict[str, Any] = {'imported': 0, 'categorized': 0, 'duplicates': 0, 'errors': 0, 'error_messages': []}
+
+    for chunk in _chunks(rows, batch_size):
+        fresh = []
+        for transaction in chunk:
+            if 'error' in transaction:
+                report['errors'] += 1
+                if len(report['error_messages']) < MAX_REPORTED_ERRORS:
+                    report['error_messages'].append(transaction['error'])
+                continue
+
+            key = transaction_hash(transaction)
+            seen[key] += 1
+            if seen[key] <= existing[key]:
+                report['duplicates'] += 1
+                continue
+
+            # id детерминирован - повторный импорт той же выписки не плодит записи
+            transaction.setdefault('id', f'imp-{key:016x}-{seen[key]}')
+            fresh.append(transaction)
+
+        if matcher is not None:
+            report['categorized'] += matcher.apply_many(fresh)
+        if fresh and not dry_run:
+            _apply_chunk(storage, user_id, fresh)
+        report['imported'] += len(fresh)
+
+    return report
+
+
+def _apply_chunk(storage: Storage, user_id: Any, transactions: List[Dict]):
+    """Порция транзакций одним пакетом и одно обновление баланса на порцию"""
+    with storage.user_lock(user_id), storage.batch():
+        delta = 0.0
+        for transaction in transactions:
+            previous = storage.get_transaction(user_id, transaction['id'])
+            delta += balance_delta(transaction)
+            if previous:
+                delta -= balance_delta(previous)
+        storage.add_transactions(user_id, transactions)
+
+        user_data = storage.get_user_data(user_id)
+        if user_data:
+            user_data['balance'] = user_data.get('balance', 0) + delta
+            storage.refresh_monthly_stats(user_id, user_data)
+
+
+def import_statement(storage: Storage, user_id: Any, stream: IO[str], file_format: str = 'csv',
+                     batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False,
+                     matcher: Optional[CategoryMatcher] = None) -> Dict[str, Any]:
+    """Импорт выписки из текстового потока; StatementError - формат не распознан"""
+    parser = PARSERS.get(file_format)
+    if parser is None:
+        raise StatementError(f'Unknown format: {file_format}')
+    return import_transactions(storage, user_id, parser(stream), batch_size, dry_run, matcher)
+
+
+def open_text(binary: IO[bytes], encoding: str = 'utf-8-sig') -> IO[str]:
+    """Текстовый поток поверх загруженного файла (без чтения целиком в память)"""
+    return io.TextIOWrapper(binary, encoding=encoding, errors='replace', newline='')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Импорт банковской выписки (CSV, OFX) в транзакции')
+    parser.add_argument('path', help='файл выписки')
+    parser.add_argument('--user-id', type=int, required=True)
+    parser.add_argument('--format', choices=sorted(PARSERS), help='по умолчанию - по расширению файла')
+    parser.add_argument('--encoding', default='utf-8-sig', help='кодировка файла (например, cp1251)')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--no-categorize', action='store_true', help='не назначать категории по правилам')
+    parser.add_argument('--dry-run', action='store_true', help='только разобрать и посчитать')
+    args = parser.parse_args()
+
+    from api import storage_from_config
+    from categorizer import Categorizer
+
+    storage = storage_from_config()
+    if not storage.get_user_data(args.user_id):
+        parser.error(f'пользователь {args.user_id} не найден')
+
+    matcher = None if args.no_categorize else Categorizer(storage).matcher_for(args.user_id)
+    with open(args.path, encoding=args.encoding, errors='replace', newline='') as f:
+        report = import_statement(storage, args.user_id, f, args.format or detect_format(args.path),
+                                  args.batch_size, args.dry_run, matcher)
+
+    print(f"Импортировано: {report['imported']}")
+    print(f"Категоризировано: {report['categorized']}")
+    print(f"Дубликатов: {report['duplicates']}")
+    print(f"Ошибок разбора: {report['errors']}")
+    for message in report['error_messages']:
+        print(f"  {message}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Метрики API в формате Prometheus (/metrics)
+Гистограммы задержек по роутам и методам хранилища, размеры запросов
+и ответов, выборочное профилирование медленных запросов через cProfile.
+Метрики хранятся в памяти процесса - у каждого воркера gunicorn свои
+"""
+
+import cProfile
+import functools
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from flask import Flask, g, request
+
+from storage import Storage
+
+# Границы корзин гистограмм (включительно, как le в Prometheus)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Квантили, которые отдаются вместе с гистограммами
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Имя метрики -> (тип, описание)
+METRICS_HELP = {
+    'finance_http_requests_total': ('counter', 'Запросы к API по роуту и статусу'),
+    'finance_http_request_duration_seconds': ('histogram', 'Время обработки запроса (до отправки заголовков)'),
+    'finance_http_request_size_bytes': ('histogram', 'Размер тела запроса'),
+    'finance_http_response_size_bytes': ('histogram', 'Размер тела ответа (без потоковых)'),
+    'finance_storage_call_duration_seconds': ('histogram', 'Время вызова метода хранилища'),
+    'finance_profiles_total': ('counter', 'Сохраненные профили медленных запросов'),
+}
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, суммой и числом наблюдений"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины (как histogram_quantile)"""
+        if not self.count:
+            return float('nan')
+
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+def _format_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Реестр счетчиков и гистограмм процесса"""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, _Labels], float] = {}
+        self._histograms: Dict[Tuple[str, _Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, _Labels]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Увеличение счетчика"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+        """Наблюдение в гистограмму"""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def quantiles(self, name: str) -> Dict[_Labels, Dict[float, float]]:
+        """p50/p95/p99 по каждому набору меток гистограммы"""
+        with self._lock:
+            return {
+                labels: {q: histogram.quantile(q) for q in QUANTILES}
+                for (metric, labels), histogram in self._histograms.items()
+                if metric == name
+            }
+
+    def render(self, gauges: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """
+        Текстовый формат Prometheus; gauges - {префикс: {имя: число}}
+        (счетчики хранилища, кеша ответов)
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [(key, histogram, {q: histogram.quantile(q) for q in QUANTILES})
+                          for key, histogram in histograms]
+
+        described = set()
+
+        def describe(name: str, kind: str, text: str):
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in counters:
+            describe(name, *METRICS_HELP.get(name, ('counter', name)))
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        for (name, labels), histogram, _ in histograms:
+            describe(name, *METRICS_HELP.get(name, ('histogram', name)))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", _format_value(float(bound))))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+
+        # Квантили - отдельными метриками, чтобы не считать их в PromQL
+        for (name, labels), _, quantiles in histograms:
+            quantile_name = f'{name}_quantile'
+            describe(quantile_name, 'gauge', f'Оценка p50/p95/p99 по {name}')
+            for q, value in quantiles.items():
+                lines.append(f'{quantile_name}{_format_labels(labels, ("quantile", str(q)))} {_format_value(value)}')
+
+        for prefix, values in (gauges or {}).items():
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f'{prefix}_{key}'
+                describe(name, 'gauge', name)
+                lines.append(f'{name} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class TimedStorage:
+    """Хранилище с замером времени вызовов каждого метода (те же методы, что у Storage)"""
+
+    # Возвращают блокировку, контекстный менеджер или генератор - время вызова ничего не значит
+    UNTIMED = {'user_lock', 'batch', 'read_snapshot', 'iter_records', 'stats', 'close'}
+
+    def __init__(self, storage: Storage, metrics: Metrics):
+        self.storage = storage
+        self._metrics = metrics
+
+    def __getattr__(self, name: str):
+        method = getattr(self.storage, name)
+        if not callable(method) or name.startswith('_') or name in self.UNTIMED:
+            return method
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._metrics.observe('finance_storage_call_duration_seconds',
+                                      time.perf_counter() - started, method=name)
+
+        # Кешируем обертку, чтобы не создавать её при каждом вызове
+        setattr(self, name, wrapper)
+        return wrapper
+
+
+class SamplingProfiler:
+    """
+    Выборочное профилирование: доля sample_rate запросов выполняется под
+    cProfile, профиль запроса дольше slow_ms сохраняется в directory
+    (.prof открывается snakeviz, flameprof, python -m pstats)
+    """
+
+    def __init__(self, sample_rate: float, slow_ms: float, directory: str):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.directory = directory
+        # cProfile допускает один активный профилировщик на процесс
+        self._busy = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Профилировщик для текущего запроса или None (не попал в выборку / занят)"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            self._busy.release()
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, route: str, elapsed_ms: float) -> Optional[str]:
+        """Остановка профилировщика; путь к файлу, если запрос оказался медленным"""
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+
+        if elapsed_ms < self.slow_ms:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        filepath = os.path.join(
+            self.directory,
+            f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{slug}_{int(elapsed_ms)}ms.prof"
+        )
+        profile.dump_stats(filepath)
+        return filepath
+
+
+def instrument_app(app: Flask, metrics: Metrics, profiler: Optional[SamplingProfiler] = None):
+    """Замер каждого запроса приложения: задержка, размеры, статус, профиль"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_profile = profiler.start() if profiler is not None else None
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+
+        elapsed = time.perf_counter() - started
+        # Шаблон роута, а не путь - иначе по метке на каждый user_id
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+        metrics.inc('finance_http_requests_total', route=route, method=request.method,
+                    status=response.status_code)
+        metrics.observe('finance_http_request_duration_seconds', elapsed,
+                        route=route, method=request.method)
+        if request.content_length:
+            metrics.observe('finance_http_request_size_bytes', request.content_length,
+                            SIZE_BUCKETS, route=route)
+        if not response.is_streamed and response.content_length is not None:
+            metrics.observe('finance_http_response_size_bytes', response.content_length,
+                            SIZE_BUCKETS, route=route)
+
+        profile = g.pop('metrics_profile', None)
+        if profile is not None and profiler.finish(profile, route, elapsed * 1000):
+            metrics.inc('finance_profiles_total', route=route)
+        return response
+
+    @app.teardown_request
+    def _stop_profile(exc):
+        # Запрос завершился исключением мимо after_request - профилировщик не должен остаться включенным
+        profile = g.pop('metrics_profile', None)
+        if profile is not None:
+            profiler.finish(profile, '', 0)
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Оценка инвестиционных портфелей по таблице цен
+Количество из свободного поля count ('10 шт.', '0,0005 шт.') разбирается
+в число quantity; при изменении цен все позиции с этими инструментами
+переоцениваются одним проходом на массивах NumPy, а amount, profit,
+profit_percent и investments_total пересчитываются только у затронутых пользователей
+
+    python portfolio.py prices.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from storage import Storage
+
+# Число с десятичной запятой или точкой и пробелами между разрядами: '1 500,25'
+QUANTITY_RE = re.compile(r'[-+]?\d+(?:[ \u00a0]\d{3})*(?:[.,]\d+)?')
+
+
+def parse_quantity(value: Any) -> Optional[float]:
+    """Количество из числа или строки вида '10 шт.'; None - не удалось разобрать"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    match = QUANTITY_RE.search(value)
+    if not match:
+        return None
+    return float(match.group().replace(' ', '').replace('\u00a0', '').replace(',', '.'))
+
+
+def normalize_instrument(name: Any) -> str:
+    """Ключ инструмента в таблице цен"""
+    return str(name or '').strip().upper()
+
+
+def instrument_key(investment: Dict) -> str:
+    """Инструмент позиции: тикер, если указан, иначе название"""
+    return normalize_instrument(investment.get('ticker') or investment.get('name'))
+
+
+def holding_quantity(investment: Dict) -> Optional[float]:
+    """Количество позиции (для старых записей - из строки count)"""
+    quantity = investment.get('quantity')
+    if quantity is None:
+        quantity = parse_quantity(investment.get('count'))
+    return quantity
+
+
+def value_rows(quantity: np.ndarray, invested: np.ndarray,
+               price: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Стоимость, прибыль и прибыль в % для массивов позиций"""
+    amount = np.round(quantity * price, 2)
+    return (amount,) + profit_rows(amount, invested)
+
+
+def profit_rows(amount: np.ndarray, invested: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Прибыль и прибыль в % (нули, если сумма вложений не указана)"""
+    has_invested = invested > 0
+    safe_invested = np.where(has_invested, invested, 1.0)
+    profit = np.where(has_invested, amount - invested, 0.0)
+    percent = np.where(has_invested, np.round(profit / safe_invested * 100, 1), 0.0)
+    return profit, percent
+
+
+class PriceProvider:
+    """Источник цен: fetch() - цены, изменившиеся с прошлого вызова (или все)"""
+
+    def fetch(self) -> Dict[str, float]:
+        raise NotImplementedError
+
+
+class StaticPriceProvider(PriceProvider):
+    """Цены из словаря (для тестов и ручного обновления)"""
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None):
+        self.prices = dict(prices or {})
+
+    def fetch(self) -> Dict[str, float]:
+        return dict(self.prices)
+
+
+class FilePriceProvider(PriceProvider):
+    """
+    Цены из локального файла: JSON {"ЛУКОЙЛ": 5500.0} или CSV "инструмент,цена";
+    файл перечитывается только после изменения
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+
+    def fetch(self) -> Dict[str, float]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return {}
+        if mtime == self._mtime:
+            return {}
+
+        with open(self.path, encoding='utf-8') as f:
+            if self.path.endswith('.csv'):
+                prices = {row[0]: row[1] for row in csv.reader(f) if len(row) >= 2}
+            else:
+                prices = json.load(f)
+        self._mtime = mtime
+        return prices
+
+
+class PriceTable:
+    """Кеш последних цен по инструментам"""
+
+    def __init__(self, provider: Optional[PriceProvider] = None):
+        self.provider = provider
+        self._prices: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def get(self, instrument: str) -> Optional[float]:
+        return self._prices.get(instrument)
+
+    def update(self, prices: Dict[str, Any]) -> Dict[str, float]:
+        """Запись цен; возвращает только изменившиеся (некорректные пропускаются)"""
+        changed = {}
+        with self._lock:
+            for name, price in prices.items():
+                try:
+                    price = float(price)
+                except (TypeError, ValueError):
+                    continue
+                if not price > 0:
+                    continue
+
+                key = normalize_instrument(name)
+                if self._prices.get(key) != price:
+                    self._prices[key] = price
+                    changed[key] = price
+        return changed
+
+    def refresh(self) -> Dict[str, float]:
+        """Новые цены от провайдера; изменившиеся"""
+        if self.provider is None:
+            return {}
+        return self.update(self.provider.fetch())
+
+
+class PortfolioEngine:
+    """
+    Оценка позиций по PriceTable и переоценка при изменении цен
+    Держит индекс инструмент -> владельцы, чтобы переоценка читала только
+    тех пользователей, у кого есть подешевевшие или подорожавшие бумаги.
+    В индекс попадают пользователи в памяти, сохраненные позиции (track)
+    и пользователи при первом чтении (ensure_fresh) - хранилище не обходится
+    целиком, незагруженные пользователи из снапшота не поднимаются
+    """
+
+    def __init__(self, storage: Storage, prices: PriceTable, chunk_size: int = 1000):
+        self.storage = storage
+        self.prices = prices
+        self.chunk_size = chunk_size
+
+        self._holders: Dict[str, Set[Any]] = {}
+        self._indexed = False
+        # Пользователи, все позиции которых уже в индексе
+        self._indexed_users: Set[Any] = set()
+        self._lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {'revaluations': 0, 'revalued_users': 0, 'revalued_investments': 0}
+
+    def track(self, user_id: Any, investment: Dict):
+        """Позиция сохранена - пользователь попадает во владельцы инструмента"""
+        with self._lock:
+            self._holders.setdefault(instrument_key(investment), set()).add(user_id)
+
+    def build_index(self, user_ids: Optional[Iterable[Any]] = None):
+        """Индекс владельцев по позициям пользователей (по умолчанию - уже загруженных в память)"""
+        holders: Dict[str, Set[Any]] = {}
+        indexed = set()
+        for user_id in (self.storage.resident_user_ids() if user_ids is None else user_ids):
+            for investment in self.storage.get_user_investments(user_id):
+                holders.setdefault(instrument_key(investment), set()).add(user_id)
+                indexed.add(user_id)
+
+        with self._lock:
+            for key, users in holders.items():
+                self._holders.setdefault(key, set()).update(users)
+            self._indexed_users |= indexed
+            self._indexed = True
+
+    def ensure_fresh(self, user_id: Any) -> int:
+        """
+        Вызывается перед чтением позиций: пользователь, которого еще нет
+        в индексе (загружен из снапшота после запуска), индексируется и
+        оценивается по текущим ценам; возвращает число обновленных позиций
+        """
+        with self._lock:
+            if user_id in self._indexed_users:
+                return 0
+
+        investments = self.storage.get_user_investments(user_id)
+        if not investments:
+            return 0
+
+        keys = {instrument_key(investment) for investment in investments}
+        with self._lock:
+            for key in keys:
+                self._holders.setdefault(key, set()).add(user_id)
+            self._indexed_users.add(user_id)
+
+        priced = {key for key in keys if self.prices.get(key) is not None}
+        if not priced:
+            return 0
+        return self._revalue_chunk([user_id], priced)[1]
+
+    def value(self, investment: Dict) -> Dict:
+        """
+        Количество, стоимость по текущей цене (если она известна)
+        и прибыль позиции; изменяет и возвращает investment
+        """
+        quantity = holding_quantity(investment)
+        investment['quantity'] = quantity
+        price = self.prices.get(instrument_key(investment))
+        invested = np.array([float(investment.get('invested', 0) or 0)])
+
+        if price is not None and quantity is not None:
+            amount, profit, percent = value_rows(np.array([quantity]), invested, np.array([price]))
+            investment['amount'] = amount.item()
+        else:
+            profit, percent = profit_rows(np.array([float(investment.get('amount', 0) or 0)]), invested)
+
+        investment['profit'] = profit.item()
+        investment['profit_percent'] = percent.item()
+        return investment
+
+    def revalue(self, changed: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+        """
+        Переоценка позиций с инструментами из changed (по умолчанию - всех
+        с известной ценой); число затронутых пользователей и позиций
+        """
+        if not self._indexed:
+            self.build_index()
+
+        with self._lock:
+            if changed is None:
+                keys = [key for key in self._holders if self.prices.get(key) is not None]
+            else:
+                keys = [key for key in changed if key in self._holders]
+            user_ids = sorted(set().union(*(self._holders[key] for key in keys)), key=str) if keys else []
+
+        keys = set(keys)
+        result = {'users': 0, 'investments': 0}
+        for offset in range(0, len(user_ids), self.chunk_size):
+            users, investments = self._revalue_chunk(user_ids[offset:offset + self.chunk_size], keys)
+            result['users'] += users
+            result['investments'] += investments
+
+        with self._lock:
+            self._counters['revaluations'] += 1
+            self._counters['revalued_users'] += result['users']
+            self._counters['revalued_investments'] += result['investments']
+        return result
+
+    def _revalue_chunk(self, user_ids: List[Any], keys: Set[str]) -> Tuple[int, int]:
+        """Порция пользователей: позиции собираются в массивы и оцениваются разом"""
+        rows: List[Tuple[Any, Any, float, float, float]] = []
+        for user_id in user_ids:
+            for investment in self.storage.get_user_investments(user_id):
+                key = instrument_key(investment)
+                quantity = holding_quantity(investment)
+                if key in keys and quantity is not None:
+                    rows.append((user_id, investment.get('id'), quantity,
+                                 float(investment.get('invested', 0) or 0), self.prices.get(key)))
+        if not rows:
+            return 0, 0
+
+        quantity = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+        invested = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+        price = np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows))
+        amount, profit, percent = (column.tolist() for column in value_rows(quantity, invested, price))
+
+        by_user: Dict[Any, Dict[Any, int]] = {}
+        for pos, row in enumerate(rows):
+            by_user.setdefault(row[0], {})[row[1]] = pos
+
+        users = investments = 0
+        with self.storage.batch():
+            for user_id, positions in by_user.items():
+                updated = self._apply(user_id, positions, rows, amount, profit, percent)
+                if updated:
+                    users += 1
+                    investments += updated
+        return users, investments
+
+    def _apply(self, user_id: Any, positions: Dict[Any, int], rows: List[Tuple],
+               amount: List[float], profit: List[float], percent: List[float]) -> int:
+        """
+        Запись новых оценок пользователя под его блокировкой; позиции,
+        измененные с момента чтения, пропускаются до следующей переоценки
+        """
+        updated = 0
+        total = 0.0
+        with self.storage.user_lock(user_id):
+            for investment in self.storage.get_user_investments(user_id):
+                old_amount = float(investment.get('amount', 0) or 0)
+                total += old_amount
+                pos = positions.get(investment.get('id'))
+                if pos is None:
+                    continue
+                if (holding_quantity(investment) != rows[pos][2]
+                        or float(investment.get('invested', 0) or 0) != rows[pos][3]):
+                    continue
+                if (old_amount == amount[pos] and investment.get('profit') == profit[pos]
+                        and investment.get('profit_percent') == percent[pos]):
+                    continue
+
+                self.storage.save_investment(user_id, {
+                    **investment,
+                    'quantity': rows[pos][2],
+                    'amount': amount[pos],
+                    'profit': profit[pos],
+                    'profit_percent': percent[pos]
+                })
+                total += amount[pos] - old_amount
+                updated += 1
+
+            # Позиции пользователя уже прочитаны - итог считается по ним целиком
+            user_data = self.storage.get_user_data(user_id)
+            if updated and user_data:
+                user_data['investments_total'] = round(total, 2)
+                self.storage.save_user_data(user_id, user_data)
+        return updated
+
+    def refresh_prices(self) -> Dict[str, int]:
+        """Новые цены от провайдера и переоценка затронутых позиций"""
+        changed = self.prices.refresh()
+        if not changed:
+            return {'users': 0, 'investments': 0}
+        return self.revalue(changed)
+
+    def _loop(self, interval: float):
+        """Фоновый поток: переоценка по уже загруженным ценам, затем опрос провайдера"""
+        try:
+            if len(self.prices):
+                self.revalue()
+        except Exception as e:
+            print(f"Ошибка переоценки портфелей: {e}")
+
+        while not self._stop_event.wait(interval):
+            try:
+                self.refresh_prices()
+            except Exception as e:
+                print(f"Ошибка переоценки портфелей: {e}")
+
+    def start(self, interval: float):
+        """Фоновый опрос провайдера цен каждые interval секунд"""
+        if self._thread is not None or interval <= 0:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name='portfolio', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка фонового опроса"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики переоценок и размер таблицы цен"""
+        with self._lock:
+            return {**self._counters, 'instruments': len(self.prices), 'held_instruments': len(self._holders),
+                    'indexed_users': len(self._indexed_users)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Переоценка портфелей всех пользователей по файлу цен')
+    parser.add_argument('prices', help='JSON {"инструмент": цена} или CSV "инструмент,цена"')
+    args = parser.parse_args()
+
+    from api import storage_from_config
+
+    storage = storage_from_config()
+    engine = PortfolioEngine(storage, PriceTable(FilePriceProvider(args.prices)))
+    engine.prices.refresh()
+    # Пакетный запуск вне сервера - индекс по всем пользователям хранилища
+    engine.build_index(storage.user_ids())
+    result = engine.revalue()
+    print(f"Инструментов с ценой: {len(engine.prices)}")
+    print(f"Переоценено позиций: {result['investments']} у {result['users']} пользователей")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Индексированное хранилище записей пользователя (транзакции, цели, инвестиции)
+Поиск, обновление и удаление по id за O(1) вместо линейного прохода
+"""
+
+import re
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aggregates import DailyBalance, MonthlyTotals
+from search import SearchIndex
+
+# Формат даты транзакций, который используют bot.py и клиент
+DATE_FORMAT = '%d.%m.%Y, %H:%M'
+
+# Дополнительные форматы, которые встречаются в присланных клиентом данных
+_FALLBACK_DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+# DATE_FORMAT без strptime - он заметно медленнее на массовой загрузке
+_DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4}), (\d{2}):(\d{2})$')
+
+
+def normalize_id(record_id: Any) -> Any:
+    """
+    Приведение id к единому ключу.
+    bot.py выдает float-id (timestamp()), DataManager - int в миллисекундах,
+    а клиент может прислать id строкой: '1700000000.5', 1700000000.5 и
+    '1700000000.50' должны указывать на одну запись
+    """
+    if isinstance(record_id, bool):
+        return record_id
+
+    if isinstance(record_id, str):
+        try:
+            record_id = float(record_id.strip())
+        except ValueError:
+            return record_id
+
+    if isinstance(record_id, float) and record_id.is_integer():
+        return int(record_id)
+
+    return record_id
+
+
+def parse_date(value: Any) -> Optional[float]:
+    """Дата транзакции ('31.01.2024, 10:00') -> timestamp, None если не разобрать"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    value = value.strip()
+    match = _DATE_RE.match(value)
+    if match:
+        day, month, year, hour, minute = map(int, match.groups())
+        try:
+            return datetime(year, month, day, hour, minute).timestamp()
+        except ValueError:
+            return None
+
+    for fmt in (DATE_FORMAT,) + _FALLBACK_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class RecordStore:
+    """Список записей с индексом id -> позиция и ленивым удалением"""
+
+    # Доля "надгробий", после которой список уплотняется сразу при удалении
+    COMPACT_RATIO = 0.5
+
+    def __init__(self, records: Optional[List[Dict]] = None):
+        self._items: List[Optional[Dict]] = []
+        self._index: Dict[Any, int] = {}
+        self._dead = 0
+
+        for record in records or []:
+            self.upsert(record)
+
+    def __len__(self) -> int:
+        return len(self._items) - self._dead
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.items())
+
+    def __contains__(self, record_id: Any) -> bool:
+        return normalize_id(record_id) in self._index
+
+    def get(self, record_id: Any) -> Optional[Dict]:
+        """Получение записи по id"""
+        pos = self._index.get(normalize_id(record_id))
+        return None if pos is None else self._items[pos]
+
+    def upsert(self, record: Dict) -> Optional[Dict]:
+        """Добавление или замена записи, возвращает предыдущую версию"""
+        key = normalize_id(record.get('id'))
+        pos = self._index.get(key)
+
+        if pos is not None:
+            previous = self._items[pos]
+            self._items[pos] = record
+            return previous
+
+        self._index[key] = len(self._items)
+        self._items.append(record)
+        return None
+
+    def remove(self, record_id: Any) -> Optional[Dict]:
+        """Удаление записи по id (на её месте остается надгробие)"""
+        pos = self._index.pop(normalize_id(record_id), None)
+        if pos is None:
+            return None
+
+        previous = self._items[pos]
+        self._items[pos] = None
+        self._dead += 1
+
+        if self._dead > len(self._items) * self.COMPACT_RATIO:
+            self._compact()
+        return previous
+
+    def items(self) -> List[Dict]:
+        """Живые записи в порядке добавления"""
+        if self._dead:
+            self._compact()
+        return self._items
+
+    def ids(self) -> List[Any]:
+        """Ключи живых записей в порядке добавления"""
+        return list(self._index)
+
+    def _compact(self):
+        """Удаление надгробий и перестроение индекса"""
+        self._items = [record for record in self._items if record is not None]
+        self._index = {
+            normalize_id(record.get('id')): pos
+            for pos, record in enumerate(self._items)
+        }
+        self._dead = 0
+
+
+class TransactionStore(RecordStore):
+    """
+    Хранилище транзакций с дополнительным индексом, отсортированным по дате,
+    и нарастающими итогами по месяцам и дням
+    """
+
+    def __init__(self, records: Optional[List[Dict]] = None):
+        # Отсортированные пары (timestamp, seq); seq делает ключи уникальными
+        self._by_date: List[Tuple[float, int]] = []
+        self._date_keys: Dict[Any, Tuple[float, int]] = {}
+        self._seq_ids: Dict[int, Any] = {}
+        self._next_seq = 0
+        self.totals = MonthlyTotals()
+        self.daily = DailyBalance()
+        # Поисковый индекс строится при первом поиске
+        self._search: Optional[SearchIndex] = None
+
+        super().__init__(records)
+
+    def upsert(self, record: Dict) -> Optional[Dict]:
+        """Добавление или замена транзакции с обновлением индекса по дате"""
+        previous = super().upsert(record)
+        key = normalize_id(record.get('id'))
+
+        if previous is not None:
+            previous_timestamp = self._unindex_date(key)
+            self.totals.add(previous, previous_timestamp, sign=-1)
+            self.daily.add(previous, previous_timestamp, sign=-1)
+
+        timestamp = parse_date(record.get('date'))
+        self.totals.add(record, timestamp)
+        self.daily.add(record, timestamp)
+        if timestamp is not None:
+            date_key = (timestamp, self._next_seq)
+            self._next_seq += 1
+            insort(self._by_date, date_key)
+            self._date_keys[key] = date_key
+            self._seq_ids[date_key[1]] = key
+        if self._search is not None:
+            self._search.add(key, record, timestamp)
+
+        return previous
+
+    def remove(self, record_id: Any) -> Optional[Dict]:
+        """Удаление транзакции из списка и из индекса по дате"""
+        previous = super().remove(record_id)
+        if previous is not None:
+            key = normalize_id(record_id)
+            timestamp = self._unindex_date(key)
+            self.totals.add(previous, timestamp, sign=-1)
+            self.daily.add(previous, timestamp, sign=-1)
+            if self._search is not None:
+                self._search.discard(key)
+        return previous
+
+    def _unindex_date(self, key: Any) -> Optional[float]:
+        """Удаление ключа транзакции из индекса по дате, возвращает её timestamp"""
+        date_key = self._date_keys.pop(key, None)
+        if date_key is None:
+            return None
+
+        pos = bisect_left(self._by_date, date_key)
+        del self._by_date[pos]
+        del self._seq_ids[date_key[1]]
+        return date_key[0]
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None,
+              tx_type: Optional[str] = None) -> List[Dict]:
+        """Транзакции с датой в [start, end] по возрастанию даты, O(log n + k)"""
+        lo = 0 if start is None else bisect_left(self._by_date, (start, -1))
+        hi = len(self._by_date) if end is None else bisect_right(self._by_date, (end, self._next_seq))
+
+        result = []
+        for _, seq in self._by_date[lo:hi]:
+            record = self.get(self._seq_ids[seq])
+            if tx_type is None or record.get('type') == tx_type:
+                result.append(record)
+        return result
+
+    def recent(self, limit: int, start: Optional[float] = None,
+               end: Optional[float] = None) -> List[Dict]:
+        """Последние limit транзакций (новые первыми) с датой в [start, end]"""
+        hi = len(self._by_date) if end is None else bisect_right(self._by_date, (end, self._next_seq))
+
+        result = []
+        for pos in range(hi - 1, -1, -1):
+            timestamp, seq = self._by_date[pos]
+            if len(result) >= limit or (start is not None and timestamp < start):
+                break
+            result.append(self.get(self._seq_ids[seq]))
+        return result
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+        """Поиск по описанию и категории: всего найдено и страница, новые первыми"""
+        if self._search is None:
+            self._search = SearchIndex(
+                (key, self._items[pos], self._date_keys.get(key, (None,))[0]) for key, pos in self._index.items())
+        total, keys = self._search.search(query, offset, limit)
+        return total, [self.get(key) for key in keys]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кеш сериализованных ответов по ревизии данных пользователя
+Пока ревизия не изменилась, ответ не кодируется в JSON повторно,
+а клиент с тем же ETag получает 304 без тела
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def make_etag(epoch: str, revision: int) -> str:
+    """Сильный ETag (без кавычек) для ревизии данных в эпохе хранилища"""
+    return f"{epoch[:12]}.{revision}"
+
+
+class ResponseCache:
+    """LRU-кеш тел ответов, ограниченный суммарным размером в байтах"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        # ключ -> (etag, тело)
+        self._entries: 'OrderedDict[Any, Tuple[str, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, etag: str) -> Optional[bytes]:
+        """Тело ответа, если в кеше лежит версия с этим ETag"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Any, etag: str, body: bytes):
+        """Сохранение ответа с вытеснением давно не запрошенных"""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+
+            # Ответ больше всего кеша не сохраняем - он вытеснил бы все остальные
+            if len(body) > self.max_bytes:
+                return
+
+            self._entries[key] = (etag, body)
+            self.size += len(body)
+
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики кеша"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
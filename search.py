@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Полнотекстовый поиск по транзакциям пользователя
+Обратный индекс: слово описания или категории -> ключи транзакций.
+Слова приводятся к нижнему регистру с 'ё' = 'е'; каждое слово запроса
+ищется как префикс ('бенз' находит 'Бензин'). Индекс строится при первом
+поиске и дальше обновляется при каждом добавлении, изменении и удалении
+"""
+
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r'\w+')
+
+# Сколько последних запросов помнит индекс (листание страниц одного запроса)
+QUERY_CACHE_SIZE = 8
+
+
+def normalize_text(text: Any) -> str:
+    """Текст для сравнения: без учета регистра, 'ё' = 'е'"""
+    return str(text or '').casefold().replace('ё', 'е')
+
+
+def tokenize(*texts: Any) -> Tuple[str, ...]:
+    """Уникальные слова текстов в порядке появления"""
+    return tuple(dict.fromkeys(_WORD_RE.findall(' '.join(normalize_text(text) for text in texts))))
+
+
+def record_tokens(record: Dict) -> Tuple[str, ...]:
+    """Слова транзакции, по которым она находится"""
+    return tokenize(record.get('description'), record.get('category'))
+
+
+def matches_terms(tokens: Tuple[str, ...], terms: Tuple[str, ...]) -> bool:
+    """Для каждого слова запроса есть слово, которое с него начинается"""
+    return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+
+class SearchIndex:
+    """Обратный индекс транзакций одного пользователя"""
+
+    def __init__(self, entries: Iterable[Tuple[Any, Dict, Optional[float]]] = ()):
+        # Слово -> ключи транзакций; словарь слов отсортирован для поиска по префиксу
+        self._postings: Dict[str, Set[Any]] = {}
+        self._vocabulary: List[str] = []
+        # Ключ -> слова записи и её место в порядке (timestamp, seq)
+        self._tokens: Dict[Any, Tuple[str, ...]] = {}
+        self._order: Dict[Any, Tuple[float, int]] = {}
+        # (timestamp, seq, ключ) по возрастанию - для выдачи новых первыми
+        self._by_date: List[Tuple[float, int, Any]] = []
+        self._seq = 0
+        self._cache: 'OrderedDict[Tuple[str, ...], Set[Any]]' = OrderedDict()
+
+        # Начальное построение - без вставок в отсортированные списки
+        for key, record, timestamp in entries:
+            self._insert(key, record_tokens(record), timestamp)
+        self._vocabulary = sorted(self._postings)
+        self._by_date = sorted((order + (key,) for key, order in self._order.items()), key=lambda entry: entry[:2])
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def _insert(self, key: Any, tokens: Tuple[str, ...], timestamp: Optional[float]) -> Tuple[float, int]:
+        order = (timestamp if timestamp is not None else float('-inf'), self._seq)
+        self._seq += 1
+        self._tokens[key] = tokens
+        self._order[key] = order
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+            posting.add(key)
+        return order
+
+    def add(self, key: Any, record: Dict, timestamp: Optional[float]):
+        """Добавление или замена транзакции"""
+        self.discard(key)
+        tokens = record_tokens(record)
+        for token in tokens:
+            if token not in self._postings:
+                insort(self._vocabulary, token)
+        order = self._insert(key, tokens, timestamp)
+        insort(self._by_date, order + (key,), key=lambda entry: entry[:2])
+        self._cache.clear()
+
+    def discard(self, key: Any):
+        """Удаление транзакции из индекса"""
+        tokens = self._tokens.pop(key, None)
+        if tokens is None:
+            return
+
+        order = self._order.pop(key)
+        del self._by_date[bisect_left(self._by_date, order, key=lambda entry: entry[:2])]
+        for token in tokens:
+            posting = self._postings[token]
+            posting.discard(key)
+            if not posting:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+        self._cache.clear()
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        """Слова словаря, начинающиеся с prefix"""
+        tokens = []
+        for pos in range(bisect_left(self._vocabulary, prefix), len(self._vocabulary)):
+            token = self._vocabulary[pos]
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def _union(self, tokens: List[str]) -> Set[Any]:
+        """Ключи со словами tokens (одно слово - само множество индекса, без копии)"""
+        if len(tokens) == 1:
+            return self._postings[tokens[0]]
+        return set().union(*(self._postings[token] for token in tokens))
+
+    def _matches(self, terms: Tuple[str, ...]) -> Set[Any]:
+        """Ключи транзакций, где для каждого слова запроса есть слово с таким началом"""
+        cached = self._cache.get(terms)
+        if cached is not None:
+            self._cache.move_to_end(terms)
+            return cached
+
+        # Слова запроса - от самого редкого: дальше пересекается уже малое множество
+        expanded = []
+        for term in terms:
+            tokens = self._prefix_tokens(term)
+            if not tokens:
+                return set()
+            expanded.append((sum(len(self._postings[token]) for token in tokens), term, tokens))
+        expanded.sort(key=lambda item: item[0])
+
+        # Множества индекса не изменяются на месте - каждый шаг дает новое
+        result = self._union(expanded[0][2])
+        for _, term, tokens in expanded[1:]:
+            if len(result) * 16 < len(tokens):
+                # Кандидатов мало, а слов с префиксом много - проверяем слова кандидатов
+                result = {key for key in result if matches_terms(self._tokens[key], (term,))}
+            else:
+                # Пересечение идет по меньшему множеству - большие не объединяются
+                result = set().union(*(result & self._postings[token] for token in tokens))
+            if not result:
+                break
+
+        self._cache[terms] = result
+        while len(self._cache) > QUERY_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[Any]]:
+        """Всего найдено и ключи страницы [offset, offset + limit), новые первыми"""
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return 0, []
+
+        matches = self._matches(terms)
+        total = len(matches)
+        wanted = offset + limit
+        if offset >= total:
+            return total, []
+
+        # Широкий запрос: идем по датам от новых, пока не наберется страница
+        # (~wanted * n / total шагов); узкий - выбираем страницу из найденного,
+        # шаг которого с ключом сортировки примерно на порядок дороже
+        if wanted * len(self._tokens) < total * total * 8:
+            page = []
+            for entry in reversed(self._by_date):
+                if entry[2] in matches:
+                    page.append(entry[2])
+                    if len(page) >= wanted:
+                        break
+            return total, page[offset:]
+
+        order = self._order.__getitem__
+        return total, heapq.nlargest(wanted, matches, key=order)[offset:]
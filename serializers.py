@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сериализация JSON для ответов API, снапшотов, журнала и SQLite
+Используется самая быстрая установленная библиотека: orjson, затем msgspec,
+иначе стандартный json. Вывод всегда компактный UTF-8 без экранирования
+кириллицы; ключи-числа (user_id) записываются строками, как в json
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Callable, Dict, Union
+
+
+def _default(obj: Any) -> Any:
+    """Типы, которые не кодируются напрямую (как в Flask DefaultJSONProvider)"""
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class Serializer:
+    """Набор функций кодирования/декодирования одной библиотеки"""
+
+    def __init__(self, name: str, dumps_bytes: Callable[[Any], bytes],
+                 loads: Callable[[Union[str, bytes]], Any]):
+        self.name = name
+        self.dumps_bytes = dumps_bytes
+        self.loads = loads
+
+    def dumps(self, obj: Any) -> str:
+        """Объект -> строка JSON"""
+        return self.dumps_bytes(obj).decode('utf-8')
+
+
+def _stdlib() -> Serializer:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default)
+    return Serializer(
+        'json',
+        lambda obj: encoder.encode(obj).encode('utf-8'),
+        json.loads
+    )
+
+
+def _orjson() -> Serializer:
+    import orjson
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    return Serializer(
+        'orjson',
+        lambda obj: orjson.dumps(obj, default=_default, option=option),
+        orjson.loads
+    )
+
+
+def _msgspec() -> Serializer:
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    decoder = msgspec.json.Decoder()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        # Ошибки декодирования - ValueError, как у json и orjson
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return Serializer('msgspec', encoder.encode, loads)
+
+
+# Библиотеки в порядке предпочтения
+_FACTORIES = [('orjson', _orjson), ('msgspec', _msgspec), ('json', _stdlib)]
+
+
+def available() -> Dict[str, Serializer]:
+    """Все установленные сериализаторы (для бенчмарка и выбора вручную)"""
+    serializers = {}
+    for name, factory in _FACTORIES:
+        try:
+            serializers[name] = factory()
+        except ImportError:
+            continue
+    return serializers
+
+
+_current = next(iter(available().values()))
+
+
+def use(name: str) -> Serializer:
+    """Переключение библиотеки сериализации ('orjson', 'msgspec', 'json')"""
+    global _current
+    _current = dict(_FACTORIES)[name]()
+    return _current
+
+
+def backend() -> str:
+    """Имя используемой библиотеки"""
+    return _current.name
+
+
+def dumps(obj: Any) -> str:
+    """Объект -> компактная строка JSON"""
+    return _current.dumps(obj)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Объект -> компактный JSON в UTF-8"""
+    return _current.dumps_bytes(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Строка или байты JSON -> объект (ошибка формата - ValueError)"""
+    return _current.loads(data)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бинарный снапшот данных DataManager с индексом пользователей
+Файл открывается через mmap, данные пользователя декодируются только
+при первом обращении к нему - время запуска не зависит от числа пользователей
+
+Формат (little-endian):
+    заголовок   MAGIC, wal_seq, число пользователей в индексе, длина блока прочих
+    индекс      (user_id int64, смещение, длина) по возрастанию user_id
+    прочие      JSON [[ключ, запись], ...] для нечисловых user_id
+    данные      JSON {'user', 'transactions', 'goals', 'investments'} каждого пользователя
+"""
+
+import mmap
+import struct
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import serializers
+
+MAGIC = b'FTSNAP\x00\x01'
+HEADER = struct.Struct('<8sQQQ')
+ENTRY = struct.Struct('<qQQ')
+
+
+def is_snapshot(filepath: str) -> bool:
+    """Файл - бинарный снапшот (а не JSON прежнего формата)"""
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def _is_index_key(user_id: Any) -> bool:
+    """Ключ попадает в бинарный индекс (int64), а не в блок прочих"""
+    return type(user_id) is int and -2 ** 63 <= user_id < 2 ** 63
+
+
+def encode(users: Iterable[Tuple[Any, bytes]], wal_seq: int) -> bytes:
+    """
+    Сборка снапшота из пар (user_id, JSON данных пользователя в байтах);
+    данные незагруженных пользователей передаются как есть, без декодирования
+    """
+    indexed = []
+    other = []
+    for user_id, blob in users:
+        if _is_index_key(user_id):
+            indexed.append((user_id, blob))
+        else:
+            other.append(b'[' + serializers.dumps_bytes(user_id) + b',' + blob + b']')
+    indexed.sort(key=lambda item: item[0])
+
+    other_block = b'[' + b','.join(other) + b']'
+    offset = HEADER.size + ENTRY.size * len(indexed) + len(other_block)
+
+    index = bytearray()
+    for user_id, blob in indexed:
+        index += ENTRY.pack(user_id, offset, len(blob))
+        offset += len(blob)
+
+    return b''.join([
+        HEADER.pack(MAGIC, wal_seq, len(indexed), len(other_block)),
+        bytes(index),
+        other_block,
+        *(blob for _, blob in indexed)
+    ])
+
+
+class SnapshotReader:
+    """Чтение снапшота через mmap: поиск пользователя - бинарный поиск по индексу"""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._file = open(filepath, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.wal_seq, self.count, other_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filepath}: не бинарный снапшот")
+
+        other_start = HEADER.size + ENTRY.size * self.count
+        self._other: Dict[Any, bytes] = {
+            key: serializers.dumps_bytes(record)
+            for key, record in serializers.loads(self._mm[other_start:other_start + other_len])
+        }
+
+    def __len__(self) -> int:
+        return self.count + len(self._other)
+
+    def _entry(self, pos: int) -> Tuple[int, int, int]:
+        return ENTRY.unpack_from(self._mm, HEADER.size + ENTRY.size * pos)
+
+    def _find(self, user_id: int) -> Optional[Tuple[int, int]]:
+        """Смещение и длина данных пользователя (бинарный поиск)"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, offset, length = self._entry(mid)
+            if key == user_id:
+                return offset, length
+            if key < user_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def raw(self, user_id: Any) -> Optional[bytes]:
+        """Данные пользователя в виде JSON-байтов"""
+        if not _is_index_key(user_id):
+            return self._other.get(user_id)
+
+        found = self._find(user_id)
+        if found is None:
+            return None
+        offset, length = found
+        return self._mm[offset:offset + length]
+
+    def get(self, user_id: Any) -> Optional[Dict]:
+        """Декодированные данные пользователя или None"""
+        blob = self.raw(user_id)
+        return serializers.loads(blob) if blob is not None else None
+
+    def ids(self) -> Iterator[Any]:
+        """Все user_id снапшота"""
+        for pos in range(self.count):
+            yield self._entry(pos)[0]
+        yield from self._other
+
+    def close(self):
+        """Освобождение mmap и файла"""
+        self._mm.close()
+        self._file.close()
+
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище данных финансового трекера в SQLite
+Один файл базы на все процессы: несколько воркеров gunicorn видят одни данные
+"""
+
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import serializers
+from aggregates import DailyBalance
+from record_store import normalize_id, parse_date
+from storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    user_id INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    ts REAL,
+    type TEXT,
+    category TEXT,
+    amount REAL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, ts);
+
+CREATE TABLE IF NOT EXISTS goals (
+    user_id INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_goals_user_id ON goals (user_id, id);
+
+CREATE TABLE IF NOT EXISTS investments (
+    user_id INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_investments_user_id ON investments (user_id, id);
+
+CREATE TABLE IF NOT EXISTS revisions (
+    user_id INTEGER PRIMARY KEY,
+    rev INTEGER NOT NULL,
+    floor INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS changes (
+    user_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    record_id TEXT,
+    rev INTEGER NOT NULL,
+    deleted INTEGER NOT NULL,
+    PRIMARY KEY (user_id, kind, id)
+);
+CREATE INDEX IF NOT EXISTS idx_changes_user_rev ON changes (user_id, rev);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Запросы - константы: sqlite3 кеширует подготовленные выражения по тексту SQL
+SQL_GET_USER = "SELECT data FROM users WHERE user_id = ?"
+SQL_LIST_USERS = "SELECT user_id FROM users ORDER BY user_id"
+SQL_SAVE_USER = (
+    "INSERT INTO users (user_id, data) VALUES (?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data"
+)
+
+SQL_LIST_TRANSACTIONS = "SELECT data FROM transactions WHERE user_id = ? ORDER BY rowid"
+SQL_GET_TRANSACTION = "SELECT data FROM transactions WHERE user_id = ? AND id = ?"
+SQL_SAVE_TRANSACTION = (
+    "INSERT INTO transactions (user_id, id, ts, type, category, amount, data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id, id) DO UPDATE SET ts = excluded.ts, type = excluded.type, "
+    "category = excluded.category, amount = excluded.amount, data = excluded.data"
+)
+SQL_DELETE_TRANSACTION = "DELETE FROM transactions WHERE user_id = ? AND id = ?"
+
+# Шаблоны для целей и инвестиций (имя таблицы подставляется из белого списка)
+SQL_LIST_RECORDS = "SELECT data FROM {table} WHERE user_id = ? ORDER BY rowid"
+SQL_GET_RECORD = "SELECT data FROM {table} WHERE user_id = ? AND id = ?"
+SQL_SAVE_RECORD = (
+    "INSERT INTO {table} (user_id, id, data) VALUES (?, ?, ?) "
+    "ON CONFLICT(user_id, id) DO UPDATE SET data = excluded.data"
+)
+SQL_DELETE_RECORD = "DELETE FROM {table} WHERE user_id = ? AND id = ?"
+
+# Ревизии для дельта-синхронизации
+SQL_BUMP_REVISION = (
+    "INSERT INTO revisions (user_id, rev) VALUES (?, 1) "
+    "ON CONFLICT(user_id) DO UPDATE SET rev = rev + 1"
+)
+SQL_BUMP_REVISION_BY = (
+    "INSERT INTO revisions (user_id, rev) VALUES (?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET rev = rev + excluded.rev"
+)
+SQL_GET_REVISION = "SELECT rev, floor FROM revisions WHERE user_id = ?"
+SQL_SAVE_CHANGE = (
+    "INSERT INTO changes (user_id, kind, id, record_id, rev, deleted) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id, kind, id) DO UPDATE SET record_id = excluded.record_id, "
+    "rev = excluded.rev, deleted = excluded.deleted"
+)
+SQL_DAILY_BALANCE = (
+    "SELECT date(ts, 'unixepoch', 'localtime') AS day, "
+    "SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) "
+    "FROM transactions WHERE user_id = ? AND ts IS NOT NULL GROUP BY day"
+)
+SQL_CHANGES_SINCE = "SELECT kind, record_id, deleted FROM changes WHERE user_id = ? AND rev > ? ORDER BY rev"
+
+_RECORD_TABLES = ('goals', 'investments')
+
+
+def _id_key(record_id: Any) -> str:
+    """Нормализованный id -> текстовый ключ для колонки id"""
+    return str(normalize_id(record_id))
+
+
+def _dumps(data: Any) -> str:
+    """Компактная сериализация записи"""
+    return serializers.dumps(data)
+
+
+def _period_filter(start: Optional[float], end: Optional[float]):
+    """Условие по дате для запросов по индексу (user_id, ts)"""
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append("ts >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("ts <= ?")
+        params.append(end)
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+class SQLiteStorage(Storage):
+    """Хранилище в SQLite (WAL-журнал, пул соединений по потокам)"""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+
+        # Эпоха ревизий хранится в самой базе: ревизии переживают перезапуск
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('sync_epoch', ?)",
+                     (uuid.uuid4().hex,))
+        self.sync_epoch = conn.execute("SELECT value FROM meta WHERE key = 'sync_epoch'").fetchone()[0]
+
+    # ========== СОЕДИНЕНИЯ ==========
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (создается при первом обращении)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                cached_statements=256,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self, mode: str = 'IMMEDIATE') -> Iterator[sqlite3.Connection]:
+        """
+        Транзакция (вложенные вызовы присоединяются к внешней):
+        IMMEDIATE - запись, DEFERRED - согласованное чтение
+        """
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute(f"BEGIN {mode}")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def user_lock(self, user_id: int):
+        """
+        Составная операция - одна транзакция BEGIN IMMEDIATE:
+        она сериализует запись и между потоками, и между воркерами
+        """
+        return self._transaction()
+
+    def batch(self):
+        """Пакет изменений - одна транзакция и один COMMIT"""
+        return self._transaction()
+
+    def read_snapshot(self, user_id: int):
+        """Согласованное чтение - из одного снимка базы (транзакция DEFERRED)"""
+        return self._transaction('DEFERRED')
+
+    def _fetch_one(self, sql: str, params: tuple) -> Optional[Dict]:
+        """Одна запись, декодированная из JSON"""
+        row = self._connection().execute(sql, params).fetchone()
+        return serializers.loads(row[0]) if row else None
+
+    def _fetch_all(self, sql: str, params: tuple) -> List[Dict]:
+        """Все записи, декодированные из JSON"""
+        return [serializers.loads(row[0]) for row in self._connection().execute(sql, params)]
+
+    def close(self):
+        """Закрытие всех соединений пула"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    # ========== ПОЛЬЗОВАТЕЛИ ==========
+
+    def get_user_data(self, user_id: int) -> Optional[Dict]:
+        """Получение данных пользователя"""
+        return self._fetch_one(SQL_GET_USER, (user_id,))
+
+    def save_user_data(self, user_id: int, data: Dict) -> bool:
+        """Сохранение данных пользователя"""
+        with self._transaction() as conn:
+            conn.execute(SQL_SAVE_USER, (user_id, _dumps(data)))
+            self._record_change(conn, user_id, 'user')
+        return True
+
+    def delete_user_data(self, user_id: int) -> bool:
+        """Удаление пользователя со всеми его данными"""
+        with self._transaction() as conn:
+            for table in ('users', 'transactions') + _RECORD_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+
+            # История изменений удаленного пользователя больше не нужна:
+            # клиенты с любой прежней ревизией получат полную выгрузку
+            conn.execute("DELETE FROM changes WHERE user_id = ?", (user_id,))
+            conn.execute(SQL_BUMP_REVISION, (user_id,))
+            conn.execute("UPDATE revisions SET floor = rev WHERE user_id = ?", (user_id,))
+        return True
+
+    # ========== ТРАНЗАКЦИИ ==========
+
+    def get_user_transactions(self, user_id: int) -> List[Dict]:
+        """Транзакции пользователя в порядке добавления"""
+        return self._fetch_all(SQL_LIST_TRANSACTIONS, (user_id,))
+
+    def get_transaction(self, user_id: int, transaction_id: Any) -> Optional[Dict]:
+        """Получение транзакции по id"""
+        return self._fetch_one(SQL_GET_TRANSACTION, (user_id, _id_key(transaction_id)))
+
+    def get_transactions_range(self, user_id: int, start: Any = None, end: Any = None,
+                               type: Optional[str] = None) -> List[Dict]:
+        """Транзакции за период по индексу (user_id, ts)"""
+        if isinstance(start, datetime):
+            start = start.timestamp()
+        if isinstance(end, datetime):
+            end = end.timestamp()
+
+        where, params = _period_filter(start, end)
+        if type is not None:
+            where += " AND type = ?"
+            params.append(type)
+
+        return self._fetch_all(
+            f"SELECT data FROM transactions WHERE user_id = ? AND ts IS NOT NULL{where} "
+            "ORDER BY ts, rowid",
+            (user_id, *params)
+        )
+
+    def add_transaction(self, user_id: int, transaction: Dict) -> bool:
+        """Добавление (или замена по id) транзакции"""
+        if 'id' not in transaction:
+            transaction['id'] = int(datetime.now().timestamp() * 1000)
+
+        try:
+            amount = float(transaction.get('amount', 0) or 0)
+        except (TypeError, ValueError):
+            amount = 0.0
+
+        with self._transaction() as conn:
+            conn.execute(SQL_SAVE_TRANSACTION, (
+                user_id,
+                _id_key(transaction['id']),
+                parse_date(transaction.get('date')),
+                transaction.get('type', 'expense'),
+                transaction.get('category', 'other'),
+                amount,
+                _dumps(transaction)
+            ))
+            self._record_change(conn, user_id, 'transactions', transaction['id'])
+        return True
+
+    def add_transactions(self, user_id: int, transactions: List[Dict]) -> bool:
+        """Пакет транзакций: executemany и одно изменение счетчика ревизий на пакет"""
+        if not transactions:
+            return True
+
+        rows = []
+        for transaction in transactions:
+            if 'id' not in transaction:
+                transaction['id'] = int(datetime.now().timestamp() * 1000)
+            try:
+                amount = float(transaction.get('amount', 0) or 0)
+            except (TypeError, ValueError):
+                amount = 0.0
+            rows.append((
+                user_id,
+                _id_key(transaction['id']),
+                parse_date(transaction.get('date')),
+                transaction.get('type', 'expense'),
+                transaction.get('category', 'other'),
+                amount,
+                _dumps(transaction)
+            ))
+
+        with self._transaction() as conn:
+            conn.executemany(SQL_SAVE_TRANSACTION, rows)
+
+            # Каждая транзакция пакета получает свою ревизию, как при поштучном добавлении
+            conn.execute(SQL_BUMP_REVISION_BY, (user_id, len(rows)))
+            first = conn.execute(SQL_GET_REVISION, (user_id,)).fetchone()[0] - len(rows) + 1
+            conn.executemany(SQL_SAVE_CHANGE, (
+                (user_id, 'transactions', row[1], _dumps(transaction['id']), first + pos, 0)
+                for pos, (row, transaction) in enumerate(zip(rows, transactions))
+            ))
+        return True
+
+    def delete_transaction(self, user_id: int, transaction_id: Any) -> bool:
+        """Удаление транзакции"""
+        with self._transaction() as conn:
+            if conn.execute(SQL_DELETE_TRANSACTION, (user_id, _id_key(transaction_id))).rowcount:
+                self._record_change(conn, user_id, 'transactions', transaction_id, deleted=True)
+        return True
+
+    # ========== ЦЕЛИ И ИНВЕСТИЦИИ ==========
+
+    def _list_records(self, table: str, user_id: int) -> List[Dict]:
+        return self._fetch_all(SQL_LIST_RECORDS.format(table=table), (user_id,))
+
+    def _get_record(self, table: str, user_id: int, record_id: Any) -> Optional[Dict]:
+        return self._fetch_one(SQL_GET_RECORD.format(table=table), (user_id, _id_key(record_id)))
+
+    def _save_record(self, table: str, user_id: int, record: Dict) -> bool:
+        with self._transaction() as conn:
+            conn.execute(SQL_SAVE_RECORD.format(table=table),
+                         (user_id, _id_key(record.get('id')), _dumps(record)))
+            self._record_change(conn, user_id, table, record.get('id'))
+        return True
+
+    def _delete_record(self, table: str, user_id: int, record_id: Any) -> bool:
+        with self._transaction() as conn:
+            if conn.execute(SQL_DELETE_RECORD.format(table=table), (user_id, _id_key(record_id))).rowcount:
+                self._record_change(conn, user_id, table, record_id, deleted=True)
+        return True
+
+    def get_user_goals(self, user_id: int) -> List[Dict]:
+        """Цели пользователя"""
+        return self._list_records('goals', user_id)
+
+    def get_goal(self, user_id: int, goal_id: Any) -> Optional[Dict]:
+        """Получение цели по id"""
+        return self._get_record('goals', user_id, goal_id)
+
+    def save_goal(self, user_id: int, goal: Dict) -> bool:
+        """Сохранение цели"""
+        return self._save_record('goals', user_id, goal)
+
+    def delete_goal(self, user_id: int, goal_id: Any) -> bool:
+        """Удаление цели"""
+        return self._delete_record('goals', user_id, goal_id)
+
+    def get_user_investments(self, user_id: int) -> List[Dict]:
+        """Инвестиции пользователя"""
+        return self._list_records('investments', user_id)
+
+    def get_investment(self, user_id: int, investment_id: Any) -> Optional[Dict]:
+        """Получение инвестиции по id"""
+        return self._get_record('investments', user_id, investment_id)
+
+    def save_investment(self, user_id: int, investment: Dict) -> bool:
+        """Сохранение инвестиции"""
+        return self._save_record('investments', user_id, investment)
+
+    def delete_investment(self, user_id: int, investment_id: Any) -> bool:
+        """Удаление инвестиции"""
+        return self._delete_record('investments', user_id, investment_id)
+
+    # ========== ПОТОКОВОЕ ЧТЕНИЕ ==========
+
+    def user_ids(self) -> List[Any]:
+        """user_id всех пользователей с профилем"""
+        return [row[0] for row in self._connection().execute(SQL_LIST_USERS)]
+
+    def iter_records(self, kind: str, user_id: int, chunk_size: int = 500) -> Iterator[Dict]:
+        """Записи пользователя курсором по chunk_size строк"""
+        if kind not in ('transactions',) + _RECORD_TABLES:
+            raise ValueError(f"Неизвестный вид записей: {kind}")
+
+        cursor = self._connection().execute(SQL_LIST_RECORDS.format(table=kind), (user_id,))
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield serializers.loads(row[0])
+        finally:
+            cursor.close()
+
+    # ========== РЕВИЗИИ ДЛЯ СИНХРОНИЗАЦИИ ==========
+
+    @staticmethod
+    def _record_change(conn: sqlite3.Connection, user_id: int, kind: str,
+                       record_id: Any = None, deleted: bool = False):
+        """Новая ревизия пользователя (в транзакции изменения)"""
+        conn.execute(SQL_BUMP_REVISION, (user_id,))
+        revision = conn.execute(SQL_GET_REVISION, (user_id,)).fetchone()[0]
+        conn.execute(SQL_SAVE_CHANGE, (
+            user_id, kind, _id_key(record_id), _dumps(record_id), revision, int(deleted)
+        ))
+
+    def get_revision(self, user_id: int) -> int:
+        """Текущая ревизия данных пользователя"""
+        row = self._connection().execute(SQL_GET_REVISION, (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def _changes_since(self, user_id: int, revision: int) -> Optional[List[Tuple[str, Any, bool]]]:
+        """Изменения после ревизии по индексу (user_id, rev)"""
+        conn = self._connection()
+        current, floor = conn.execute(SQL_GET_REVISION, (user_id,)).fetchone() or (0, 0)
+        if revision < floor or revision > current:
+            return None
+
+        return [
+            (kind, serializers.loads(record_id), bool(deleted))
+            for kind, record_id, deleted in conn.execute(SQL_CHANGES_SINCE, (user_id, revision))
+        ]
+
+    # ========== АГРЕГАТЫ ==========
+
+    def get_monthly_totals(self, user_id: int, month: Optional[str] = None) -> Dict[str, float]:
+        """Доходы и расходы за месяц - SUM по индексу (user_id, ts)"""
+        month_start = datetime.strptime(month or datetime.now().strftime('%Y-%m'), '%Y-%m')
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+
+        totals = {'income': 0.0, 'expense': 0.0}
+        rows = self._connection().execute(
+            "SELECT type, SUM(amount) FROM transactions "
+            "WHERE user_id = ? AND ts >= ? AND ts < ? GROUP BY type",
+            (user_id, month_start.timestamp(), month_end.timestamp())
+        )
+        for tx_type, amount in rows:
+            totals[tx_type] = amount
+        return totals
+
+    def _period_totals(self, user_id: int, start: Optional[float], end: Optional[float],
+                       months: Optional[List[str]]) -> Dict:
+        """Итоги за период одним GROUP BY"""
+        where, params = _period_filter(start, end)
+        rows = self._connection().execute(
+            "SELECT type, category, SUM(amount), COUNT(*) FROM transactions "
+            f"WHERE user_id = ?{where} GROUP BY type, category",
+            (user_id, *params)
+        )
+
+        income = 0.0
+        expenses = 0.0
+        count = 0
+        expense_by_category = {}
+        for tx_type, category, amount, n in rows:
+            count += n
+            if tx_type == 'income':
+                income += amount
+            elif tx_type == 'expense':
+                expenses += amount
+                expense_by_category[category] = expense_by_category.get(category, 0.0) + amount
+
+        return {
+            'total_income': income,
+            'total_expenses': expenses,
+            'total_transactions': count,
+            'expense_by_category': expense_by_category
+        }
+
+    def _daily_balance(self, user_id: int) -> DailyBalance:
+        """Изменения баланса по дням одним GROUP BY по местной дате"""
+        rows = self._connection().execute(SQL_DAILY_BALANCE, (user_id,))
+        return DailyBalance.from_days(
+            (date.fromisoformat(day).toordinal(), delta) for day, delta in rows
+        )
+
+    def _recent_transactions(self, user_id: int, limit: int, start: Optional[float],
+                             end: Optional[float]) -> List[Dict]:
+        """Последние транзакции периода по индексу (user_id, ts)"""
+        where, params = _period_filter(start, end)
+        return self._fetch_all(
+            f"SELECT data FROM transactions WHERE user_id = ? AND ts IS NOT NULL{where} "
+            "ORDER BY ts DESC, rowid DESC LIMIT ?",
+            (user_id, *params, limit)
+        )
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Интерфейс хранилища данных финансового трекера
+DataManager (в памяти) и SQLiteStorage (общий файл для нескольких
+воркеров gunicorn) реализуют одни и те же методы
+"""
+
+import heapq
+import os
+from contextlib import nullcontext
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aggregates import DailyBalance
+from record_store import parse_date
+from search import matches_terms, record_tokens, tokenize
+
+
+class Storage:
+    """Базовый класс хранилища: пользователи, транзакции, цели, инвестиции"""
+
+    # ========== БЛОКИРОВКИ ==========
+
+    def user_lock(self, user_id: int):
+        """
+        Контекст, в котором составная операция над пользователем
+        (чтение-изменение-запись баланса) выполняется атомарно
+        """
+        return nullcontext()
+
+    def batch(self):
+        """Контекст пакета изменений: данные сохраняются одним сбросом в конце"""
+        return nullcontext()
+
+    # ========== ПОЛЬЗОВАТЕЛИ ==========
+
+    def get_user_data(self, user_id: int) -> Optional[Dict]:
+        """Получение данных пользователя"""
+        raise NotImplementedError
+
+    def save_user_data(self, user_id: int, data: Dict) -> bool:
+        """Сохранение данных пользователя"""
+        raise NotImplementedError
+
+    def delete_user_data(self, user_id: int) -> bool:
+        """Удаление пользователя со всеми его данными"""
+        raise NotImplementedError
+
+    # ========== ТРАНЗАКЦИИ ==========
+
+    def get_user_transactions(self, user_id: int) -> List[Dict]:
+        """Транзакции пользователя в порядке добавления"""
+        raise NotImplementedError
+
+    def get_transaction(self, user_id: int, transaction_id: Any) -> Optional[Dict]:
+        """Получение транзакции по id"""
+        raise NotImplementedError
+
+    def get_transactions_range(self, user_id: int, start: Any = None, end: Any = None,
+                               type: Optional[str] = None) -> List[Dict]:
+        """Транзакции за период [start, end], отсортированные по дате"""
+        raise NotImplementedError
+
+    def add_transaction(self, user_id: int, transaction: Dict) -> bool:
+        """Добавление (или замена по id) транзакции"""
+        raise NotImplementedError
+
+    def add_transactions(self, user_id: int, transactions: List[Dict]) -> bool:
+        """Пакетное добавление транзакций (импорт выписок)"""
+        with self.batch():
+            for transaction in transactions:
+                self.add_transaction(user_id, transaction)
+        return True
+
+    def delete_transaction(self, user_id: int, transaction_id: Any) -> bool:
+        """Удаление транзакции"""
+        raise NotImplementedError
+
+    def search_transactions(self, user_id: int, query: str, offset: int = 0,
+                            limit: int = 20) -> Tuple[int, List[Dict]]:
+        """
+        Поиск по словам описания и категории (слова запроса - префиксы):
+        всего найдено и страница [offset, offset + limit), новые первыми.
+        По умолчанию - полный проход по транзакциям
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return 0, []
+
+        found = []
+        for seq, transaction in enumerate(self.iter_records('transactions', user_id)):
+            if matches_terms(record_tokens(transaction), terms):
+                timestamp = parse_date(transaction.get('date'))
+                found.append((float('-inf') if timestamp is None else timestamp, seq, transaction))
+
+        page = heapq.nlargest(offset + limit, found, key=lambda item: item[:2])[offset:]
+        return len(found), [transaction for _, _, transaction in page]
+
+    # ========== ЦЕЛИ ==========
+
+    def get_user_goals(self, user_id: int) -> List[Dict]:
+        """Цели пользователя"""
+        raise NotImplementedError
+
+    def get_goal(self, user_id: int, goal_id: Any) -> Optional[Dict]:
+        """Получение цели по id"""
+        raise NotImplementedError
+
+    def save_goal(self, user_id: int, goal: Dict) -> bool:
+        """Сохранение цели"""
+        raise NotImplementedError
+
+    def delete_goal(self, user_id: int, goal_id: Any) -> bool:
+        """Удаление цели"""
+        raise NotImplementedError
+
+    # ========== ИНВЕСТИЦИИ ==========
+
+    def get_user_investments(self, user_id: int) -> List[Dict]:
+        """Инвестиции пользователя"""
+        raise NotImplementedError
+
+    def get_investment(self, user_id: int, investment_id: Any) -> Optional[Dict]:
+        """Получение инвестиции по id"""
+        raise NotImplementedError
+
+    def save_investment(self, user_id: int, investment: Dict) -> bool:
+        """Сохранение инвестиции"""
+        raise NotImplementedError
+
+    def delete_investment(self, user_id: int, investment_id: Any) -> bool:
+        """Удаление инвестиции"""
+        raise NotImplementedError
+
+    # ========== ПОТОКОВОЕ ЧТЕНИЕ ==========
+
+    def user_ids(self) -> List[Any]:
+        """
+        user_id всех пользователей для пакетной обработки (у хранилища
+        в памяти могут попасться id без профиля - только с записями)
+        """
+        raise NotImplementedError
+
+    def resident_user_ids(self) -> List[Any]:
+        """
+        user_id пользователей, чьи данные уже в памяти процесса - для пакетных
+        проходов, которые не должны загружать остальных (по умолчанию - все)
+        """
+        return self.user_ids()
+
+    def iter_records(self, kind: str, user_id: int, chunk_size: int = 500) -> Iterator[Dict]:
+        """
+        Записи пользователя по одной (kind: transactions, goals, investments)
+        для потокового экспорта; бэкенды читают их порциями по chunk_size
+        """
+        listers = {
+            'transactions': self.get_user_transactions,
+            'goals': self.get_user_goals,
+            'investments': self.get_user_investments,
+        }
+        yield from listers[kind](user_id)
+
+    # ========== СИНХРОНИЗАЦИЯ ==========
+
+    # Эпоха ревизий: ревизии сравнимы только в пределах одной эпохи
+    # (после перезапуска хранилища в памяти клиент получает полную выгрузку)
+    sync_epoch = ''
+
+    # Вид изменения -> метод получения записи по id
+    _SYNC_GETTERS = {
+        'transactions': 'get_transaction',
+        'goals': 'get_goal',
+        'investments': 'get_investment',
+    }
+
+    def get_revision(self, user_id: int) -> int:
+        """Текущая ревизия данных пользователя (растет с каждым изменением)"""
+        raise NotImplementedError
+
+    def _changes_since(self, user_id: int, revision: int) -> Optional[List[Tuple[str, Any, bool]]]:
+        """
+        Изменения после ревизии по возрастанию: (вид, id, удалена).
+        None - история неполна, нужна полная выгрузка
+        """
+        raise NotImplementedError
+
+    def read_snapshot(self, user_id: int):
+        """Контекст согласованного чтения нескольких частей данных пользователя"""
+        return self.user_lock(user_id)
+
+    def get_sync(self, user_id: int, since: Optional[int] = None, epoch: Optional[str] = None) -> Dict:
+        """
+        Изменения данных пользователя после ревизии since: обновленные записи
+        и id удаленных. Если ревизии нет, эпоха не совпала или история неполна -
+        полная выгрузка (full=True)
+        """
+        with self.read_snapshot(user_id):
+            revision = self.get_revision(user_id)
+            changes = None
+            if since is not None and epoch == self.sync_epoch:
+                changes = self._changes_since(user_id, since)
+
+            result = {'epoch': self.sync_epoch, 'revision': revision, 'full': changes is None}
+
+            if changes is None:
+                result['user'] = self.get_user_data(user_id)
+                result['transactions'] = {'upserts': self.get_user_transactions(user_id), 'deleted': []}
+                result['goals'] = {'upserts': self.get_user_goals(user_id), 'deleted': []}
+                result['investments'] = {'upserts': self.get_user_investments(user_id), 'deleted': []}
+                return result
+
+            for kind in self._SYNC_GETTERS:
+                result[kind] = {'upserts': [], 'deleted': []}
+
+            for kind, record_id, deleted in changes:
+                if kind == 'user':
+                    result['user'] = self.get_user_data(user_id)
+                    continue
+
+                record = None if deleted else getattr(self, self._SYNC_GETTERS[kind])(user_id, record_id)
+                if record is None:
+                    result[kind]['deleted'].append(record_id)
+                else:
+                    result[kind]['upserts'].append(record)
+
+            return result
+
+    # ========== АГРЕГАТЫ ==========
+
+    def get_monthly_totals(self, user_id: int, month: Optional[str] = None) -> Dict[str, float]:
+        """Доходы и расходы пользователя за месяц 'YYYY-MM' (по умолчанию текущий)"""
+        raise NotImplementedError
+
+    def _period_totals(self, user_id: int, start: Optional[float], end: Optional[float],
+                       months: Optional[List[str]]) -> Dict:
+        """Итоги за период в формате MonthlyTotals.summarize"""
+        raise NotImplementedError
+
+    def _recent_transactions(self, user_id: int, limit: int, start: Optional[float],
+                             end: Optional[float]) -> List[Dict]:
+        """Последние транзакции периода, новые первыми"""
+        raise NotImplementedError
+
+    @staticmethod
+    def period_bounds(period: str) -> Tuple[Optional[float], Optional[float], Optional[List[str]]]:
+        """
+        Границы периода сводки: (start, end, месяцы).
+        month/year - текущий календарный месяц/год, all - все время,
+        'YYYY-MM' - конкретный месяц, week - последние 7 дней (месяцы None)
+        """
+        now = datetime.now()
+
+        if period == 'week':
+            return (now - timedelta(days=7)).timestamp(), None, None
+        if period == 'month':
+            period = now.strftime('%Y-%m')
+        elif period == 'year':
+            months = [f'{now.year}-{m:02d}' for m in range(1, 13)]
+            return (datetime(now.year, 1, 1).timestamp(),
+                    datetime(now.year + 1, 1, 1).timestamp() - 1, months)
+        elif period == 'all':
+            return None, None, None
+
+        month_start = datetime.strptime(period, '%Y-%m')
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        return month_start.timestamp(), month_end.timestamp() - 1, [period]
+
+    def refresh_monthly_stats(self, user_id: int, user_data: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Пересчет monthly_income/monthly_expenses/savings_percent за текущий месяц
+        и сохранение пользователя (user_data - уже измененная запись, если есть)
+        """
+        user_data = user_data or self.get_user_data(user_id)
+        if not user_data:
+            return None
+
+        totals = self.get_monthly_totals(user_id)
+        user_data['monthly_income'] = totals['income']
+        user_data['monthly_expenses'] = totals['expense']
+        if totals['income'] > 0:
+            user_data['savings_percent'] = round(
+                (totals['income'] - totals['expense']) / totals['income'] * 100, 1
+            )
+
+        self.save_user_data(user_id, user_data)
+        return user_data
+
+    def get_summary(self, user_id: int, period: str = 'month') -> Dict:
+        """Финансовая сводка за период (аналог getFinancialSummary в index.html)"""
+        start, end, months = self.period_bounds(period)
+        totals = self._period_totals(user_id, start, end, months)
+
+        total_income = totals['total_income']
+        total_expenses = totals['total_expenses']
+        net_income = total_income - total_expenses
+
+        expense_structure = [
+            {
+                'category': category,
+                'amount': amount,
+                'percentage': amount / total_expenses * 100 if total_expenses > 0 else 0
+            }
+            for category, amount in totals['expense_by_category'].items()
+        ]
+        expense_structure.sort(key=lambda item: item['amount'], reverse=True)
+
+        return {
+            'summary': {
+                'total_income': total_income,
+                'total_expenses': total_expenses,
+                'total_investments': sum(
+                    inv.get('amount', 0) for inv in self.get_user_investments(user_id)
+                ),
+                'net_income': net_income,
+                'savings_rate': net_income / total_income * 100 if total_income > 0 else 0,
+                'total_transactions': totals['total_transactions']
+            },
+            'expense_structure': expense_structure,
+            'recent_transactions': self._recent_transactions(user_id, 5, start, end),
+            'currency': '₽'
+        }
+
+    # ========== ДИНАМИКА БАЛАНСА ==========
+
+    # Длина скользящего окна графика, дней (all - с первой транзакции)
+    BALANCE_PERIOD_DAYS = {'week': 7, 'month': 30, 'year': 365}
+    # Число точек графика по умолчанию
+    BALANCE_POINTS = {'week': 7, 'month': 30, 'year': 53, 'all': 120}
+    MAX_BALANCE_POINTS = 1000
+
+    def _daily_balance(self, user_id: int) -> DailyBalance:
+        """Изменения баланса пользователя по дням (вызывается под user_lock)"""
+        raise NotImplementedError
+
+    def get_balance_series(self, user_id: int, period: str = 'month',
+                           points: Optional[int] = None) -> Dict:
+        """
+        Баланс на конец дня для графика динамики: не больше points точек
+        с равным шагом в днях, последняя - сегодня. Кривая привязана
+        к текущему балансу пользователя; каждая точка - O(log n)
+        """
+        if period not in self.BALANCE_PERIOD_DAYS and period != 'all':
+            raise ValueError(f"Неизвестный период: {period}")
+        limit = min(max(points or self.BALANCE_POINTS[period], 2), self.MAX_BALANCE_POINTS)
+
+        today = date.today().toordinal()
+        with self.user_lock(user_id):
+            daily = self._daily_balance(user_id)
+            user_data = self.get_user_data(user_id) or {}
+
+            if period == 'all':
+                start = min(daily.first_day or today, today)
+            else:
+                start = today - self.BALANCE_PERIOD_DAYS[period] + 1
+
+            step = max(1, math.ceil((today - start) / (limit - 1)))
+            days = list(range(today, start - 1, -step))[::-1]
+            if days[0] != start:
+                # Первая точка - начало периода, даже если шаг до неё короче
+                days.insert(0, start)
+            # Баланс до первой транзакции: текущий минус все датированные изменения
+            offset = float(user_data.get('balance', 0) or 0) - daily.total
+            values = daily.prefixes(days)
+
+        return {
+            'period': period,
+            'step_days': step,
+            'points': [
+                {'date': date.fromordinal(day).isoformat(), 'balance': round(offset + value, 2)}
+                for day, value in zip(days, values)
+            ],
+            'currency': '₽'
+        }
+
+    # ========== ЖИЗНЕННЫЙ ЦИКЛ ==========
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики хранилища для мониторинга (у бэкендов без кеша - пусто)"""
+        return {}
+
+    def close(self):
+        """Освобождение ресурсов хранилища"""
+
+
+def create_storage(backend: str = 'memory', **options) -> Storage:
+    """
+    Создание хранилища по имени бэкенда:
+    memory - DataManager (columnar, snapshot_format, data_file, legacy_data_file,
+    fsync_interval, compact_interval, max_resident_users, max_resident_records),
+    sqlite - SQLiteStorage (path)
+    """
+    if backend == 'sqlite':
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage(options.get('path', 'finance.db'))
+
+    if backend == 'memory':
+        from data_manager import DataManager
+        storage = DataManager(
+            columnar=options.get('columnar', False),
+            snapshot_format=options.get('snapshot_format', 'binary')
+        )
+        if options.get('max_resident_users') or options.get('max_resident_records'):
+            storage.enable_tiering(
+                max_users=options.get('max_resident_users', 0),
+                max_records=options.get('max_resident_records', 0),
+                directory=os.path.dirname(os.path.abspath(options['data_file'])) if options.get('data_file') else None
+            )
+        if options.get('data_file'):
+            storage.enable_persistence(
+                options['data_file'],
+                fsync_interval=options.get('fsync_interval', 1.0),
+                compact_interval=options.get('compact_interval', 300.0),
+                legacy_filepath=options.get('legacy_data_file')
+            )
+        return storage
+
+    raise ValueError(f"Неизвестный бэкенд хранилища: {backend}")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Журнал упреждающей записи (WAL) для DataManager
+Каждая мутация дописывается в конец файла одной компактной строкой,
+fsync выполняется пачками
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List
+
+import serializers
+
+
+class WriteAheadLog:
+    """Журнал мутаций с пакетным fsync"""
+
+    def __init__(self, filepath: str, fsync_interval: float = 1.0, fsync_batch: int = 256):
+        self.filepath = filepath
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.seq = 0
+
+        self._lock = threading.Lock()
+        self._file = open(filepath, 'a', encoding='utf-8')
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._deferred = 0
+
+    @property
+    def old_filepath(self) -> str:
+        """Путь к журналу, отложенному до завершения компактизации"""
+        return self.filepath + '.old'
+
+    def append(self, op: str, user_id: Any, payload: Any = None) -> int:
+        """Добавление записи в журнал, возвращает её порядковый номер"""
+        with self._lock:
+            self.seq += 1
+            record = serializers.dumps([self.seq, op, user_id, payload])
+            self._file.write(record + '\n')
+            self._pending += 1
+
+            if not self._deferred and (
+                    self._pending >= self.fsync_batch or
+                    time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+            return self.seq
+
+    def flush(self):
+        """Принудительный сброс накопленных записей на диск"""
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    @contextmanager
+    def deferred(self):
+        """Пакет записей без промежуточных fsync; один сброс на диск в конце"""
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                if self._pending:
+                    self._sync()
+
+    def _sync(self):
+        """Сброс буфера и fsync (вызывается под блокировкой)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def rotate(self) -> int:
+        """
+        Откладывание текущего журнала в .old и открытие нового.
+        Возвращает номер последней записи, попавшей в отложенный журнал
+        """
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+            old_path = self.old_filepath
+            if os.path.exists(old_path):
+                # Прошлая компактизация не завершилась - дописываем журнал к отложенному
+                with open(self.filepath, 'r', encoding='utf-8') as src, \
+                        open(old_path, 'a', encoding='utf-8') as dst:
+                    for line in src:
+                        dst.write(line)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.filepath)
+            else:
+                os.replace(self.filepath, old_path)
+
+            self._file = open(self.filepath, 'a', encoding='utf-8')
+            return self.seq
+
+    def discard_old(self):
+        """Удаление отложенного журнала после записи снапшота"""
+        try:
+            os.remove(self.old_filepath)
+        except FileNotFoundError:
+            pass
+
+    def size(self) -> int:
+        """Текущий размер журнала в байтах"""
+        with self._lock:
+            return self._file.tell()
+
+    def close(self):
+        """Сброс на диск и закрытие журнала"""
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+
+def read_records(filepath: str) -> Iterator[List[Any]]:
+    """Чтение записей журнала; оборванная последняя строка пропускается"""
+    for path in (filepath + '.old', filepath):
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    # Запись не успела дописаться до сбоя
+                    break
+                try:
+                    yield serializers.loads(line)
+                except ValueError:
+                    break